@@ -0,0 +1,116 @@
+"""Partition notification_log, portal_access_logs and communications by month
+
+Existing tables are rebuilt as RANGE (created_at) partitioned tables with one
+partition per month of existing data, a few months ahead, and a DEFAULT
+partition. Databases created from the current models are already partitioned
+and are left untouched.
+
+Partitioned tables need the partition key in every unique constraint, so the
+primary key becomes (created_at, id), notification_log.idempotency_key loses
+its unique constraint (kept as a plain index), and the foreign key from
+notification_log.communication_id to communications is dropped.
+
+Revision ID: 0001_partition_log_tables
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+from sqlalchemy import text
+
+from app.partitioning import ensure_partitions, is_partitioned
+
+revision = "0001_partition_log_tables"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# table -> (foreign keys as (column, referenced table, ON DELETE), plain indexes as (name, column))
+TABLES = {
+    "notification_log": (
+        [
+            ("transaction_id", "transactions", "CASCADE"),
+            ("milestone_id", "milestones", "SET NULL"),
+            ("rule_id", "notification_rules", "SET NULL"),
+            ("draft_id", "email_drafts", "SET NULL"),
+        ],
+        [
+            ("ix_notification_log_id", "id"),
+            ("ix_notification_log_resend_message_id", "resend_message_id"),
+        ],
+    ),
+    "portal_access_logs": (
+        [("portal_access_id", "portal_access", "CASCADE")],
+        [("ix_portal_access_logs_id", "id")],
+    ),
+    "communications": (
+        [
+            ("transaction_id", "transactions", None),
+            ("milestone_id", "milestones", None),
+            ("recipient_party_id", "parties", None),
+        ],
+        [("ix_communications_id", "id")],
+    ),
+}
+
+
+def _rebuild(bind, table, partitioned):
+    """Copy ``table`` into a new (un)partitioned table of the same name."""
+    foreign_keys, indexes = TABLES[table]
+    old = f"{table}_old"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+
+    # Free the constraint and index names for the new table
+    constraints = bind.execute(
+        text("SELECT conname FROM pg_constraint WHERE conrelid = CAST(:t AS regclass) AND contype IN ('p', 'u', 'f')"),
+        {"t": old},
+    ).scalars().all()
+    for name in constraints:
+        op.execute(f'ALTER TABLE {old} DROP CONSTRAINT "{name}"')
+    for name in bind.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :t"), {"t": old}).scalars().all():
+        op.execute(f'DROP INDEX "{name}"')
+
+    if partitioned:
+        op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (created_at, id)")
+    else:
+        op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)")
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id)")
+    for column, referenced, ondelete in foreign_keys:
+        op.create_foreign_key(f"{table}_{column}_fkey", table, referenced, [column], ["id"], ondelete=ondelete)
+    for name, column in indexes:
+        op.create_index(name, table, [column])
+
+    if partitioned:
+        oldest = bind.execute(text(f"SELECT min(created_at) FROM {old}")).scalar()
+        ensure_partitions(bind, table, start=oldest)
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    op.execute(f"DROP TABLE {old}")
+
+
+def _exists(bind, table):
+    return bind.execute(text("SELECT to_regclass(:t)"), {"t": table}).scalar() is not None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.execute("ALTER TABLE IF EXISTS notification_log DROP CONSTRAINT IF EXISTS notification_log_communication_id_fkey")
+    for table in TABLES:
+        if not _exists(bind, table) or is_partitioned(bind, table):
+            continue
+        _rebuild(bind, table, partitioned=True)
+        if table == "notification_log":
+            op.create_index("ix_notification_log_idempotency_key", table, ["idempotency_key"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table in TABLES:
+        if not _exists(bind, table) or not is_partitioned(bind, table):
+            continue
+        _rebuild(bind, table, partitioned=False)
+        if table == "notification_log":
+            op.create_unique_constraint("notification_log_idempotency_key_key", table, ["idempotency_key"])
+    op.create_foreign_key(
+        "notification_log_communication_id_fkey", "notification_log", "communications",
+        ["communication_id"], ["id"], ondelete="SET NULL",
+    )
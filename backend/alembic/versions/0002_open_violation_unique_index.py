@@ -0,0 +1,34 @@
+"""One open compliance violation per (rule, transaction)
+
+The compliance evaluator bulk-upserts open violations against this partial
+unique index. Duplicate open violations left by earlier runs are collapsed
+to the most recent one first.
+
+Revision ID: 0002_open_violation_unique_index
+Revises: 0001_partition_log_tables
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0002_open_violation_unique_index"
+down_revision = "0001_partition_log_tables"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        DELETE FROM compliance_violations v
+        USING compliance_violations newer
+        WHERE v.resolved = false AND newer.resolved = false
+          AND v.rule_id = newer.rule_id AND v.transaction_id = newer.transaction_id
+          AND (v.created_at, v.id) < (newer.created_at, newer.id)
+    """)
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_compliance_violations_open "
+        "ON compliance_violations (rule_id, transaction_id) WHERE resolved = false"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS uq_compliance_violations_open")
@@ -0,0 +1,32 @@
+"""One performance snapshot per agent per day
+
+The nightly snapshot job bulk-upserts on (agent_id, period_end). Duplicate
+snapshots left by earlier runs are collapsed to the most recent one first.
+
+Revision ID: 0003_snapshot_agent_period
+Revises: 0002_open_violation_unique_index
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0003_snapshot_agent_period"
+down_revision = "0002_open_violation_unique_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        DELETE FROM performance_snapshots s
+        USING performance_snapshots newer
+        WHERE s.agent_id = newer.agent_id AND s.period_end = newer.period_end
+          AND (s.created_at, s.id) < (newer.created_at, newer.id)
+    """)
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_performance_snapshots_agent_period "
+        "ON performance_snapshots (agent_id, period_end)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS uq_performance_snapshots_agent_period")
@@ -0,0 +1,20 @@
+"""Index transactions by (agent_id, status) for per-agent aggregates
+
+Revision ID: 0004_transactions_agent_status
+Revises: 0003_snapshot_agent_period
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0004_transactions_agent_status"
+down_revision = "0003_snapshot_agent_period"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE INDEX IF NOT EXISTS ix_transactions_agent_status ON transactions (agent_id, status)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_transactions_agent_status")
@@ -0,0 +1,22 @@
+"""Index compliance_violations by agent_id
+
+Analytics rollup refreshes read violations per agent.
+
+Revision ID: 0005_violations_agent_index
+Revises: 0004_transactions_agent_status
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0005_violations_agent_index"
+down_revision = "0004_transactions_agent_status"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE INDEX IF NOT EXISTS ix_compliance_violations_agent_id ON compliance_violations (agent_id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_compliance_violations_agent_id")
@@ -0,0 +1,36 @@
+"""Indexes for the compliance dashboard
+
+Recent violations are paged per rule by created_at; unresolved counts and
+pages use partial indexes that only hold open violations.
+
+Revision ID: 0006_violation_dashboard_indexes
+Revises: 0005_violations_agent_index
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0006_violation_dashboard_indexes"
+down_revision = "0005_violations_agent_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_compliance_violations_rule_created "
+        "ON compliance_violations (rule_id, created_at)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_compliance_violations_unresolved_severity "
+        "ON compliance_violations (rule_id, severity) WHERE resolved = false"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_compliance_violations_unresolved_created "
+        "ON compliance_violations (created_at, id) WHERE resolved = false"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_compliance_violations_unresolved_created")
+    op.execute("DROP INDEX IF EXISTS ix_compliance_violations_unresolved_severity")
+    op.execute("DROP INDEX IF EXISTS ix_compliance_violations_rule_created")
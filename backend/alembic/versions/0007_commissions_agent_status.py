@@ -0,0 +1,23 @@
+"""Index transaction_commissions by (agent_id, status) for the pipeline summary
+
+Revision ID: 0007_commissions_agent_status
+Revises: 0006_violation_dashboard_indexes
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0007_commissions_agent_status"
+down_revision = "0006_violation_dashboard_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_transaction_commissions_agent_status "
+        "ON transaction_commissions (agent_id, status)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_transaction_commissions_agent_status")
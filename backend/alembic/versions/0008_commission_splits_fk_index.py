@@ -0,0 +1,25 @@
+"""Index commission_splits.transaction_commission_id
+
+The export joins splits to their commissions; the foreign key was unindexed.
+
+Revision ID: 0008_commission_splits_fk_index
+Revises: 0007_commissions_agent_status
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0008_commission_splits_fk_index"
+down_revision = "0007_commissions_agent_status"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_commission_splits_transaction_commission_id "
+        "ON commission_splits (transaction_commission_id)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_commission_splits_transaction_commission_id")
@@ -0,0 +1,45 @@
+"""Commission plan columns and pre-sorted tiers
+
+commission_configs gains graduated_splits, annual_cap and
+plan_year_start_month. Tier lists in tiered_rates (configs and commissions)
+are now kept sorted ascending by min so pricing never sorts them; existing
+rows are sorted here. agent_commission_ytd is a new table created from the
+models; fill it with commission_tasks.rebuild_commission_ytd.
+
+Revision ID: 0009_commission_plans
+Revises: 0008_commission_splits_fk_index
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0009_commission_plans"
+down_revision = "0008_commission_splits_fk_index"
+branch_labels = None
+depends_on = None
+
+SORT_TIERS = """
+    UPDATE {table}
+    SET tiered_rates = (tiered_rates::jsonb || jsonb_build_object('tiers', (
+        SELECT jsonb_agg(tier ORDER BY COALESCE((tier->>'min')::numeric, 0))
+        FROM jsonb_array_elements(tiered_rates::jsonb->'tiers') tier
+    )))::json
+    WHERE json_typeof(tiered_rates) = 'object'
+      AND json_typeof(tiered_rates->'tiers') = 'array'
+      AND json_array_length(tiered_rates->'tiers') > 1
+"""
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE commission_configs ADD COLUMN IF NOT EXISTS graduated_splits json")
+    op.execute("ALTER TABLE commission_configs ADD COLUMN IF NOT EXISTS annual_cap numeric(12, 2)")
+    op.execute(
+        "ALTER TABLE commission_configs ADD COLUMN IF NOT EXISTS plan_year_start_month integer NOT NULL DEFAULT 1"
+    )
+    for table in ("commission_configs", "transaction_commissions"):
+        op.execute(SORT_TIERS.format(table=table))
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE commission_configs DROP COLUMN IF EXISTS plan_year_start_month")
+    op.execute("ALTER TABLE commission_configs DROP COLUMN IF EXISTS annual_cap")
+    op.execute("ALTER TABLE commission_configs DROP COLUMN IF EXISTS graduated_splits")
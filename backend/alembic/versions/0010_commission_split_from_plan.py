@@ -0,0 +1,24 @@
+"""Mark commission splits generated by the agent's plan
+
+Recalculation regenerates plan lines through the waterfall and leaves
+explicitly entered lines as a percentage of gross or a flat amount.
+Existing splits predate plans and are all explicit.
+
+Revision ID: 0010_commission_split_from_plan
+Revises: 0009_commission_plans
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0010_commission_split_from_plan"
+down_revision = "0009_commission_plans"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE commission_splits ADD COLUMN IF NOT EXISTS from_plan boolean NOT NULL DEFAULT false")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE commission_splits DROP COLUMN IF EXISTS from_plan")
@@ -0,0 +1,41 @@
+"""Typed, indexed copies of purchase_price and earnest_money_amount
+
+purchase_price_value and earnest_money_value are STORED generated columns
+over the JSON amounts, so Postgres fills them for existing rows when they
+are added and keeps them in sync on every write. Volume rollups, price
+filters and commission repricing read them instead of parsing JSON.
+
+Revision ID: 0011_transaction_amount_columns
+Revises: 0010_commission_split_from_plan
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+from app.models.transaction import json_amount_sql
+
+revision = "0011_transaction_amount_columns"
+down_revision = "0010_commission_split_from_plan"
+branch_labels = None
+depends_on = None
+
+COLUMNS = {
+    "purchase_price_value": "purchase_price",
+    "earnest_money_value": "earnest_money_amount",
+}
+
+
+def upgrade() -> None:
+    for column, source in COLUMNS.items():
+        op.execute(
+            f"ALTER TABLE transactions ADD COLUMN IF NOT EXISTS {column} numeric(14, 2) "
+            f"GENERATED ALWAYS AS ({json_amount_sql(source)}) STORED"
+        )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_transactions_purchase_price_value ON transactions (purchase_price_value)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_transactions_purchase_price_value")
+    for column in COLUMNS:
+        op.execute(f"ALTER TABLE transactions DROP COLUMN IF EXISTS {column}")
@@ -0,0 +1,33 @@
+"""PDF render status and HTML hash on generated documents
+
+PDFs are rendered off-request by document_tasks.render_document_pdf.
+pdf_status is what clients poll; html_hash lets identical HTML reuse an
+earlier render. Existing documents keep a NULL status (no render was
+requested for them); new rows default to pending.
+
+Revision ID: 0012_generated_document_pdf
+Revises: 0011_transaction_amount_columns
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0012_generated_document_pdf"
+down_revision = "0011_transaction_amount_columns"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE generated_documents ADD COLUMN IF NOT EXISTS html_hash varchar(64)")
+    op.execute("ALTER TABLE generated_documents ADD COLUMN IF NOT EXISTS pdf_status varchar(20)")
+    op.execute("ALTER TABLE generated_documents ALTER COLUMN pdf_status SET DEFAULT 'pending'")
+    op.execute("ALTER TABLE generated_documents ADD COLUMN IF NOT EXISTS pdf_error text")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_generated_documents_html_hash ON generated_documents (html_hash)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_generated_documents_html_hash")
+    for column in ("pdf_error", "pdf_status", "html_hash"):
+        op.execute(f"ALTER TABLE generated_documents DROP COLUMN IF EXISTS {column}")
@@ -0,0 +1,25 @@
+"""Add notification_rules.digest_enabled
+
+Rules opt in to per-recipient digests; existing rules keep sending
+individual reminders.
+
+Revision ID: 0013_notification_rule_digest
+Revises: 0012_generated_document_pdf
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0013_notification_rule_digest"
+down_revision = "0012_generated_document_pdf"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE notification_rules ADD COLUMN IF NOT EXISTS digest_enabled boolean NOT NULL DEFAULT false"
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE notification_rules DROP COLUMN IF EXISTS digest_enabled")
@@ -0,0 +1,33 @@
+"""Record the date that places a paid commission in a plan year
+
+Posting, reversing and rebuilding an agent's plan-year position all read
+plan_year_date, so they agree on the year even when the deal has no
+closing date. Existing paid commissions are backfilled with the date the
+rebuild used so far: the closing date, else the last update.
+
+Revision ID: 0014_commission_plan_year_date
+Revises: 0013_notification_rule_digest
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0014_commission_plan_year_date"
+down_revision = "0013_notification_rule_digest"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE transaction_commissions ADD COLUMN IF NOT EXISTS plan_year_date timestamptz")
+    op.execute(
+        """
+        UPDATE transaction_commissions tc
+        SET plan_year_date = COALESCE(t.closing_date, tc.updated_at)
+        FROM transactions t
+        WHERE t.id = tc.transaction_id AND tc.status = 'paid' AND tc.plan_year_date IS NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE transaction_commissions DROP COLUMN IF EXISTS plan_year_date")
@@ -0,0 +1,24 @@
+"""Start time of a generated document's PDF render
+
+A worker that dies mid-render leaves pdf_status at "rendering" for good.
+pdf_started_at records when the render began, so document_service can
+requeue a render that has run past the task's time limits.
+
+Revision ID: 0015_document_pdf_started_at
+Revises: 0014_commission_plan_year_date
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0015_document_pdf_started_at"
+down_revision = "0014_commission_plan_year_date"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE generated_documents ADD COLUMN IF NOT EXISTS pdf_started_at timestamptz")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE generated_documents DROP COLUMN IF EXISTS pdf_started_at")
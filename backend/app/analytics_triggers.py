@@ -0,0 +1,141 @@
+"""Queue analytics rollup refreshes when their source rows change.
+
+Like app.compliance_triggers, an ``after_flush`` hook records the (agent,
+day) rollups touched by the flush in analytics_rollup_changes, within the
+same database transaction as the write, and
+``analytics_tasks.refresh_analytics_rollups`` recomputes just those rows.
+Days come from the flushed rows plus the pre-flush values of changed
+columns, so moving a closing date or reassigning a deal refreshes both the
+old and the new rollup.
+
+Team membership and brokerage changes re-attribute the agent's existing
+rollup rows in place. Bulk UPDATE/DELETE statements bypass the hook;
+``analytics_tasks.rebuild_analytics_rollups`` recomputes from scratch.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+
+def _utc_day(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.date()
+    return value
+
+
+def _pk(obj):
+    # Identity survives expiry; new objects only have their generated id yet
+    identity = inspect(obj).identity
+    return identity[0] if identity else obj.id
+
+
+def _seen_values(obj, *attrs):
+    """Every value of ``attrs`` the session knows about: current, and pre-flush for changed ones."""
+    state = inspect(obj)
+    values = set()
+    for attr in attrs:
+        history = state.attrs[attr].history
+        values.update(v for v in (*history.added, *history.unchanged, *history.deleted) if v is not None)
+    return values
+
+
+def queue_rollup_keys(conn, keys):
+    """Queue (agent_id, day) rollups for refresh; for writers that bypass the ORM hook.
+
+    Timestamps are accepted for ``day`` and bucketed by UTC date.
+    """
+    from app.models import AnalyticsRollupChange
+
+    keys = {(agent_id, _utc_day(day)) for agent_id, day in keys if agent_id is not None and day is not None}
+    if not keys:
+        return
+    stmt = pg_insert(AnalyticsRollupChange).values([
+        {"agent_id": agent_id, "day": day, "requested_at": func.now()}
+        for agent_id, day in sorted(keys, key=lambda k: (str(k[0]), k[1]))
+    ])
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=["agent_id", "day"],
+        set_={"requested_at": stmt.excluded.requested_at, "updated_at": func.now()},
+    ))
+
+
+@event.listens_for(Session, "after_flush")
+def _queue_rollup_refresh(session, flush_context):
+    from app.models import (
+        AnalyticsDailyRollup, ComplianceViolation,
+        TeamMember, Transaction, TransactionCommission, User,
+    )
+    from app.tasks.analytics_tasks import agent_team_sql
+
+    # source row -> (agents, days) known from the session before the flush
+    prior = defaultdict(lambda: (set(), set()))
+    transaction_ids, violation_ids, reattribute = set(), set(), set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, Transaction):
+            transaction_ids.add(_pk(obj))
+            agents, days = prior[("transaction", _pk(obj))]
+            agents.update(_seen_values(obj, "agent_id"))
+            days.update(_utc_day(v) for v in _seen_values(obj, "created_at", "closing_date"))
+        elif isinstance(obj, TransactionCommission):
+            transaction_ids.update(_seen_values(obj, "transaction_id"))
+        elif isinstance(obj, ComplianceViolation):
+            violation_ids.add(_pk(obj))
+            agents, days = prior[("violation", _pk(obj))]
+            agents.update(_seen_values(obj, "agent_id"))
+            days.update(_utc_day(v) for v in _seen_values(obj, "created_at", "resolved_at"))
+        elif isinstance(obj, TeamMember):
+            reattribute.update(_seen_values(obj, "user_id"))
+        elif isinstance(obj, User) and inspect(obj).attrs.brokerage_id.history.has_changes():
+            reattribute.add(_pk(obj))
+
+    if not (transaction_ids or violation_ids or reattribute):
+        return
+    conn = session.connection()
+
+    # Current values, as just flushed; deleted rows are simply absent
+    current = []
+    if transaction_ids:
+        current += [
+            (("transaction", row.id), row.agent_id, (row.created_at, row.closing_date))
+            for row in conn.execute(
+                select(Transaction.id, Transaction.agent_id, Transaction.created_at, Transaction.closing_date)
+                .where(Transaction.id.in_(transaction_ids))
+            )
+        ]
+    if violation_ids:
+        current += [
+            (("violation", row.id), row.agent_id, (row.created_at, row.resolved_at))
+            for row in conn.execute(
+                select(ComplianceViolation.id, ComplianceViolation.agent_id,
+                       ComplianceViolation.created_at, ComplianceViolation.resolved_at)
+                .where(ComplianceViolation.id.in_(violation_ids))
+            )
+        ]
+    for source, agent_id, timestamps in current:
+        agents, days = prior[source]
+        agents.add(agent_id)
+        days.update(_utc_day(ts) for ts in timestamps if ts is not None)
+
+    queue_rollup_keys(conn, {
+        (agent_id, day) for agents, days in prior.values() for agent_id in agents for day in days
+    })
+
+    if reattribute:
+        conn.execute(
+            update(AnalyticsDailyRollup)
+            .where(AnalyticsDailyRollup.agent_id.in_(reattribute))
+            .values(
+                team_id=agent_team_sql(AnalyticsDailyRollup.agent_id),
+                brokerage_id=select(User.brokerage_id)
+                .where(User.id == AnalyticsDailyRollup.agent_id)
+                .scalar_subquery(),
+                updated_at=func.now(),
+            )
+        )
@@ -30,6 +30,9 @@ from .documents import router as documents_router
 # Phase 7: Brokerage
 from .brokerage import router as brokerage_router
 
+# Exports
+from .exports import router as exports_router
+
 router = APIRouter(prefix="/api")
 router.include_router(transactions_router, tags=["transactions"])
 router.include_router(parties_router, tags=["parties"])
@@ -51,3 +54,4 @@ router.include_router(advisor_router, tags=["advisor"])
 router.include_router(commissions_router, tags=["commissions"])
 router.include_router(documents_router, tags=["documents"])
 router.include_router(brokerage_router, tags=["brokerage"])
+router.include_router(exports_router, tags=["exports"])
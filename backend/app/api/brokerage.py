@@ -1,14 +1,17 @@
-from typing import List
+from datetime import date
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_async_session
+from app.schemas.common import CursorParams
 from app.schemas.brokerage import (
     BrokerageCreate, BrokerageUpdate, BrokerageResponse,
     TeamCreate, TeamUpdate, TeamResponse, TeamMemberAdd, TeamMemberResponse,
     ComplianceRuleCreate, ComplianceRuleUpdate, ComplianceRuleResponse,
-    ComplianceDashboardResponse,
+    ComplianceDashboardFilters, ComplianceDashboardResponse,
     PerformanceSnapshotResponse, AgentPerformanceSummary,
+    BrokerageAnalyticsResponse,
 )
 from app.services import brokerage_service
 
@@ -111,9 +114,22 @@ async def update_compliance_rule(
 @router.get("/brokerages/{brokerage_id}/compliance-dashboard", response_model=ComplianceDashboardResponse)
 async def get_compliance_dashboard(
     brokerage_id: UUID,
+    team_id: Optional[UUID] = None,
+    agent_id: Optional[UUID] = None,
+    rule_id: Optional[UUID] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    resolved: Optional[bool] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100),
     db: AsyncSession = Depends(get_async_session),
 ):
-    return await brokerage_service.get_compliance_dashboard(brokerage_id, db)
+    filters = ComplianceDashboardFilters(
+        team_id=team_id, agent_id=agent_id, rule_id=rule_id,
+        start_date=start_date, end_date=end_date, resolved=resolved,
+    )
+    page = CursorParams(cursor=cursor, limit=limit)
+    return await brokerage_service.get_compliance_dashboard(brokerage_id, db, filters, page)
 
 
 # --- Performance ---
@@ -132,3 +148,23 @@ async def get_agent_performance_summary(
     db: AsyncSession = Depends(get_async_session),
 ):
     return await brokerage_service.get_agent_performance_summary(agent_id, db)
+
+
+# --- Analytics ---
+
+@router.get("/brokerages/{brokerage_id}/analytics", response_model=BrokerageAnalyticsResponse)
+async def get_brokerage_analytics(
+    brokerage_id: UUID,
+    start_date: date,
+    end_date: date,
+    group_by: List[str] = Query(["agent"], description="Any of agent, team and one of day, week, month"),
+    team_id: Optional[UUID] = Query(None),
+    agent_id: Optional[UUID] = Query(None),
+    sort: Optional[str] = Query(None, description="Metric to rank by, descending (e.g. closed_volume)"),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await brokerage_service.get_brokerage_analytics(
+        brokerage_id, start_date, end_date, group_by, db,
+        team_id=team_id, agent_id=agent_id, sort=sort, limit=limit,
+    )
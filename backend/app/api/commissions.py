@@ -6,11 +6,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_async_session
 from app.auth import get_current_agent_id
 from app.schemas.commission import (
-    CommissionConfigCreate, CommissionConfigUpdate, CommissionConfigResponse,
+    CommissionConfigCreate, CommissionConfigUpdate, CommissionConfigResponse, CommissionPositionResponse,
     TransactionCommissionCreate, TransactionCommissionUpdate, TransactionCommissionResponse,
-    PipelineSummary, CSVExportRequest,
+    PipelineSummary, CSVExportRequest, ScenarioRequest, ScenarioResponse,
+    PipelineForecastResponse,
 )
-from app.services import commission_service
+from app.services import commission_service, forecast_service, scenario_service
 
 router = APIRouter()
 
@@ -43,6 +44,14 @@ async def upsert_commission_config(
     return await commission_service.upsert_config(agent_id, config_data, db)
 
 
+@router.get("/commission-config/position", response_model=CommissionPositionResponse)
+async def get_commission_position(
+    db: AsyncSession = Depends(get_async_session),
+    agent_id: UUID = Depends(get_current_agent_id),
+):
+    return await commission_service.get_position(agent_id, db)
+
+
 # --- Transaction Commission ---
 
 @router.get("/transactions/{transaction_id}/commission", response_model=TransactionCommissionResponse)
@@ -84,21 +93,48 @@ async def update_transaction_commission(
 
 @router.get("/pipeline", response_model=PipelineSummary)
 async def get_pipeline(
+    months: int = Query(commission_service.PIPELINE_HORIZON_MONTHS, ge=1, le=60, description="by_month horizon"),
     db: AsyncSession = Depends(get_async_session),
     agent_id: UUID = Depends(get_current_agent_id),
 ):
-    return await commission_service.get_pipeline_summary(agent_id, db)
+    return await commission_service.get_pipeline_summary(agent_id, db, months=months)
 
 
 @router.get("/pipeline/export")
 async def export_pipeline_csv(
     status: Optional[str] = Query(None),
+    scope: str = Query("agent", description="agent, team or brokerage"),
+    team_id: Optional[UUID] = Query(None),
+    include_splits: bool = Query(False, description="One row per split"),
     db: AsyncSession = Depends(get_async_session),
     agent_id: UUID = Depends(get_current_agent_id),
 ):
-    csv_data = await commission_service.export_csv(agent_id, db, status=status)
+    agent_ids = await commission_service.export_agent_scope(agent_id, db, scope=scope, team_id=team_id)
     return StreamingResponse(
-        iter([csv_data]),
+        commission_service.stream_csv(agent_ids, db, status=status, include_splits=include_splits),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=pipeline_export.csv"},
     )
+
+
+@router.post("/pipeline/scenarios", response_model=ScenarioResponse)
+async def run_pipeline_scenarios(
+    data: ScenarioRequest,
+    db: AsyncSession = Depends(get_async_session),
+    agent_id: UUID = Depends(get_current_agent_id),
+):
+    """What-if totals for the open pipeline under each scenario; nothing is saved."""
+    return await scenario_service.run_scenarios(agent_id, data, db)
+
+
+@router.get("/pipeline/forecast", response_model=PipelineForecastResponse)
+async def get_pipeline_forecast(
+    months: int = Query(commission_service.PIPELINE_HORIZON_MONTHS, ge=1, le=36),
+    simulations: int = Query(forecast_service.FORECAST_SIMULATIONS, ge=1000, le=100_000),
+    refresh: bool = Query(False, description="Ignore the cached forecast"),
+    db: AsyncSession = Depends(get_async_session),
+    agent_id: UUID = Depends(get_current_agent_id),
+):
+    return await forecast_service.get_pipeline_forecast(
+        agent_id, db, simulations=simulations, months=months, refresh=refresh,
+    )
@@ -40,6 +40,23 @@ async def preview_document(
     return await document_service.preview_document(transaction_id, request, db)
 
 
+@router.get("/documents/{document_id}", response_model=GeneratedDocumentResponse)
+async def get_generated_document(
+    document_id: UUID,
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Poll pdf_status; file_url links the PDF once it is ready."""
+    return await document_service.get_generated_document(document_id, db)
+
+
+@router.post("/documents/{document_id}/pdf", response_model=GeneratedDocumentResponse)
+async def request_document_pdf(
+    document_id: UUID,
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await document_service.request_pdf(document_id, db)
+
+
 @router.get("/transactions/{transaction_id}/documents", response_model=List[GeneratedDocumentResponse])
 async def list_generated_documents(
     transaction_id: UUID,
@@ -0,0 +1,27 @@
+from typing import List
+from uuid import UUID
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth import get_current_agent_id
+from app.database import get_async_session
+from app.schemas.export import ParquetExportRequest, ParquetExportStarted, ExportDatasetStatus
+from app.services import export_service
+
+router = APIRouter()
+
+
+@router.post("/exports/parquet", response_model=ParquetExportStarted, status_code=202)
+async def start_parquet_export(
+    data: ParquetExportRequest,
+    db: AsyncSession = Depends(get_async_session),
+    agent_id: UUID = Depends(get_current_agent_id),
+):
+    return await export_service.start_parquet_export(data, agent_id, db)
+
+
+@router.get("/exports/parquet", response_model=List[ExportDatasetStatus])
+async def list_export_status(
+    db: AsyncSession = Depends(get_async_session),
+    agent_id: UUID = Depends(get_current_agent_id),
+):
+    return await export_service.list_export_status(agent_id, db)
@@ -1,5 +1,7 @@
+from decimal import Decimal
+from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_async_session
 from app.schemas.common import PaginationParams, APIResponse
@@ -27,10 +29,12 @@ async def create_transaction(
 async def list_transactions(
     page: int = 1,
     limit: int = 10,
+    min_price: Optional[Decimal] = Query(None, ge=0, description="Lowest purchase price, inclusive"),
+    max_price: Optional[Decimal] = Query(None, ge=0, description="Highest purchase price, inclusive"),
     db: AsyncSession = Depends(get_async_session),
 ):
     pagination = PaginationParams(page=page, limit=limit)
-    return await transaction_service.list_transactions(pagination, db)
+    return await transaction_service.list_transactions(pagination, db, min_price=min_price, max_price=max_price)
 
 
 @router.get("/transactions/{id}", response_model=TransactionDetailResponse)
@@ -11,12 +11,11 @@ async def resend_webhook(
     request: Request,
     db: AsyncSession = Depends(get_async_session),
 ):
-    """Handle Resend webhook events for email delivery tracking."""
+    """Acknowledge Resend webhook events once staged; the delivery worker applies them in batches."""
     body = await request.json()
-    event_type = body.get("type", "")
-    data = body.get("data", {})
-
-    await email_delivery_service.process_webhook(event_type, data, db)
+    await email_delivery_service.stage_webhook_event(
+        body, db, event_id=request.headers.get("svix-id")
+    )
     return {"received": True}
 
 
@@ -13,6 +13,11 @@ celery_app = Celery(
         "app.tasks.notification_tasks",
         "app.tasks.portal_tasks",
         "app.tasks.compliance_tasks",
+        "app.tasks.analytics_tasks",
+        "app.tasks.maintenance_tasks",
+        "app.tasks.export_tasks",
+        "app.tasks.commission_tasks",
+        "app.tasks.document_tasks",
     ],
 )
 
@@ -25,6 +30,8 @@ celery_app.conf.update(
     task_track_started=True,
     task_acks_late=True,
     worker_prefetch_multiplier=1,
+    # PDF rendering is CPU-heavy; its own process-pool worker consumes this queue
+    task_routes={"app.tasks.document_tasks.render_document_pdf": {"queue": "pdf"}},
 )
 
 celery_app.conf.beat_schedule = {
@@ -35,24 +42,54 @@ celery_app.conf.beat_schedule = {
     },
     "send-queued-emails": {
         "task": "app.tasks.notification_tasks.send_queued_emails",
-        "schedule": crontab(minute="*/5"),  # Every 5 minutes
+        "schedule": crontab(minute="*/5"),  # Every 5 minutes — safety sweep; delivery is event-driven
+    },
+    "send-notification-digests": {
+        "task": "app.tasks.notification_tasks.send_notification_digests",
+        "schedule": crontab(minute="*/15"),  # Every 15 minutes
+    },
+    "process-webhook-events": {
+        "task": "app.tasks.notification_tasks.process_webhook_events",
+        "schedule": 10.0,  # Every 10 seconds — applies staged Resend webhooks in batches
     },
     "expire-stale-drafts": {
         "task": "app.tasks.notification_tasks.expire_stale_drafts",
         "schedule": crontab(hour=0, minute=30),  # Daily 12:30 AM UTC
     },
+    # Database maintenance
+    "maintain-partitions": {
+        "task": "app.tasks.maintenance_tasks.maintain_partitions",
+        "schedule": crontab(hour=1, minute=0),  # Daily 1 AM UTC
+    },
+    "purge-processed-webhook-events": {
+        "task": "app.tasks.maintenance_tasks.purge_processed_webhook_events",
+        "schedule": crontab(hour=1, minute=30),  # Daily 1:30 AM UTC
+    },
     # Phase 3: Portal cleanup
     "cleanup-portal-access-logs": {
         "task": "app.tasks.portal_tasks.cleanup_access_logs",
         "schedule": crontab(hour=2, minute=0),  # Daily 2 AM UTC
     },
     # Phase 7: Compliance & performance
+    "reevaluate-pending-compliance": {
+        "task": "app.tasks.compliance_tasks.reevaluate_pending_compliance",
+        "schedule": 30.0,  # Every 30 seconds — debounced incremental re-evaluation
+    },
     "nightly-compliance-evaluation": {
         "task": "app.tasks.compliance_tasks.evaluate_all_compliance",
-        "schedule": crontab(hour=3, minute=0),  # Daily 3 AM UTC
+        "schedule": crontab(hour=3, minute=0),  # Daily 3 AM UTC — consistency check
     },
     "nightly-performance-snapshots": {
         "task": "app.tasks.compliance_tasks.compute_performance_snapshots",
         "schedule": crontab(hour=4, minute=0),  # Daily 4 AM UTC
     },
+    "refresh-analytics-rollups": {
+        "task": "app.tasks.analytics_tasks.refresh_analytics_rollups",
+        "schedule": 15.0,  # Every 15 seconds — debounced incremental rollup refresh
+    },
+    # Exports
+    "nightly-parquet-export": {
+        "task": "app.tasks.export_tasks.export_parquet_datasets",
+        "schedule": crontab(hour=5, minute=0),  # Daily 5 AM UTC — incremental on updated_at
+    },
 }
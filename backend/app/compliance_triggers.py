@@ -0,0 +1,49 @@
+"""Queue compliance re-evaluation when a rule's input tables change.
+
+An ``after_flush`` hook on every ORM session (async API sessions and sync
+Celery sessions alike) records the (transaction, rule type) pairs touched by
+the flush in compliance_reevaluations, within the same database transaction
+as the write. ``compliance_tasks.reevaluate_pending_compliance`` picks them up
+once they have been quiet for the debounce window.
+
+Bulk UPDATE/DELETE statements bypass the hook; the nightly full evaluation
+catches anything missed.
+"""
+from sqlalchemy import event, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+
+def _transaction_id(obj):
+    from app.models import Transaction
+    return obj.id if isinstance(obj, Transaction) else getattr(obj, "transaction_id", None)
+
+
+@event.listens_for(Session, "after_flush")
+def _queue_compliance_reevaluation(session, flush_context):
+    from app.models import ComplianceReevaluation
+    from app.tasks.compliance_tasks import rule_types_reading
+
+    pairs = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        rule_types = rule_types_reading(table) if table else ()
+        if not rule_types:
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        transaction_id = _transaction_id(obj)
+        if transaction_id is None:
+            continue
+        pairs.update((transaction_id, rule_type) for rule_type in rule_types)
+
+    if not pairs:
+        return
+    stmt = pg_insert(ComplianceReevaluation).values([
+        {"transaction_id": transaction_id, "rule_type": rule_type, "requested_at": func.now()}
+        for transaction_id, rule_type in sorted(pairs, key=lambda p: (str(p[0]), p[1]))
+    ])
+    session.connection().execute(stmt.on_conflict_do_update(
+        index_elements=["transaction_id", "rule_type"],
+        set_={"requested_at": stmt.excluded.requested_at, "updated_at": func.now()},
+    ))
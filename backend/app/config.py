@@ -24,6 +24,9 @@ class Settings(BaseSettings):
     # Portal (Phase 3)
     portal_base_url: str = "http://localhost:3000"
 
+    # Document generation: Jinja bytecode cache directory (empty uses a temp dir)
+    template_cache_dir: str = ""
+
     @property
     def effective_celery_broker(self) -> str:
         return self.celery_broker_url or self.redis_url
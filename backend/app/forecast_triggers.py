@@ -0,0 +1,44 @@
+"""Invalidate cached pipeline forecasts when their inputs change.
+
+An ``after_flush`` hook clears the PipelineForecast of every agent whose
+deals, commissions or milestones were touched by the flush (including the
+previous agent of a reassigned deal), within the same database transaction
+as the write. Bulk UPDATE/DELETE statements bypass the hook; cached
+forecasts also expire after ``forecast_service.FORECAST_TTL``.
+"""
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+
+from app.analytics_triggers import _pk, _seen_values
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_pipeline_forecasts(session, flush_context):
+    from app.models import Milestone, PipelineForecast, Transaction, TransactionCommission
+
+    agent_ids, transaction_ids = set(), set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, Transaction):
+            agent_ids.update(_seen_values(obj, "agent_id"))
+            transaction_ids.add(_pk(obj))
+        elif isinstance(obj, TransactionCommission):
+            agent_ids.update(_seen_values(obj, "agent_id"))
+        elif isinstance(obj, Milestone):
+            transaction_ids.update(_seen_values(obj, "transaction_id"))
+
+    if not (agent_ids or transaction_ids):
+        return
+    conn = session.connection()
+    if transaction_ids:
+        agent_ids.update(conn.execute(
+            select(Transaction.agent_id).where(Transaction.id.in_(transaction_ids))
+        ).scalars())
+    agent_ids.discard(None)
+    if agent_ids:
+        conn.execute(
+            update(PipelineForecast)
+            .where(PipelineForecast.agent_id.in_(agent_ids))
+            .values(result=None, invalidated_at=func.clock_timestamp(), updated_at=func.now())
+        )
@@ -14,13 +14,16 @@ from .action_item import ActionItem
 from .notification_rule import NotificationRule
 from .notification_log import NotificationLog
 from .email_draft import EmailDraft
+from .webhook_event import WebhookEvent
 
 # Phase 4: AI Advisor
 from .ai_advisor import AIAdvisorMessage
 from .risk_alert import RiskAlert
 
 # Phase 5: Money
-from .commission import CommissionConfig, TransactionCommission, CommissionSplit
+from .commission import (
+    CommissionConfig, TransactionCommission, CommissionSplit, AgentCommissionYTD, PipelineForecast,
+)
 
 # Phase 3: Party Portal
 from .portal import PortalAccess, PortalAccessLog, PortalUpload
@@ -29,7 +32,17 @@ from .portal import PortalAccess, PortalAccessLog, PortalUpload
 from .document import DocumentTemplate, GeneratedDocument
 
 # Phase 7: Brokerage
-from .brokerage import Brokerage, Team, TeamMember, ComplianceRule, ComplianceViolation, PerformanceSnapshot
+from .brokerage import (
+    Brokerage, Team, TeamMember, ComplianceRule, ComplianceViolation, ComplianceReevaluation, PerformanceSnapshot,
+)
+from .analytics import AnalyticsDailyRollup, AnalyticsRollupChange
+
+# Maintenance
+from .maintenance_checkpoint import MaintenanceCheckpoint
+from .batch_job import BatchJobPartition
+
+# Exports
+from .export_watermark import ExportWatermark
 
 __all__ = [
     "User",
@@ -49,6 +62,7 @@ __all__ = [
     "NotificationRule",
     "NotificationLog",
     "EmailDraft",
+    "WebhookEvent",
     # Phase 4
     "AIAdvisorMessage",
     "RiskAlert",
@@ -56,6 +70,8 @@ __all__ = [
     "CommissionConfig",
     "TransactionCommission",
     "CommissionSplit",
+    "AgentCommissionYTD",
+    "PipelineForecast",
     # Phase 3
     "PortalAccess",
     "PortalAccessLog",
@@ -69,5 +85,19 @@ __all__ = [
     "TeamMember",
     "ComplianceRule",
     "ComplianceViolation",
+    "ComplianceReevaluation",
     "PerformanceSnapshot",
+    "AnalyticsDailyRollup",
+    "AnalyticsRollupChange",
+    # Maintenance
+    "MaintenanceCheckpoint",
+    "BatchJobPartition",
+    # Exports
+    "ExportWatermark",
 ]
+
+# Register the session hooks that queue compliance re-evaluation and rollup refreshes and
+# invalidate pipeline forecasts on writes
+from app import compliance_triggers  # noqa: E402,F401
+from app import analytics_triggers  # noqa: E402,F401
+from app import forecast_triggers  # noqa: E402,F401
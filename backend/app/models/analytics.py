@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Integer, Numeric, Date, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP
+from .base_model import BaseModel
+
+
+class AnalyticsDailyRollup(BaseModel):
+    """Brokerage analytics for one agent on one UTC day.
+
+    Every metric is additive so any date range or grouping is a plain SUM.
+    Deals opened and violations are bucketed by their creation/resolution day,
+    closed deals and pipeline by (expected) closing day. team_id and
+    brokerage_id are the agent's current team and brokerage.
+    """
+    __tablename__ = "analytics_daily_rollups"
+
+    day = Column(Date, nullable=False)
+    agent_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    team_id = Column(UUID(as_uuid=True), ForeignKey("teams.id", ondelete="SET NULL"), nullable=True)
+    brokerage_id = Column(UUID(as_uuid=True), ForeignKey("brokerages.id", ondelete="CASCADE"), nullable=True)
+
+    deals_opened = Column(Integer, nullable=False, default=0)
+    deals_closed = Column(Integer, nullable=False, default=0)
+    closed_volume = Column(Numeric(16, 2), nullable=False, default=0)
+    closed_commission = Column(Numeric(14, 2), nullable=False, default=0)
+    days_to_close_total = Column(Numeric(12, 2), nullable=False, default=0)
+    days_to_close_count = Column(Integer, nullable=False, default=0)  # closed deals with both dates set
+    pipeline_deals = Column(Integer, nullable=False, default=0)
+    pipeline_volume = Column(Numeric(16, 2), nullable=False, default=0)
+    pipeline_commission = Column(Numeric(14, 2), nullable=False, default=0)
+    violations_opened = Column(Integer, nullable=False, default=0)
+    violations_resolved = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("uq_analytics_daily_rollups_agent_day", "agent_id", "day", unique=True),
+        Index("ix_analytics_daily_rollups_brokerage_day", "brokerage_id", "day"),
+        Index("ix_analytics_daily_rollups_team_day", "team_id", "day"),
+    )
+
+
+class AnalyticsRollupChange(BaseModel):
+    """An (agent, day) rollup whose source rows changed and awaits refresh."""
+    __tablename__ = "analytics_rollup_changes"
+
+    # No foreign key: keys are queued in the same flush that may delete the agent's rows
+    agent_id = Column(UUID(as_uuid=True), nullable=False)
+    day = Column(Date, nullable=False)
+    requested_at = Column(TIMESTAMP(timezone=True), nullable=False)  # latest write; debounces the refresh
+
+    __table_args__ = (
+        Index("uq_analytics_rollup_changes_key", "agent_id", "day", unique=True),
+    )
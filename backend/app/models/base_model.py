@@ -1,5 +1,6 @@
-from sqlalchemy import Column
+from sqlalchemy import Column, event
 from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP
+from sqlalchemy.orm import declared_attr
 from sqlalchemy.sql import func
 from app.database import Base
 import uuid
@@ -12,3 +13,30 @@ class BaseModel(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class MonthlyPartitionedMixin:
+    """Range-partition the table by created_at month (see app.partitioning).
+
+    Postgres requires the partition key in the primary key, so the table's
+    key is (id, created_at) while the ORM still identifies rows by id alone.
+    Such tables cannot be the target of foreign keys.
+    """
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False, primary_key=True)
+
+    @declared_attr.directive
+    def __table_args__(cls):
+        return {"postgresql_partition_by": "RANGE (created_at)"}
+
+    @declared_attr.directive
+    def __mapper_args__(cls):
+        return {"primary_key": [cls.__table__.c.id]}
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_initial_partitions(target, connection, tables=(), **kw):
+    """Give partitioned tables made by create_all their monthly and DEFAULT partitions."""
+    from app.partitioning import ensure_partitions
+    for table in tables:
+        if table.dialect_options["postgresql"].get("partition_by"):
+            ensure_partitions(connection, table.name)
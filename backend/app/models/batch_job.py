@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Integer, Float, Text, Index
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from .base_model import BaseModel
+
+
+class BatchJobPartition(BaseModel):
+    """One partition (e.g. a brokerage) of a fanned-out nightly job run."""
+    __tablename__ = "batch_job_partitions"
+
+    job_name = Column(String(100), nullable=False)
+    run_key = Column(String(50), nullable=False)  # e.g. the run date; partitions of a run resume under it
+    partition_key = Column(String(100), nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    rows = Column(Integer, nullable=True)
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+    error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("uq_batch_job_partitions_key", "job_name", "run_key", "partition_key", unique=True),
+    )
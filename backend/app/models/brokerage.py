@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Integer, Text, ForeignKey, Numeric
+from sqlalchemy import Column, String, Boolean, Integer, Text, ForeignKey, Numeric, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSON, TIMESTAMP
 from sqlalchemy.orm import relationship
 from .base_model import BaseModel
@@ -53,8 +53,10 @@ class ComplianceRule(BaseModel):
     brokerage_id = Column(UUID(as_uuid=True), ForeignKey("brokerages.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(200), nullable=False)
     description = Column(Text, nullable=True)
-    rule_type = Column(String(50), nullable=False)  # document_required, deadline_check, commission_cap, custom
-    conditions = Column(JSON, nullable=False)  # rule logic as JSON
+    # Evaluated nightly: milestone_deadline, required_party, required_document,
+    # required_communication, health_score_min, closing_date_required
+    rule_type = Column(String(50), nullable=False)
+    conditions = Column(JSON, nullable=False)  # rule parameters as JSON, plus optional applies_to_status
     severity = Column(String(20), nullable=False, default="warning")  # info, warning, violation
     is_active = Column(Boolean, default=True)
 
@@ -81,6 +83,41 @@ class ComplianceViolation(BaseModel):
     agent = relationship("User", foreign_keys=[agent_id])
     resolver = relationship("User", foreign_keys=[resolved_by])
 
+    __table_args__ = (
+        # Per-agent reads: analytics rollup refresh, agent dashboards
+        Index("ix_compliance_violations_agent_id", "agent_id"),
+        # Compliance dashboard: recent violations per rule, and the unresolved
+        # counts and pages, which stay small however long the history grows
+        Index("ix_compliance_violations_rule_created", "rule_id", "created_at"),
+        Index(
+            "ix_compliance_violations_unresolved_severity", "rule_id", "severity",
+            postgresql_where=text("resolved = false"),
+        ),
+        Index(
+            "ix_compliance_violations_unresolved_created", "created_at", "id",
+            postgresql_where=text("resolved = false"),
+        ),
+        # At most one open violation per (rule, transaction); the evaluator upserts against it
+        Index(
+            "uq_compliance_violations_open", "rule_id", "transaction_id",
+            unique=True, postgresql_where=text("resolved = false"),
+        ),
+    )
+
+
+class ComplianceReevaluation(BaseModel):
+    """A (transaction, rule type) pair whose inputs changed and awaits re-evaluation."""
+    __tablename__ = "compliance_reevaluations"
+
+    # No foreign key: pairs are queued in the same flush that may delete the transaction
+    transaction_id = Column(UUID(as_uuid=True), nullable=False)
+    rule_type = Column(String(50), nullable=False)
+    requested_at = Column(TIMESTAMP(timezone=True), nullable=False)  # latest write; debounces re-evaluation
+
+    __table_args__ = (
+        Index("uq_compliance_reevaluations_pair", "transaction_id", "rule_type", unique=True),
+    )
+
 
 class PerformanceSnapshot(BaseModel):
     __tablename__ = "performance_snapshots"
@@ -89,8 +126,14 @@ class PerformanceSnapshot(BaseModel):
     brokerage_id = Column(UUID(as_uuid=True), ForeignKey("brokerages.id"), nullable=True)
     period_start = Column(TIMESTAMP(timezone=True), nullable=False)
     period_end = Column(TIMESTAMP(timezone=True), nullable=False)
-    metrics = Column(JSON, nullable=False)  # { transactions_closed, volume, avg_days_to_close, commission_total, ... }
+    # { active_deals, closed_ytd, closed_mtd, lost_ytd, volume_ytd, commission_ytd, avg_days_to_close }
+    metrics = Column(JSON, nullable=False)
 
     # Relationships
     agent = relationship("User", foreign_keys=[agent_id])
     brokerage = relationship("Brokerage", foreign_keys=[brokerage_id])
+
+    __table_args__ = (
+        # One snapshot per agent per day; the nightly job upserts against it
+        Index("uq_performance_snapshots_agent_period", "agent_id", "period_end", unique=True),
+    )
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Boolean, ForeignKey, Numeric
-from sqlalchemy.dialects.postgresql import UUID, JSON
+from sqlalchemy import Column, String, Boolean, ForeignKey, Numeric, Index, Integer
+from sqlalchemy.dialects.postgresql import UUID, JSON, TIMESTAMP
 from sqlalchemy.orm import relationship
 from .base_model import BaseModel
 
@@ -14,7 +14,11 @@ class CommissionConfig(BaseModel):
     tiered_rates = Column(JSON, nullable=True)
     broker_split_percentage = Column(Numeric(5, 4), nullable=True)
     default_referral_fee_percentage = Column(Numeric(5, 4), nullable=True)
-    team_splits = Column(JSON, nullable=True)
+    team_splits = Column(JSON, nullable=True)  # {"members": [{name, percentage}]} of the agent's share
+    # Plan (see app.services.commission_plan)
+    graduated_splits = Column(JSON, nullable=True)  # {"tiers": [{min, broker_split_percentage}]} by YTD gross
+    annual_cap = Column(Numeric(12, 2), nullable=True)  # most company dollar per plan year
+    plan_year_start_month = Column(Integer, nullable=False, default=1, server_default="1")
 
     # Relationships
     agent = relationship("User", foreign_keys=[agent_id])
@@ -35,6 +39,9 @@ class TransactionCommission(BaseModel):
     actual_net = Column(Numeric(12, 2), nullable=True)
     actual_gross = Column(Numeric(12, 2), nullable=True)
     status = Column(String(20), nullable=False, default="projected")
+    # Fixed when the commission is paid (closing date, else payment time): picks its plan year for
+    # posting, reversing and rebuilding the agent's position
+    plan_year_date = Column(TIMESTAMP(timezone=True), nullable=True)
     is_dual_agency = Column(Boolean, default=False)
     notes = Column(String, nullable=True)
 
@@ -43,17 +50,62 @@ class TransactionCommission(BaseModel):
     agent = relationship("User", foreign_keys=[agent_id])
     splits = relationship("CommissionSplit", back_populates="commission", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Pipeline summary groups an agent's commissions by status
+        Index("ix_transaction_commissions_agent_status", "agent_id", "status"),
+    )
+
 
 class CommissionSplit(BaseModel):
     __tablename__ = "commission_splits"
 
-    transaction_commission_id = Column(UUID(as_uuid=True), ForeignKey("transaction_commissions.id", ondelete="CASCADE"), nullable=False)
+    transaction_commission_id = Column(UUID(as_uuid=True), ForeignKey("transaction_commissions.id", ondelete="CASCADE"), nullable=False, index=True)
     split_type = Column(String(20), nullable=False)
     recipient_name = Column(String, nullable=False)
     is_percentage = Column(Boolean, default=True)
     percentage = Column(Numeric(5, 4), nullable=True)
     flat_amount = Column(Numeric(12, 2), nullable=True)
     calculated_amount = Column(Numeric(12, 2), nullable=True)
+    # Generated by the agent's commission plan and regenerated on recalculation
+    from_plan = Column(Boolean, nullable=False, default=False, server_default="false")
 
     # Relationships
     commission = relationship("TransactionCommission", back_populates="splits")
+
+
+class AgentCommissionYTD(BaseModel):
+    """An agent's running position in one plan year, posted as commissions are paid.
+
+    ``gross`` is commission income after referral fees, the base graduated
+    splits and caps are measured against; ``company_dollar`` is the broker
+    splits paid. commission_tasks.rebuild_commission_ytd recomputes it from
+    the paid commissions.
+    """
+    __tablename__ = "agent_commission_ytd"
+
+    agent_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    plan_year = Column(Integer, nullable=False)
+    gross = Column(Numeric(14, 2), nullable=False, default=0)
+    company_dollar = Column(Numeric(14, 2), nullable=False, default=0)
+    deals = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("uq_agent_commission_ytd_agent_year", "agent_id", "plan_year", unique=True),
+    )
+
+
+class PipelineForecast(BaseModel):
+    """Cached Monte Carlo forecast of an agent's open pipeline.
+
+    app.forecast_triggers clears ``result`` (and stamps ``invalidated_at``)
+    whenever the agent's deals, commissions or milestones change; a forecast
+    computed from data read before that stamp is never stored over it.
+    """
+    __tablename__ = "pipeline_forecasts"
+
+    agent_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), unique=True, nullable=False)
+    simulations = Column(Integer, nullable=False)
+    months = Column(Integer, nullable=False)
+    result = Column(JSON, nullable=True)
+    computed_at = Column(TIMESTAMP(timezone=True), nullable=True)  # when its inputs were read
+    invalidated_at = Column(TIMESTAMP(timezone=True), nullable=True)
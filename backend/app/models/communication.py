@@ -1,10 +1,10 @@
 from sqlalchemy import Column, String, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID, JSON, TIMESTAMP
 from sqlalchemy.orm import relationship
-from .base_model import BaseModel
+from .base_model import BaseModel, MonthlyPartitionedMixin
 
 
-class Communication(BaseModel):
+class Communication(MonthlyPartitionedMixin, BaseModel):
     __tablename__ = "communications"
 
     transaction_id = Column(UUID(as_uuid=True), ForeignKey("transactions.id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Text, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSON, TIMESTAMP
 from sqlalchemy.orm import relationship
 from .base_model import BaseModel
@@ -28,6 +28,10 @@ class GeneratedDocument(BaseModel):
     title = Column(String(200), nullable=False)
     file_url = Column(String, nullable=True)  # S3/MinIO URL of generated PDF
     html_content = Column(Text, nullable=True)  # cached HTML before PDF render
+    html_hash = Column(String(64), nullable=True)  # sha256 of html_content; identical HTML shares one PDF
+    pdf_status = Column(String(20), nullable=True, server_default="pending")  # pending, rendering, ready, failed; null = never requested
+    pdf_error = Column(Text, nullable=True)
+    pdf_started_at = Column(TIMESTAMP(timezone=True), nullable=True)  # when the current render began; a stale one can be requeued
     generation_data = Column(JSON, nullable=True)  # snapshot of data used
     version = Column(Integer, nullable=False, default=1)
     generated_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
@@ -36,3 +40,7 @@ class GeneratedDocument(BaseModel):
     transaction = relationship("Transaction", foreign_keys=[transaction_id])
     template = relationship("DocumentTemplate", back_populates="generated_docs")
     generator = relationship("User", foreign_keys=[generated_by])
+
+    __table_args__ = (
+        Index("ix_generated_documents_html_hash", "html_hash"),
+    )
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Integer
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from .base_model import BaseModel
+
+
+class ExportWatermark(BaseModel):
+    """How far a dataset has been exported; the next incremental run starts after it."""
+    __tablename__ = "export_watermarks"
+
+    dataset = Column(String(100), unique=True, nullable=False)
+    # Rows with updated_at up to and including this have been written
+    exported_through = Column(TIMESTAMP(timezone=True), nullable=True)
+    last_rows = Column(Integer, nullable=False, default=0)
+    last_files = Column(Integer, nullable=False, default=0)
+    last_run_at = Column(TIMESTAMP(timezone=True), nullable=True)
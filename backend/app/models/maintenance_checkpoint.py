@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Integer
+from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP
+from .base_model import BaseModel
+
+
+class MaintenanceCheckpoint(BaseModel):
+    """Progress of a batched maintenance job, so a crashed run resumes where it stopped."""
+    __tablename__ = "maintenance_checkpoints"
+
+    job_name = Column(String(100), unique=True, nullable=False)
+    # Keyset position: the (created_at, id) of the last row processed
+    last_created_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    last_id = Column(UUID(as_uuid=True), nullable=True)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    batches = Column(Integer, nullable=False, default=0)
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)  # null while a run is in progress
@@ -14,6 +14,7 @@ class NotificationRule(BaseModel):
     recipient_roles = Column(ARRAY(String), nullable=False, default=[])
     escalation_enabled = Column(Boolean, nullable=False, default=True)
     escalation_days = Column(ARRAY(Integer), nullable=False, default=[1, 3, 7])
+    digest_enabled = Column(Boolean, nullable=False, default=False, server_default="false")  # batch into per-recipient digests
     template_id = Column(UUID(as_uuid=True), ForeignKey("email_templates.id", ondelete="SET NULL"), nullable=True)
     is_active = Column(Boolean, nullable=False, default=True)
 
@@ -1,7 +1,7 @@
 from sqlalchemy import Column, String, Boolean, Integer, Text, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID, JSON, TIMESTAMP
 from sqlalchemy.orm import relationship
-from .base_model import BaseModel
+from .base_model import BaseModel, MonthlyPartitionedMixin
 
 
 class PortalAccess(BaseModel):
@@ -22,7 +22,7 @@ class PortalAccess(BaseModel):
     access_logs = relationship("PortalAccessLog", back_populates="portal_access", cascade="all, delete-orphan")
 
 
-class PortalAccessLog(BaseModel):
+class PortalAccessLog(MonthlyPartitionedMixin, BaseModel):
     __tablename__ = "portal_access_logs"
 
     portal_access_id = Column(UUID(as_uuid=True), ForeignKey("portal_access.id", ondelete="CASCADE"), nullable=False)
@@ -1,9 +1,22 @@
-from sqlalchemy import Column, String, Float, ForeignKey
+from sqlalchemy import Column, String, Float, ForeignKey, Index, Numeric, Computed
 from sqlalchemy.dialects.postgresql import UUID, JSON, TIMESTAMP
 from sqlalchemy.orm import relationship
 from .base_model import BaseModel
 
 
+def json_amount_sql(column: str) -> str:
+    """SQL for the amount in a money JSON column: a bare number or {"value"|"amount": ...}.
+
+    Anything else, including amounts too large for NUMERIC(14, 2), is NULL
+    rather than a failed cast.
+    """
+    raw = (
+        f"CASE json_typeof({column}) WHEN 'number' THEN {column}::text "
+        f"WHEN 'object' THEN COALESCE(NULLIF({column}->>'value', ''), {column}->>'amount') END"
+    )
+    return f"CASE WHEN ({raw}) ~ '^-?[0-9]{{1,12}}(\\.[0-9]+)?$' THEN ({raw})::numeric(14, 2) END"
+
+
 class Transaction(BaseModel):
     __tablename__ = "transactions"
 
@@ -17,6 +30,9 @@ class Transaction(BaseModel):
     property_zip = Column(String, nullable=True)
     purchase_price = Column(JSON, nullable=True)
     earnest_money_amount = Column(JSON, nullable=True)
+    # Typed copies of the two JSON amounts, kept in sync by Postgres, for SQL sums and range filters
+    purchase_price_value = Column(Numeric(14, 2), Computed(json_amount_sql("purchase_price"), persisted=True))
+    earnest_money_value = Column(Numeric(14, 2), Computed(json_amount_sql("earnest_money_amount"), persisted=True))
     closing_date = Column(TIMESTAMP(timezone=True), nullable=True)
     contract_document_url = Column(String, nullable=True)
     special_stipulations = Column(JSON, nullable=True)
@@ -45,3 +61,9 @@ class Transaction(BaseModel):
     ai_messages = relationship("AIAdvisorMessage", back_populates="transaction", cascade="all, delete-orphan")
     email_drafts = relationship("EmailDraft", back_populates="transaction", cascade="all, delete-orphan")
     notification_logs = relationship("NotificationLog", back_populates="transaction", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Per-agent aggregates (performance summary, pipeline) filter on both
+        Index("ix_transactions_agent_status", "agent_id", "status"),
+        Index("ix_transactions_purchase_price_value", "purchase_price_value"),
+    )
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Integer, Index, text
+from sqlalchemy.dialects.postgresql import JSON, TIMESTAMP
+from .base_model import BaseModel
+
+
+class WebhookEvent(BaseModel):
+    """Provider webhook staged for batched processing by the delivery worker."""
+    __tablename__ = "webhook_events"
+
+    provider = Column(String(30), nullable=False, default="resend")
+    event_id = Column(String(200), unique=True, nullable=False)  # svix-id, for de-duplication
+    event_type = Column(String(50), nullable=False)
+    message_id = Column(String(200), nullable=True)
+    payload = Column(JSON, nullable=False)
+    occurred_at = Column(TIMESTAMP(timezone=True), nullable=True)  # provider timestamp, for ordering
+    processed_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_webhook_events_pending", "created_at", postgresql_where=text("processed_at IS NULL")),
+    )
@@ -0,0 +1,116 @@
+"""Monthly range partitions for the append-heavy log tables.
+
+``notification_log``, ``portal_access_logs`` and ``communications`` are
+partitioned by ``RANGE (created_at)`` with one partition per UTC month plus a
+DEFAULT partition that catches rows outside the pre-created range. Retention
+drops whole partitions instead of deleting rows.
+
+All helpers take a synchronous SQLAlchemy connection so they can run from
+Celery tasks, Alembic migrations and ``metadata.create_all`` hooks alike.
+"""
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("notification_log", "portal_access_logs", "communications")
+
+# Partitions are created this many months ahead so inserts never fall through
+# to the DEFAULT partition (which would block creating that month later)
+MONTHS_AHEAD = 3
+
+_PARTITION_NAME = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def month_start(value) -> date:
+    """First day of the UTC month containing ``value`` (a date or datetime)."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def is_partitioned(conn, table: str) -> bool:
+    return conn.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+        ),
+        {"table": table},
+    ).first() is not None
+
+
+def create_month_partition(conn, table: str, month: date) -> str:
+    """Create the partition holding ``month`` if it does not exist yet."""
+    name = partition_name(table, month)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+        f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    ))
+    return name
+
+
+def ensure_partitions(conn, table: str, start: Optional[date] = None, months_ahead: int = MONTHS_AHEAD) -> List[str]:
+    """Ensure monthly partitions from ``start`` (default: this month) through ``months_ahead``, plus DEFAULT."""
+    this_month = month_start(datetime.now(timezone.utc))
+    month = month_start(start) if start else this_month
+    last = add_months(this_month, months_ahead)
+    names = []
+    while month <= last:
+        names.append(create_month_partition(conn, table, month))
+        month = add_months(month, 1)
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+    return names
+
+
+def list_month_partitions(conn, table: str) -> List[Tuple[str, date]]:
+    """(partition name, month) for each monthly partition of ``table``, oldest first."""
+    names = conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :table AND pg_table_is_visible(parent.oid)"
+        ),
+        {"table": table},
+    ).scalars().all()
+    partitions = []
+    for name in names:
+        match = _PARTITION_NAME.search(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def drop_partitions_before(conn, table: str, cutoff: datetime) -> List[str]:
+    """Detach and drop every monthly partition whose whole range is older than ``cutoff``.
+
+    Rows between the start of the cutoff month and the cutoff itself stay in
+    place; callers that need exact retention delete that remainder.
+    """
+    boundary = month_start(cutoff)
+    dropped = []
+    for name, month in list_month_partitions(conn, table):
+        if add_months(month, 1) > boundary:
+            break
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    if dropped:
+        logger.info(f"Dropped {len(dropped)} expired partitions of {table}: {', '.join(dropped)}")
+    return dropped
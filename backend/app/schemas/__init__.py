@@ -32,10 +32,12 @@ from .ai_advisor import (
 
 # Phase 5: Money
 from .commission import (
-    CommissionConfigCreate, CommissionConfigUpdate, CommissionConfigResponse,
+    CommissionConfigCreate, CommissionConfigUpdate, CommissionConfigResponse, CommissionPositionResponse,
     TransactionCommissionCreate, TransactionCommissionUpdate, TransactionCommissionResponse,
     CommissionSplitCreate, CommissionSplitResponse,
     PipelineSummary, CSVExportRequest,
+    CommissionScenario, ScenarioRequest, ScenarioTotals, ScenarioResult, ScenarioResponse,
+    ForecastMonth, ForecastTotals, ForecastDeal, PipelineForecastResponse,
 )
 
 # Phase 3: Party Portal
@@ -55,6 +57,10 @@ from .brokerage import (
     BrokerageCreate, BrokerageUpdate, BrokerageResponse,
     TeamCreate, TeamUpdate, TeamResponse, TeamMemberAdd, TeamMemberResponse,
     ComplianceRuleCreate, ComplianceRuleUpdate, ComplianceRuleResponse,
-    ComplianceViolationResponse, ComplianceDashboardResponse,
+    ComplianceViolationResponse, ComplianceDashboardFilters, ComplianceDashboardResponse,
     PerformanceSnapshotResponse, AgentPerformanceSummary,
+    AnalyticsRow, BrokerageAnalyticsResponse,
 )
+
+# Exports
+from .export import ParquetExportRequest, ParquetExportStarted, ExportDatasetStatus
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 from uuid import UUID
 from pydantic import BaseModel, ConfigDict
@@ -89,7 +89,7 @@ class TeamResponse(BaseModel):
 class ComplianceRuleCreate(BaseModel):
     name: str
     description: Optional[str] = None
-    rule_type: str  # document_required, deadline_check, commission_cap, custom
+    rule_type: str  # milestone_deadline, required_party, required_document, required_communication, health_score_min, closing_date_required
     conditions: dict
     severity: str = "warning"
     is_active: bool = True
@@ -133,11 +133,22 @@ class ComplianceViolationResponse(BaseModel):
     created_at: datetime
 
 
+class ComplianceDashboardFilters(BaseModel):
+    team_id: Optional[UUID] = None
+    agent_id: Optional[UUID] = None
+    rule_id: Optional[UUID] = None
+    start_date: Optional[date] = None  # violations raised on or after
+    end_date: Optional[date] = None  # violations raised on or before
+    resolved: Optional[bool] = None  # recent_violations only
+
+
 class ComplianceDashboardResponse(BaseModel):
     total_violations: int
     unresolved_count: int
     by_severity: dict  # {info: N, warning: N, violation: N}
-    recent_violations: list[ComplianceViolationResponse]
+    unresolved_by_severity: dict
+    recent_violations: list[ComplianceViolationResponse]  # newest first, one page
+    next_cursor: Optional[str] = None
 
 
 # --- Performance Schemas ---
@@ -161,4 +172,31 @@ class AgentPerformanceSummary(BaseModel):
     total_volume: float
     total_commission: float
     avg_days_to_close: Optional[float] = None
+    median_days_to_close: Optional[float] = None
     active_transactions: int
+
+
+# --- Analytics Schemas ---
+
+class AnalyticsRow(BaseModel):
+    """Rollup totals for one group; dimensions not grouped by are None."""
+    agent_id: Optional[UUID] = None
+    team_id: Optional[UUID] = None
+    period: Optional[date] = None  # first day of the day/week/month bucket
+    deals_opened: int
+    deals_closed: int
+    closed_volume: float
+    closed_commission: float
+    avg_days_to_close: Optional[float] = None
+    pipeline_deals: int  # active deals expected to close in the period
+    pipeline_volume: float
+    pipeline_commission: float
+    violations_opened: int
+    violations_resolved: int
+
+
+class BrokerageAnalyticsResponse(BaseModel):
+    start_date: date
+    end_date: date
+    group_by: list[str]
+    rows: list[AnalyticsRow]
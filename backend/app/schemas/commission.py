@@ -2,7 +2,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 from uuid import UUID
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 # --- Commission Config Schemas ---
@@ -15,6 +15,9 @@ class CommissionConfigCreate(BaseModel):
     broker_split_percentage: Optional[Decimal] = None
     default_referral_fee_percentage: Optional[Decimal] = None
     team_splits: Optional[dict] = None
+    graduated_splits: Optional[dict] = None  # {"tiers": [{min, broker_split_percentage}]} by YTD gross
+    annual_cap: Optional[Decimal] = None
+    plan_year_start_month: int = Field(1, ge=1, le=12)
 
 
 class CommissionConfigUpdate(BaseModel):
@@ -25,6 +28,9 @@ class CommissionConfigUpdate(BaseModel):
     broker_split_percentage: Optional[Decimal] = None
     default_referral_fee_percentage: Optional[Decimal] = None
     team_splits: Optional[dict] = None
+    graduated_splits: Optional[dict] = None  # {"tiers": [{min, broker_split_percentage}]} by YTD gross
+    annual_cap: Optional[Decimal] = None
+    plan_year_start_month: Optional[int] = Field(None, ge=1, le=12)
 
 
 class CommissionConfigResponse(BaseModel):
@@ -39,10 +45,23 @@ class CommissionConfigResponse(BaseModel):
     broker_split_percentage: Optional[Decimal] = None
     default_referral_fee_percentage: Optional[Decimal] = None
     team_splits: Optional[dict] = None
+    graduated_splits: Optional[dict] = None
+    annual_cap: Optional[Decimal] = None
+    plan_year_start_month: int = 1
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
 
+class CommissionPositionResponse(BaseModel):
+    """The agent's running plan-year position that graduated splits and caps are applied against."""
+    plan_year: int
+    gross: Decimal  # commission income after referral fees
+    company_dollar: Decimal
+    deals: int
+    company_split_percentage: Decimal  # rate the next dollar of gross is split at
+    cap_remaining: Optional[Decimal] = None
+
+
 # --- Commission Split Schemas ---
 
 class CommissionSplitCreate(BaseModel):
@@ -63,6 +82,7 @@ class CommissionSplitResponse(BaseModel):
     percentage: Optional[Decimal] = None
     flat_amount: Optional[Decimal] = None
     calculated_amount: Optional[Decimal] = None
+    from_plan: bool = False
 
 
 # --- Transaction Commission Schemas ---
@@ -125,10 +145,84 @@ class PipelineSummary(BaseModel):
     transaction_count: int
     avg_commission_rate: Optional[Decimal] = None
     by_status: dict  # {projected: {count, gross, net}, pending: ..., paid: ...}
-    by_month: list[dict]  # [{month, gross, net, count}]
+    by_month: list[dict]  # [{month: "YYYY-MM", gross, net, count}] by expected closing month
 
 
 class CSVExportRequest(BaseModel):
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
     status: Optional[str] = None
+
+
+# --- Scenario Schemas ---
+
+class CommissionScenario(BaseModel):
+    """Hypothetical changes applied to every open deal; unset fields keep each deal as recorded."""
+    name: str
+    rate: Optional[Decimal] = None  # percentage rate for every priced deal
+    tiers: Optional[list[dict]] = None  # [{min, rate}]; the highest tier reached applies to the whole price
+    broker_split_percentage: Optional[Decimal] = None  # replaces each deal's broker splits, e.g. 0.25 for 75/25
+    annual_cap: Optional[Decimal] = None  # broker splits stop once this much has been paid
+    cap_paid_to_date: Decimal = Decimal("0")
+    fall_out_transaction_ids: list[UUID] = []
+    fall_out_rate: Optional[Decimal] = None  # expected share of the remaining deals that fall through
+
+
+class ScenarioRequest(BaseModel):
+    scenarios: list[CommissionScenario]
+
+
+class ScenarioTotals(BaseModel):
+    deal_count: float  # expected deals once fall-out is applied
+    gross: float
+    broker_split: float
+    other_splits: float
+    net: float
+
+
+class ScenarioResult(BaseModel):
+    name: str
+    totals: ScenarioTotals
+    delta_gross: float
+    delta_net: float
+
+
+class ScenarioResponse(BaseModel):
+    deal_count: int
+    baseline: ScenarioTotals
+    scenarios: list[ScenarioResult]
+
+
+# --- Forecast Schemas ---
+
+class ForecastMonth(BaseModel):
+    month: str  # YYYY-MM
+    expected_closings: float
+    expected: float  # mean income
+    p10: float
+    p50: float
+    p90: float
+
+
+class ForecastTotals(BaseModel):
+    expected: float
+    p10: float
+    p50: float
+    p90: float
+
+
+class ForecastDeal(BaseModel):
+    transaction_id: UUID
+    close_probability: float
+    expected_income: float  # within the horizon, after slippage
+
+
+class PipelineForecastResponse(BaseModel):
+    generated_at: datetime
+    cached: bool = False
+    simulations: int  # run, after capping simulations x deals
+    deal_count: int
+    unscheduled_deals: int  # open deals without a closing date; not forecast
+    total: ForecastTotals
+    by_month: list[ForecastMonth]
+    deals: list[ForecastDeal]
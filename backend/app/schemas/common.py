@@ -7,6 +7,11 @@ class PaginationParams(BaseModel):
     limit: int = Field(10, ge=1, le=100)
 
 
+class CursorParams(BaseModel):
+    cursor: Optional[str] = None  # opaque; the previous page's next_cursor
+    limit: int = Field(20, ge=1, le=100)
+
+
 class APIResponse(BaseModel):
     success: bool
     message: Optional[str] = None
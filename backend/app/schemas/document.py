@@ -30,7 +30,9 @@ class GeneratedDocumentResponse(BaseModel):
     template_id: Optional[UUID] = None
     document_type: str
     title: str
-    file_url: Optional[str] = None
+    file_url: Optional[str] = None  # set once pdf_status is ready
+    pdf_status: Optional[str] = None  # pending, rendering, ready, failed
+    pdf_error: Optional[str] = None
     version: int
     generated_by: Optional[UUID] = None
     created_at: datetime
@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+
+
+# --- Export Schemas ---
+
+class ParquetExportRequest(BaseModel):
+    datasets: Optional[list[str]] = None  # default: all of transactions, milestones, transaction_commissions, commission_splits
+    full: bool = False  # rewrite every row instead of only those changed since the last export
+
+
+class ParquetExportStarted(BaseModel):
+    task_id: str
+    datasets: list[str]
+    full: bool
+
+
+class ExportDatasetStatus(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    dataset: str
+    exported_through: Optional[datetime] = None
+    last_rows: int
+    last_files: int
+    last_run_at: Optional[datetime] = None
@@ -13,6 +13,7 @@ class NotificationRuleCreate(BaseModel):
     recipient_roles: list[str] = []
     escalation_enabled: bool = True
     escalation_days: list[int] = [1, 3, 7]
+    digest_enabled: bool = False
     template_id: Optional[UUID] = None
     is_active: bool = True
 
@@ -24,6 +25,7 @@ class NotificationRuleUpdate(BaseModel):
     recipient_roles: Optional[list[str]] = None
     escalation_enabled: Optional[bool] = None
     escalation_days: Optional[list[int]] = None
+    digest_enabled: Optional[bool] = None
     template_id: Optional[UUID] = None
     is_active: Optional[bool] = None
 
@@ -39,6 +41,7 @@ class NotificationRuleResponse(BaseModel):
     recipient_roles: list[str]
     escalation_enabled: bool
     escalation_days: list[int]
+    digest_enabled: bool
     template_id: Optional[UUID] = None
     is_active: bool
     created_at: datetime
@@ -1,4 +1,6 @@
+import base64
 import logging
+from datetime import date, datetime, timedelta, time, timezone
 from typing import List, Optional
 from uuid import UUID
 from fastapi import HTTPException
@@ -10,12 +12,14 @@ from app.models.brokerage import (
     ComplianceRule, ComplianceViolation, PerformanceSnapshot,
 )
 from app.models.user import User
+from app.schemas.common import CursorParams
 from app.schemas.brokerage import (
     BrokerageCreate, BrokerageUpdate, BrokerageResponse,
     TeamCreate, TeamUpdate, TeamResponse, TeamMemberAdd, TeamMemberResponse,
     ComplianceRuleCreate, ComplianceRuleUpdate, ComplianceRuleResponse,
-    ComplianceViolationResponse, ComplianceDashboardResponse,
+    ComplianceViolationResponse, ComplianceDashboardFilters, ComplianceDashboardResponse,
     PerformanceSnapshotResponse, AgentPerformanceSummary,
+    AnalyticsRow, BrokerageAnalyticsResponse,
 )
 
 logger = logging.getLogger(__name__)
@@ -139,31 +143,84 @@ async def update_compliance_rule(
     return ComplianceRuleResponse.model_validate(rule)
 
 
+def _encode_cursor(created_at: datetime, violation_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{violation_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, violation_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(violation_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 async def get_compliance_dashboard(
-    brokerage_id: UUID, db: AsyncSession
+    brokerage_id: UUID,
+    db: AsyncSession,
+    filters: Optional[ComplianceDashboardFilters] = None,
+    page: Optional[CursorParams] = None,
 ) -> ComplianceDashboardResponse:
-    stmt = (
-        select(ComplianceViolation)
-        .join(ComplianceRule)
-        .where(ComplianceRule.brokerage_id == brokerage_id)
-        .order_by(ComplianceViolation.created_at.desc())
+    from sqlalchemy import func, tuple_
+
+    filters = filters or ComplianceDashboardFilters()
+    page = page or CursorParams()
+
+    scope = [
+        ComplianceViolation.rule_id.in_(
+            select(ComplianceRule.id).where(ComplianceRule.brokerage_id == brokerage_id)
+        ),
+    ]
+    if filters.team_id:
+        scope.append(ComplianceViolation.agent_id.in_(
+            select(TeamMember.user_id).where(TeamMember.team_id == filters.team_id)
+        ))
+    if filters.agent_id:
+        scope.append(ComplianceViolation.agent_id == filters.agent_id)
+    if filters.rule_id:
+        scope.append(ComplianceViolation.rule_id == filters.rule_id)
+    if filters.start_date:
+        scope.append(ComplianceViolation.created_at >= datetime.combine(filters.start_date, time.min, tzinfo=timezone.utc))
+    if filters.end_date:
+        scope.append(ComplianceViolation.created_at < datetime.combine(
+            filters.end_date + timedelta(days=1), time.min, tzinfo=timezone.utc,
+        ))
+
+    counts = await db.execute(
+        select(ComplianceViolation.severity, ComplianceViolation.resolved, func.count())
+        .where(*scope)
+        .group_by(ComplianceViolation.severity, ComplianceViolation.resolved)
     )
-    result = await db.execute(stmt)
-    violations = result.scalars().all()
-
-    unresolved = [v for v in violations if not v.resolved]
     by_severity = {}
-    for v in violations:
-        by_severity[v.severity] = by_severity.get(v.severity, 0) + 1
+    unresolved_by_severity = {}
+    for severity, resolved, count in counts:
+        by_severity[severity] = by_severity.get(severity, 0) + count
+        if not resolved:
+            unresolved_by_severity[severity] = unresolved_by_severity.get(severity, 0) + count
+
+    # Keyset pagination, newest first
+    stmt = select(ComplianceViolation).where(*scope)
+    if filters.resolved is not None:
+        stmt = stmt.where(ComplianceViolation.resolved == filters.resolved)
+    if page.cursor:
+        stmt = stmt.where(tuple_(ComplianceViolation.created_at, ComplianceViolation.id) < _decode_cursor(page.cursor))
+    result = await db.execute(
+        stmt.order_by(ComplianceViolation.created_at.desc(), ComplianceViolation.id.desc()).limit(page.limit + 1)
+    )
+    violations = result.scalars().all()
+    next_cursor = None
+    if len(violations) > page.limit:
+        violations = violations[:page.limit]
+        next_cursor = _encode_cursor(violations[-1].created_at, violations[-1].id)
 
     return ComplianceDashboardResponse(
-        total_violations=len(violations),
-        unresolved_count=len(unresolved),
+        total_violations=sum(by_severity.values()),
+        unresolved_count=sum(unresolved_by_severity.values()),
         by_severity=by_severity,
-        recent_violations=[
-            ComplianceViolationResponse.model_validate(v)
-            for v in violations[:20]
-        ],
+        unresolved_by_severity=unresolved_by_severity,
+        recent_violations=[ComplianceViolationResponse.model_validate(v) for v in violations],
+        next_cursor=next_cursor,
     )
 
 
@@ -189,31 +246,119 @@ async def get_agent_performance_summary(
     if not user:
         raise HTTPException(status_code=404, detail="Agent not found")
 
+    from sqlalchemy import func, and_, extract
     from app.models.transaction import Transaction
     from app.models.commission import TransactionCommission
 
-    # Count transactions
-    t_stmt = select(Transaction).where(Transaction.agent_id == agent_id)
-    t_result = await db.execute(t_stmt)
-    transactions = t_result.scalars().all()
-
-    closed = [t for t in transactions if t.status == "closed"]
-    active = [t for t in transactions if t.status not in ("closed", "cancelled", "draft")]
-
-    # Sum commissions
-    c_stmt = select(TransactionCommission).where(TransactionCommission.agent_id == agent_id)
-    c_result = await db.execute(c_stmt)
-    commissions = c_result.scalars().all()
-
-    total_commission = sum(float(c.actual_gross or c.gross_commission or 0) for c in commissions)
-    total_volume = sum(float(t.purchase_price.get("value", 0)) if isinstance(t.purchase_price, dict) else 0 for t in closed)
+    closed = Transaction.status == "closed"
+    days_to_close = extract("epoch", Transaction.closing_date - Transaction.contract_execution_date) / 86400
+    timed = and_(
+        closed,
+        Transaction.contract_execution_date.isnot(None),
+        Transaction.closing_date.isnot(None),
+    )
+    stmt = (
+        select(
+            func.count().filter(closed).label("closed"),
+            func.count().filter(Transaction.status.notin_(["closed", "cancelled", "draft"])).label("active"),
+            func.coalesce(func.sum(Transaction.purchase_price_value).filter(closed), 0).label("volume"),
+            func.coalesce(
+                func.sum(func.coalesce(TransactionCommission.actual_gross, TransactionCommission.gross_commission)), 0
+            ).label("commission"),
+            func.avg(days_to_close).filter(timed).label("avg_days"),
+            func.percentile_cont(0.5).within_group(days_to_close).filter(timed).label("median_days"),
+        )
+        .select_from(Transaction)
+        .outerjoin(TransactionCommission, TransactionCommission.transaction_id == Transaction.id)
+        .where(Transaction.agent_id == agent_id)
+    )
+    row = (await db.execute(stmt)).one()
 
     return AgentPerformanceSummary(
         agent_id=agent_id,
         agent_name=user.name,
-        transactions_closed=len(closed),
-        total_volume=total_volume,
-        total_commission=total_commission,
-        avg_days_to_close=None,
-        active_transactions=len(active),
+        transactions_closed=row.closed,
+        total_volume=float(row.volume),
+        total_commission=float(row.commission),
+        avg_days_to_close=round(float(row.avg_days), 1) if row.avg_days is not None else None,
+        median_days_to_close=round(float(row.median_days), 1) if row.median_days is not None else None,
+        active_transactions=row.active,
+    )
+
+
+# --- Analytics ---
+
+ANALYTICS_DIMENSIONS = ("agent", "team")
+ANALYTICS_GRAINS = ("day", "week", "month")
+
+
+async def get_brokerage_analytics(
+    brokerage_id: UUID,
+    start_date: date,
+    end_date: date,
+    group_by: List[str],
+    db: AsyncSession,
+    team_id: Optional[UUID] = None,
+    agent_id: Optional[UUID] = None,
+    sort: Optional[str] = None,
+    limit: int = 1000,
+) -> BrokerageAnalyticsResponse:
+    """Aggregate the day x agent rollups over a date range, grouped by any of
+    agent, team and one time grain. ``sort`` (a metric) orders descending,
+    e.g. a closed-volume leaderboard."""
+    from sqlalchemy import func, cast, Date
+    from app.models.analytics import AnalyticsDailyRollup as R
+    from app.tasks.analytics_tasks import METRICS
+
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    unknown = set(group_by) - set(ANALYTICS_DIMENSIONS) - set(ANALYTICS_GRAINS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by: {', '.join(sorted(unknown))}")
+    grains = [g for g in group_by if g in ANALYTICS_GRAINS]
+    if len(grains) > 1:
+        raise HTTPException(status_code=400, detail="group_by accepts at most one of day, week, month")
+    if sort is not None and sort not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort metric: {sort}")
+
+    dimensions = []
+    if "agent" in group_by:
+        dimensions.append(R.agent_id.label("agent_id"))
+    if "team" in group_by:
+        dimensions.append(R.team_id.label("team_id"))
+    if grains:
+        period = R.day if grains[0] == "day" else cast(func.date_trunc(grains[0], R.day), Date)
+        dimensions.append(period.label("period"))
+
+    stmt = (
+        select(*dimensions, *(func.sum(getattr(R, metric)).label(metric) for metric in METRICS))
+        .where(R.brokerage_id == brokerage_id, R.day >= start_date, R.day <= end_date)
     )
+    if team_id:
+        stmt = stmt.where(R.team_id == team_id)
+    if agent_id:
+        stmt = stmt.where(R.agent_id == agent_id)
+    if dimensions:
+        stmt = stmt.group_by(*dimensions)
+    if sort:
+        stmt = stmt.order_by(func.sum(getattr(R, sort)).desc())
+    elif dimensions:
+        stmt = stmt.order_by(*dimensions)
+    result = await db.execute(stmt.limit(limit))
+
+    rows = []
+    for row in result.mappings():
+        if row["deals_opened"] is None:
+            continue  # ungrouped query over an empty range
+        timed = row["days_to_close_count"]
+        rows.append(AnalyticsRow(
+            agent_id=row.get("agent_id"),
+            team_id=row.get("team_id"),
+            period=row.get("period"),
+            avg_days_to_close=round(float(row["days_to_close_total"]) / timed, 1) if timed else None,
+            **{
+                metric: row[metric] for metric in METRICS
+                if metric not in ("days_to_close_total", "days_to_close_count")
+            },
+        ))
+    return BrokerageAnalyticsResponse(start_date=start_date, end_date=end_date, group_by=group_by, rows=rows)
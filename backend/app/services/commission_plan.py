@@ -0,0 +1,156 @@
+"""Commission plans: graduated company splits, annual caps and split waterfalls.
+
+A plan comes from an agent's CommissionConfig. Each deal's gross flows
+through a waterfall:
+
+1. referral fees come off the top (percentage of gross or flat);
+2. the company (broker) split applies to what is left, at the graduated rate
+   for the agent's year-to-date gross. A deal that crosses a threshold is
+   split marginally, and the company stops taking once the annual cap is
+   reached;
+3. team splits are percentages of the agent's share after the company split;
+4. the rest is the agent's net.
+
+The year-to-date position comes from AgentCommissionYTD, which is posted
+incrementally as commissions are paid, so pricing a deal is one row lookup
+plus a walk over the tiers the deal crosses. Tier lists are stored sorted
+ascending by ``min`` (see ``normalize_tiers``), so nothing is sorted when
+pricing.
+"""
+from dataclasses import dataclass, replace
+from decimal import Decimal
+from typing import Optional
+
+ZERO = Decimal("0")
+CENT = Decimal("0.01")
+
+
+def _decimal(value) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def normalize_tiers(tiered: Optional[dict]) -> Optional[dict]:
+    """``{"tiers": [...]}`` with tiers sorted ascending by ``min``; done once on write."""
+    if not tiered or not isinstance(tiered.get("tiers"), list):
+        return tiered
+    tiers = sorted(
+        ({**tier, "min": float(tier.get("min") or 0)} for tier in tiered["tiers"]),
+        key=lambda tier: tier["min"],
+    )
+    return {**tiered, "tiers": tiers}
+
+
+def plan_year(closing_date, start_month: int = 1) -> int:
+    """The plan year a closing falls in, labelled by the calendar year it starts in."""
+    return closing_date.year if closing_date.month >= start_month else closing_date.year - 1
+
+
+@dataclass(frozen=True)
+class CommissionPlan:
+    # (ytd gross threshold, company split) ascending; the first threshold is 0
+    company_splits: tuple
+    annual_cap: Optional[Decimal]
+    referral_fee_percentage: Optional[Decimal]
+    team_splits: tuple  # (member name, percentage of the agent's share)
+    year_start_month: int = 1
+
+    @classmethod
+    def from_config(cls, config) -> "CommissionPlan":
+        base = _decimal(config.broker_split_percentage or 0)
+        graduated = [
+            (_decimal(tier["min"]), _decimal(tier["broker_split_percentage"]))
+            for tier in ((config.graduated_splits or {}).get("tiers") or [])
+            if tier.get("broker_split_percentage") is not None
+        ]
+        if not graduated or graduated[0][0] > 0:
+            graduated.insert(0, (ZERO, base))
+        team = tuple(
+            (member.get("name") or "Team", _decimal(member["percentage"]))
+            for member in ((config.team_splits or {}).get("members") or [])
+            if member.get("percentage")
+        )
+        return cls(
+            company_splits=tuple(graduated),
+            annual_cap=_decimal(config.annual_cap) if config.annual_cap is not None else None,
+            referral_fee_percentage=config.default_referral_fee_percentage,
+            team_splits=team,
+            year_start_month=config.plan_year_start_month or 1,
+        )
+
+    @property
+    def has_company_split(self) -> bool:
+        return any(pct for _, pct in self.company_splits)
+
+    def company_split_rate(self, ytd_gross: Decimal) -> Decimal:
+        rate = self.company_splits[0][1]
+        for threshold, pct in self.company_splits:
+            if ytd_gross < threshold:
+                break
+            rate = pct
+        return rate
+
+    def company_dollar(self, amount: Decimal, ytd_gross: Decimal, ytd_company_dollar: Decimal) -> Decimal:
+        """The company's take from ``amount`` of gross earned on top of ``ytd_gross``."""
+        take = ZERO
+        start, end = ytd_gross, ytd_gross + amount
+        for i, (threshold, pct) in enumerate(self.company_splits):
+            upper = self.company_splits[i + 1][0] if i + 1 < len(self.company_splits) else None
+            if upper is not None and upper <= start:
+                continue
+            portion = (min(end, upper) if upper is not None else end) - max(start, threshold)
+            if portion > 0:
+                take += portion * pct
+            if upper is None or upper >= end:
+                break
+        if self.annual_cap is not None:
+            take = min(take, max(self.annual_cap - ytd_company_dollar, ZERO))
+        return take
+
+
+@dataclass(frozen=True)
+class PlannedSplit:
+    split_type: str  # referral, broker, team_member
+    recipient_name: str
+    is_percentage: bool
+    percentage: Optional[Decimal]
+    flat_amount: Optional[Decimal]
+    calculated_amount: Decimal
+
+
+def apply_plan(
+    plan: CommissionPlan,
+    gross: Decimal,
+    ytd_gross: Decimal = ZERO,
+    ytd_company_dollar: Decimal = ZERO,
+    referrals: tuple = (),
+) -> list[PlannedSplit]:
+    """Run ``gross`` through the waterfall; returns the split lines.
+
+    ``referrals`` are (name, percentage or None, flat amount or None); a
+    percentage referral without a percentage uses the plan's default fee.
+    ``percentage`` on broker and team lines is the rate applied to that step's
+    base, so it records the tier used rather than a share of gross.
+    """
+    splits = []
+    remaining = gross
+    for name, percentage, flat_amount in referrals:
+        if flat_amount is not None:
+            split = PlannedSplit("referral", name, False, None, _decimal(flat_amount), _decimal(flat_amount))
+        else:
+            percentage = _decimal(percentage if percentage is not None else plan.referral_fee_percentage or 0)
+            split = PlannedSplit("referral", name, True, percentage, None, gross * percentage)
+        amount = min(split.calculated_amount.quantize(CENT), remaining)
+        splits.append(replace(split, calculated_amount=amount))
+        remaining -= amount
+
+    if plan.has_company_split:
+        amount = plan.company_dollar(remaining, ytd_gross, ytd_company_dollar).quantize(CENT)
+        splits.append(PlannedSplit("broker", "Brokerage", True, plan.company_split_rate(ytd_gross), None, amount))
+        remaining -= amount
+
+    agent_share = remaining
+    for name, percentage in plan.team_splits:
+        amount = min((agent_share * percentage).quantize(CENT), remaining)
+        splits.append(PlannedSplit("team_member", name, True, percentage, None, amount))
+        remaining -= amount
+    return splits
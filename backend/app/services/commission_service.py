@@ -1,7 +1,9 @@
 import csv
 import io
 import logging
-from datetime import datetime
+from collections import defaultdict
+from dataclasses import asdict, replace
+from datetime import datetime, timezone
 from decimal import Decimal
 from typing import List, Optional
 from uuid import UUID
@@ -9,13 +11,14 @@ from fastapi import HTTPException
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.commission import CommissionConfig, TransactionCommission, CommissionSplit
+from app.models.commission import CommissionConfig, TransactionCommission, CommissionSplit, AgentCommissionYTD
 from app.models.transaction import Transaction
 from app.schemas.commission import (
-    CommissionConfigCreate, CommissionConfigUpdate, CommissionConfigResponse,
+    CommissionConfigCreate, CommissionConfigUpdate, CommissionConfigResponse, CommissionPositionResponse,
     TransactionCommissionCreate, TransactionCommissionUpdate, TransactionCommissionResponse,
     PipelineSummary,
 )
+from app.services.commission_plan import CommissionPlan, apply_plan, normalize_tiers, plan_year
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +34,13 @@ async def get_config(agent_id: UUID, db: AsyncSession) -> Optional[CommissionCon
     return CommissionConfigResponse.model_validate(config)
 
 
+# Config fields that change how existing deals are split
+PLAN_FIELDS = {
+    "broker_split_percentage", "default_referral_fee_percentage", "team_splits",
+    "graduated_splits", "annual_cap", "plan_year_start_month",
+}
+
+
 async def upsert_config(
     agent_id: UUID, config_data: CommissionConfigCreate, db: AsyncSession
 ) -> CommissionConfigResponse:
@@ -38,18 +48,208 @@ async def upsert_config(
     result = await db.execute(stmt)
     config = result.scalar_one_or_none()
 
+    data = config_data.model_dump(exclude_unset=bool(config))
+    # Tiers are sorted once here so pricing never has to
+    if data.get("tiered_rates"):
+        data["tiered_rates"] = normalize_tiers(data["tiered_rates"])
+    if data.get("graduated_splits"):
+        data["graduated_splits"] = normalize_tiers(data["graduated_splits"])
+
     if config:
-        for field, value in config_data.model_dump(exclude_unset=True).items():
+        changed = {field for field, value in data.items() if getattr(config, field) != value}
+        for field, value in data.items():
             setattr(config, field, value)
     else:
-        config = CommissionConfig(agent_id=agent_id, **config_data.model_dump())
+        changed = set(data)
+        config = CommissionConfig(agent_id=agent_id, **data)
         db.add(config)
 
     await db.commit()
     await db.refresh(config)
+
+    # Open deals are priced by the plan; reprice them off-request
+    if changed & PLAN_FIELDS:
+        from app.tasks.commission_tasks import recompute_agent_commissions
+        recompute_agent_commissions.delay(str(agent_id), "plan_year_start_month" in changed)
     return CommissionConfigResponse.model_validate(config)
 
 
+async def get_position(agent_id: UUID, db: AsyncSession) -> CommissionPositionResponse:
+    """The agent's position in the current plan year."""
+    config = (await db.execute(
+        select(CommissionConfig).where(CommissionConfig.agent_id == agent_id)
+    )).scalar_one_or_none()
+    plan = CommissionPlan.from_config(config) if config else None
+    year = plan_year(datetime.now(timezone.utc), plan.year_start_month if plan else 1)
+    position = await _ytd_position(agent_id, year, db)
+    gross = position.gross if position else Decimal("0")
+    company_dollar = position.company_dollar if position else Decimal("0")
+    return CommissionPositionResponse(
+        plan_year=year,
+        gross=gross,
+        company_dollar=company_dollar,
+        deals=position.deals if position else 0,
+        company_split_percentage=plan.company_split_rate(gross) if plan else Decimal("0"),
+        cap_remaining=max(plan.annual_cap - company_dollar, Decimal("0")) if plan and plan.annual_cap is not None else None,
+    )
+
+
+async def _ytd_position(agent_id: UUID, year: int, db: AsyncSession) -> Optional[AgentCommissionYTD]:
+    return (await db.execute(
+        select(AgentCommissionYTD).where(AgentCommissionYTD.agent_id == agent_id, AgentCommissionYTD.plan_year == year)
+    )).scalar_one_or_none()
+
+
+async def _post_ytd(agent_id: UUID, year: int, gross: Decimal, company_dollar: Decimal, deals: int, db: AsyncSession):
+    """Add to (or, with negative amounts, take back from) an agent's plan-year position."""
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+    stmt = pg_insert(AgentCommissionYTD).values(
+        agent_id=agent_id, plan_year=year, gross=gross, company_dollar=company_dollar, deals=deals,
+    )
+    # Increment in place so concurrent postings for one agent never lose an update
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["agent_id", "plan_year"],
+        set_={
+            "gross": AgentCommissionYTD.gross + stmt.excluded.gross,
+            "company_dollar": AgentCommissionYTD.company_dollar + stmt.excluded.company_dollar,
+            "deals": AgentCommissionYTD.deals + stmt.excluded.deals,
+            "updated_at": func.now(),
+        },
+    ))
+
+
+async def _stamp_plan_year_date(commission: TransactionCommission, db: AsyncSession):
+    """Fix the date that places a newly paid commission in a plan year; cleared once it is no longer paid."""
+    if commission.status != "paid":
+        commission.plan_year_date = None
+    elif commission.plan_year_date is None:
+        transaction = await db.get(Transaction, commission.transaction_id)
+        commission.plan_year_date = (transaction.closing_date if transaction else None) or datetime.now(timezone.utc)
+
+
+async def _ytd_contribution(commission: TransactionCommission, db: AsyncSession):
+    """(plan year, gross after referrals, company dollar) a paid commission adds to the agent's position.
+
+    The year comes from ``plan_year_date``, as in commission_tasks._ytd_positions_sql,
+    so a later reversal or rebuild hits the year the commission was posted to.
+    """
+    config = (await db.execute(
+        select(CommissionConfig).where(CommissionConfig.agent_id == commission.agent_id)
+    )).scalar_one_or_none()
+    dated = commission.plan_year_date
+    if dated is None:  # paid before plan_year_date existed and not backfilled
+        transaction = await db.get(Transaction, commission.transaction_id)
+        dated = (transaction.closing_date if transaction else None) or commission.updated_at
+    year = plan_year(dated, config.plan_year_start_month if config else 1)
+    gross = commission.actual_gross if commission.actual_gross is not None else commission.gross_commission
+    referrals = sum((s.calculated_amount or 0 for s in commission.splits if s.split_type == "referral"), Decimal("0"))
+    company_dollar = sum((s.calculated_amount or 0 for s in commission.splits if s.split_type == "broker"), Decimal("0"))
+    return year, (gross or Decimal("0")) - referrals, company_dollar
+
+
+async def _plan_context(agent_id: UUID, closing_date, db: AsyncSession):
+    """(plan, (ytd gross, ytd company dollar)) for pricing a deal closing on ``closing_date``; (None, None) without a config."""
+    config = (await db.execute(
+        select(CommissionConfig).where(CommissionConfig.agent_id == agent_id)
+    )).scalar_one_or_none()
+    if not config:
+        return None, None
+    plan = CommissionPlan.from_config(config)
+    position = await _ytd_position(agent_id, plan_year(closing_date or datetime.now(timezone.utc), plan.year_start_month), db)
+    return plan, (position.gross, position.company_dollar) if position else (Decimal("0"), Decimal("0"))
+
+
+def reprice_commission(commission, purchase_price, plan=None, position=None, keep_gross=False):
+    """Recompute gross, every split's calculated_amount and projected_net in one pass.
+
+    ``commission.splits`` must be loaded. Gross is recalculated from the price
+    unless ``keep_gross`` or the commission is a manual override. With a plan,
+    referral lines and the plan's own lines (``from_plan``) are regenerated
+    through the waterfall at the agent's ``position``; explicit broker or team
+    lines replace the plan's and, like all lines without a plan, are a
+    percentage of gross or a flat amount. Without a plan or a gross, the
+    plan's broker and team lines are dropped.
+    """
+    if not (keep_gross or commission.is_manual_override):
+        gross = _calculate_gross(
+            purchase_price, commission.commission_type, commission.rate,
+            commission.flat_amount, commission.tiered_rates,
+        )
+        if gross is not None:
+            commission.gross_commission = gross
+    gross = commission.gross_commission
+    net = gross or Decimal("0")
+
+    if plan is None or not gross:
+        # Nothing to run through a waterfall: the plan's broker and team
+        # lines no longer apply, and referrals price like any other line
+        for stale in [s for s in commission.splits if s.from_plan and s.split_type != "referral"]:
+            commission.splits.remove(stale)
+        manual = list(commission.splits)
+    else:
+        manual = [s for s in commission.splits if not s.from_plan and s.split_type != "referral"]
+        given = {s.split_type for s in manual}
+        if "broker" in given:
+            plan = replace(plan, company_splits=((Decimal("0"), Decimal("0")),), annual_cap=None)
+        if "team_member" in given:
+            plan = replace(plan, team_splits=())
+        referrals = [s for s in commission.splits if s.split_type == "referral"]
+        planned = apply_plan(
+            plan, gross, *(position or ()),
+            referrals=[
+                (s.recipient_name, s.percentage, None) if s.is_percentage else (s.recipient_name, None, s.flat_amount)
+                for s in referrals
+            ],
+        )
+        # Lines are matched to the plan's output by type and position, so two
+        # referrals to the same name stay two lines
+        existing = defaultdict(list)
+        for split in commission.splits:
+            if split.from_plan or split.split_type == "referral":
+                existing[split.split_type].append(split)
+        for line in planned:
+            same_type = existing[line.split_type]
+            split = same_type.pop(0) if same_type else None
+            if split is None:
+                split = CommissionSplit()
+                commission.splits.append(split)
+            for field, value in asdict(line).items():
+                setattr(split, field, value)
+            split.from_plan = True
+            net -= line.calculated_amount
+        for stale in [split for same_type in existing.values() for split in same_type]:
+            commission.splits.remove(stale)
+
+    for split in manual:
+        if split.is_percentage and split.percentage and gross:
+            split.calculated_amount = gross * split.percentage
+            net -= split.calculated_amount
+        elif not split.is_percentage and split.flat_amount:
+            split.calculated_amount = split.flat_amount
+            net -= split.calculated_amount
+    commission.projected_net = net
+
+
+async def recalculate_transaction_commission(transaction: Transaction, db: AsyncSession) -> None:
+    """Reprice the transaction's unpaid commission after its price or closing date changed.
+
+    Called before the caller commits, so the deal and its commission change together.
+    The deal is flushed first so Postgres recomputes purchase_price_value.
+    """
+    await db.flush()
+    await db.refresh(transaction, ["purchase_price_value"])
+    commission = (await db.execute(
+        select(TransactionCommission)
+        .options(selectinload(TransactionCommission.splits))
+        .where(TransactionCommission.transaction_id == transaction.id)
+    )).scalar_one_or_none()
+    if not commission or commission.status == "paid":
+        return
+    plan, position = await _plan_context(commission.agent_id, transaction.closing_date, db)
+    reprice_commission(commission, transaction.purchase_price_value, plan, position)
+
+
 # --- Transaction Commission ---
 
 async def get_transaction_commission(
@@ -79,13 +279,14 @@ async def create_transaction_commission(
         raise HTTPException(status_code=404, detail="Transaction not found")
 
     # Calculate gross commission
-    purchase_price = _extract_price(transaction.purchase_price)
+    purchase_price = transaction.purchase_price_value
+    tiered_rates = normalize_tiers(commission_data.tiered_rates)
     gross = _calculate_gross(
         purchase_price,
         commission_data.commission_type,
         commission_data.rate,
         commission_data.flat_amount,
-        commission_data.tiered_rates,
+        tiered_rates,
     )
 
     commission = TransactionCommission(
@@ -94,34 +295,18 @@ async def create_transaction_commission(
         commission_type=commission_data.commission_type,
         rate=commission_data.rate,
         flat_amount=commission_data.flat_amount,
-        tiered_rates=commission_data.tiered_rates,
+        tiered_rates=tiered_rates,
         gross_commission=gross,
         is_manual_override=commission_data.is_manual_override,
         is_dual_agency=commission_data.is_dual_agency,
         notes=commission_data.notes,
         status="projected",
+        splits=[CommissionSplit(**split_data.model_dump()) for split_data in commission_data.splits],
     )
+    plan, position = await _plan_context(agent_id, transaction.closing_date, db)
+    reprice_commission(commission, purchase_price, plan, position, keep_gross=True)
     db.add(commission)
-    await db.flush()
-
-    # Add splits
-    net = gross or Decimal("0")
-    for split_data in commission_data.splits:
-        split = CommissionSplit(
-            transaction_commission_id=commission.id,
-            **split_data.model_dump(),
-        )
-        if split.is_percentage and split.percentage and gross:
-            split.calculated_amount = gross * split.percentage
-            net -= split.calculated_amount
-        elif not split.is_percentage and split.flat_amount:
-            split.calculated_amount = split.flat_amount
-            net -= split.calculated_amount
-        db.add(split)
-
-    commission.projected_net = net
     await db.commit()
-    await db.refresh(commission)
 
     # Re-fetch with splits loaded
     return await get_transaction_commission(transaction_id, db)
@@ -142,22 +327,33 @@ async def update_transaction_commission(
     if not commission:
         raise HTTPException(status_code=404, detail="Commission not found for transaction")
 
+    posted = await _ytd_contribution(commission, db) if commission.status == "paid" else None
+
     update_data = commission_update.model_dump(exclude_unset=True)
+    if update_data.get("tiered_rates"):
+        update_data["tiered_rates"] = normalize_tiers(update_data["tiered_rates"])
     for field, value in update_data.items():
         setattr(commission, field, value)
 
-    # Recalculate if price-affecting fields changed
-    if any(f in update_data for f in ("rate", "flat_amount", "gross_commission", "commission_type")):
+    # Recalculate gross, splits and net if price-affecting fields changed
+    if any(f in update_data for f in ("rate", "flat_amount", "tiered_rates", "gross_commission", "commission_type")):
         transaction = await db.get(Transaction, transaction_id)
-        purchase_price = _extract_price(transaction.purchase_price) if transaction else None
-        if purchase_price and not update_data.get("gross_commission"):
-            commission.gross_commission = _calculate_gross(
-                purchase_price,
-                commission.commission_type,
-                commission.rate,
-                commission.flat_amount,
-                commission.tiered_rates,
-            )
+        plan, position = await _plan_context(commission.agent_id, transaction.closing_date if transaction else None, db)
+        reprice_commission(
+            commission,
+            transaction.purchase_price_value if transaction else None,
+            plan, position,
+            keep_gross=bool(update_data.get("gross_commission")),
+        )
+
+    # Keep the agent's plan-year position in step with what has been paid
+    await _stamp_plan_year_date(commission, db)
+    current = await _ytd_contribution(commission, db) if commission.status == "paid" else None
+    if current != posted:
+        if posted:
+            await _post_ytd(commission.agent_id, posted[0], -posted[1], -posted[2], -1, db)
+        if current:
+            await _post_ytd(commission.agent_id, current[0], current[1], current[2], 1, db)
 
     await db.commit()
     return await get_transaction_commission(transaction_id, db)
@@ -165,116 +361,195 @@ async def update_transaction_commission(
 
 # --- Pipeline ---
 
+PIPELINE_HORIZON_MONTHS = 12
+
+
 async def get_pipeline_summary(
-    agent_id: UUID, db: AsyncSession
+    agent_id: UUID, db: AsyncSession, months: int = PIPELINE_HORIZON_MONTHS,
 ) -> PipelineSummary:
-    stmt = (
-        select(TransactionCommission)
+    """Totals and per-status buckets from one grouped query, plus a by-month
+    series of expected closings for ``months`` months from the current one."""
+    from datetime import time
+    from app.partitioning import add_months, month_start
+
+    status_rows = (await db.execute(
+        select(
+            TransactionCommission.status,
+            func.count().label("count"),
+            func.coalesce(func.sum(TransactionCommission.gross_commission), 0).label("gross"),
+            func.coalesce(func.sum(TransactionCommission.projected_net), 0).label("net"),
+            func.coalesce(func.sum(TransactionCommission.actual_gross), 0).label("actual_gross"),
+            func.coalesce(func.sum(TransactionCommission.actual_net), 0).label("actual_net"),
+            func.sum(TransactionCommission.rate).label("rate_sum"),
+            func.count(TransactionCommission.rate).label("rate_count"),
+        )
         .where(TransactionCommission.agent_id == agent_id)
+        .group_by(TransactionCommission.status)
+    )).all()
+
+    by_status = {
+        row.status: {"count": row.count, "gross": float(row.gross), "net": float(row.net)}
+        for row in status_rows
+    }
+    rate_count = sum(row.rate_count for row in status_rows)
+    avg_rate = sum(row.rate_sum or 0 for row in status_rows) / rate_count if rate_count else None
+
+    first_month = month_start(datetime.now(timezone.utc))
+    horizon_start = datetime.combine(first_month, time.min, tzinfo=timezone.utc)
+    horizon_end = datetime.combine(add_months(first_month, months), time.min, tzinfo=timezone.utc)
+    closing_month = func.date_trunc("month", func.timezone("UTC", Transaction.closing_date))
+    month_rows = await db.execute(
+        select(
+            closing_month.label("month"),
+            func.count().label("count"),
+            func.coalesce(func.sum(TransactionCommission.gross_commission), 0).label("gross"),
+            func.coalesce(func.sum(TransactionCommission.projected_net), 0).label("net"),
+        )
+        .join(Transaction, Transaction.id == TransactionCommission.transaction_id)
+        .where(
+            TransactionCommission.agent_id == agent_id,
+            Transaction.closing_date >= horizon_start,
+            Transaction.closing_date < horizon_end,
+        )
+        .group_by(closing_month)
     )
-    result = await db.execute(stmt)
-    commissions = result.scalars().all()
-
-    total_projected_gross = Decimal("0")
-    total_projected_net = Decimal("0")
-    total_actual_gross = Decimal("0")
-    total_actual_net = Decimal("0")
-    by_status = {}
-    rates = []
-
-    for c in commissions:
-        if c.gross_commission:
-            total_projected_gross += c.gross_commission
-        if c.projected_net:
-            total_projected_net += c.projected_net
-        if c.actual_gross:
-            total_actual_gross += c.actual_gross
-        if c.actual_net:
-            total_actual_net += c.actual_net
-        if c.rate:
-            rates.append(c.rate)
-
-        status = c.status
-        if status not in by_status:
-            by_status[status] = {"count": 0, "gross": Decimal("0"), "net": Decimal("0")}
-        by_status[status]["count"] += 1
-        by_status[status]["gross"] += c.gross_commission or Decimal("0")
-        by_status[status]["net"] += c.projected_net or Decimal("0")
-
-    # Convert Decimals to float for JSON serialization in by_status
-    for s in by_status:
-        by_status[s]["gross"] = float(by_status[s]["gross"])
-        by_status[s]["net"] = float(by_status[s]["net"])
-
-    avg_rate = sum(rates) / len(rates) if rates else None
+    by_closing_month = {row.month.date(): row for row in month_rows}
+    by_month = []
+    for i in range(months):
+        month = add_months(first_month, i)
+        row = by_closing_month.get(month)
+        by_month.append({
+            "month": month.strftime("%Y-%m"),
+            "count": row.count if row else 0,
+            "gross": float(row.gross) if row else 0.0,
+            "net": float(row.net) if row else 0.0,
+        })
 
     return PipelineSummary(
-        total_projected_gross=total_projected_gross,
-        total_projected_net=total_projected_net,
-        total_actual_gross=total_actual_gross,
-        total_actual_net=total_actual_net,
-        transaction_count=len(commissions),
+        total_projected_gross=sum((row.gross for row in status_rows), Decimal("0")),
+        total_projected_net=sum((row.net for row in status_rows), Decimal("0")),
+        total_actual_gross=sum((row.actual_gross for row in status_rows), Decimal("0")),
+        total_actual_net=sum((row.actual_net for row in status_rows), Decimal("0")),
+        transaction_count=sum(row.count for row in status_rows),
         avg_commission_rate=avg_rate,
         by_status=by_status,
-        by_month=[],  # TODO: implement monthly breakdown
+        by_month=by_month,
     )
 
 
-async def export_csv(
-    agent_id: UUID, db: AsyncSession,
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_SCOPES = ("agent", "team", "brokerage")
+EXPORT_BROKER_ROLES = ("broker", "admin")
+EXPORT_COLUMNS = [
+    "Transaction ID", "Commission Type", "Rate", "Gross Commission",
+    "Projected Net", "Actual Gross", "Actual Net", "Status",
+    "Dual Agency", "Created At", "Agent ID",
+]
+EXPORT_SPLIT_COLUMNS = ["Split Type", "Split Recipient", "Split Percentage", "Split Flat Amount", "Split Amount"]
+
+
+async def export_agent_scope(
+    agent_id: UUID, db: AsyncSession, scope: str = "agent", team_id: Optional[UUID] = None,
+):
+    """Resolve an export scope to a SELECT of agent ids.
+
+    Team and brokerage scopes are limited to the requesting agent's own
+    brokerage. The brokerage scope needs a broker or admin; the team scope
+    also allows a team lead who is a member of that team. Raises before any
+    row is streamed.
+    """
+    from app.models.brokerage import Team, TeamMember
+    from app.models.user import User
+
+    if scope not in EXPORT_SCOPES:
+        raise HTTPException(status_code=400, detail=f"scope must be one of: {', '.join(EXPORT_SCOPES)}")
+    if scope == "agent":
+        return select(User.id).where(User.id == agent_id)
+
+    user = await db.get(User, agent_id)
+    if not user or not user.brokerage_id:
+        raise HTTPException(status_code=400, detail="Agent does not belong to a brokerage")
+    is_broker = user.role in EXPORT_BROKER_ROLES
+    if scope == "brokerage":
+        if not is_broker:
+            raise HTTPException(status_code=403, detail="Only brokers and admins can export the brokerage")
+        return select(User.id).where(User.brokerage_id == user.brokerage_id)
+
+    if not team_id:
+        raise HTTPException(status_code=400, detail="team_id is required for the team scope")
+    team = await db.get(Team, team_id)
+    if not team or team.brokerage_id != user.brokerage_id:
+        raise HTTPException(status_code=404, detail="Team not found")
+    if not is_broker:
+        is_member = await db.scalar(
+            select(TeamMember.id).where(TeamMember.team_id == team_id, TeamMember.user_id == agent_id)
+        )
+        if user.role != "team_lead" or not is_member:
+            raise HTTPException(status_code=403, detail="Only brokers, admins and the team's leads can export a team")
+    return select(TeamMember.user_id).where(TeamMember.team_id == team_id)
+
+
+async def stream_csv(
+    agent_ids, db: AsyncSession,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     status: Optional[str] = None,
-) -> str:
-    """Export commission data as CSV string."""
-    stmt = (
-        select(TransactionCommission)
-        .options(selectinload(TransactionCommission.splits))
-        .where(TransactionCommission.agent_id == agent_id)
-    )
+    include_splits: bool = False,
+):
+    """Yield commission CSV text chunk by chunk for the agents selected by ``agent_ids``.
+
+    Rows come through a server-side cursor EXPORT_CHUNK_SIZE at a time, so
+    memory stays flat however large the export. With ``include_splits``
+    every split becomes its own row, repeating its commission's columns.
+    """
+    columns = [
+        TransactionCommission.transaction_id, TransactionCommission.commission_type,
+        TransactionCommission.rate, TransactionCommission.gross_commission,
+        TransactionCommission.projected_net, TransactionCommission.actual_gross,
+        TransactionCommission.actual_net, TransactionCommission.status,
+        TransactionCommission.is_dual_agency, TransactionCommission.created_at,
+        TransactionCommission.agent_id,
+    ]
+    header = list(EXPORT_COLUMNS)
+    if include_splits:
+        columns += [
+            CommissionSplit.split_type, CommissionSplit.recipient_name, CommissionSplit.percentage,
+            CommissionSplit.flat_amount, CommissionSplit.calculated_amount,
+        ]
+        header += EXPORT_SPLIT_COLUMNS
+
+    stmt = select(*columns).where(TransactionCommission.agent_id.in_(agent_ids))
+    if include_splits:
+        stmt = stmt.outerjoin(CommissionSplit, CommissionSplit.transaction_commission_id == TransactionCommission.id)
     if status:
         stmt = stmt.where(TransactionCommission.status == status)
     if start_date:
         stmt = stmt.where(TransactionCommission.created_at >= start_date)
     if end_date:
         stmt = stmt.where(TransactionCommission.created_at <= end_date)
-
-    result = await db.execute(stmt)
-    commissions = result.scalars().all()
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
-        "Transaction ID", "Commission Type", "Rate", "Gross Commission",
-        "Projected Net", "Actual Gross", "Actual Net", "Status",
-        "Dual Agency", "Created At",
-    ])
-    for c in commissions:
-        writer.writerow([
-            str(c.transaction_id), c.commission_type, str(c.rate or ""),
-            str(c.gross_commission or ""), str(c.projected_net or ""),
-            str(c.actual_gross or ""), str(c.actual_net or ""),
-            c.status, c.is_dual_agency, str(c.created_at),
-        ])
-
-    return output.getvalue()
+    order = [TransactionCommission.created_at, TransactionCommission.id]
+    if include_splits:
+        order += [CommissionSplit.created_at, CommissionSplit.id]
+    stmt = stmt.order_by(*order).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+
+    result = await db.stream(stmt)
+    async for rows in result.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            ["" if value is None else str(value) for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue()
 
 
 # --- Helpers ---
 
-def _extract_price(purchase_price_json) -> Optional[Decimal]:
-    """Extract numeric price from the JSON purchase_price field."""
-    if not purchase_price_json:
-        return None
-    if isinstance(purchase_price_json, dict):
-        val = purchase_price_json.get("value") or purchase_price_json.get("amount")
-        if val:
-            return Decimal(str(val))
-    if isinstance(purchase_price_json, (int, float)):
-        return Decimal(str(purchase_price_json))
-    return None
-
-
 def _calculate_gross(
     purchase_price: Optional[Decimal],
     commission_type: str,
@@ -287,9 +562,8 @@ def _calculate_gross(
     elif commission_type == "flat" and flat_amount:
         return flat_amount
     elif commission_type == "tiered" and tiered_rates and purchase_price:
-        # Simple tiered: apply rate based on price tier
-        tiers = tiered_rates.get("tiers", [])
-        for tier in sorted(tiers, key=lambda t: t.get("min", 0), reverse=True):
+        # Highest tier reached applies; tiers are stored ascending by min (normalize_tiers)
+        for tier in reversed(tiered_rates.get("tiers", [])):
             if purchase_price >= Decimal(str(tier.get("min", 0))):
                 return purchase_price * Decimal(str(tier.get("rate", 0)))
         return None
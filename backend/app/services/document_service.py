@@ -1,9 +1,13 @@
 import logging
+from datetime import datetime, timezone
 from typing import List, Optional
 from uuid import UUID
 from fastapi import HTTPException
+from jinja2 import FileSystemBytecodeCache
+from jinja2.sandbox import SandboxedEnvironment
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import Settings
 from app.models.document import DocumentTemplate, GeneratedDocument
 from app.models.transaction import Transaction
 from app.models.milestone import Milestone
@@ -15,6 +19,21 @@ from app.schemas.document import (
 )
 
 logger = logging.getLogger(__name__)
+settings = Settings()
+
+# Bump when _get_default_template changes so processes recompile the built-in templates
+DEFAULT_TEMPLATES_VERSION = 1
+
+# Agent-authored templates are untrusted: sandboxed and autoescaped. Compiled
+# bytecode is cached on disk (settings.template_cache_dir, else a per-user
+# temp dir) and shared by every API and worker process on the host.
+_env = SandboxedEnvironment(
+    autoescape=True,
+    bytecode_cache=FileSystemBytecodeCache(settings.template_cache_dir or None),
+)
+
+# template key -> (version, compiled template)
+_compiled = {}
 
 
 async def list_templates(
@@ -37,7 +56,9 @@ async def generate_document(
     db: AsyncSession,
     agent_id: Optional[UUID] = None,
 ) -> GeneratedDocumentResponse:
-    """Generate a document (HTML) from transaction data."""
+    """Generate a document (HTML) from transaction data; its PDF is rendered off-request."""
+    from app.tasks.document_tasks import html_hash, render_document_pdf
+
     transaction = await db.get(Transaction, transaction_id)
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
@@ -80,6 +101,8 @@ async def generate_document(
         document_type=request.document_type,
         title=title,
         html_content=html_content,
+        html_hash=html_hash(html_content),
+        pdf_status="pending",
         generation_data=data,
         version=version,
         generated_by=agent_id,
@@ -87,6 +110,44 @@ async def generate_document(
     db.add(doc)
     await db.commit()
     await db.refresh(doc)
+
+    # The PDF is rendered by a worker; clients poll pdf_status
+    render_document_pdf.delay(str(doc.id))
+    return GeneratedDocumentResponse.model_validate(doc)
+
+
+async def get_generated_document(document_id: UUID, db: AsyncSession) -> GeneratedDocumentResponse:
+    doc = await db.get(GeneratedDocument, document_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return GeneratedDocumentResponse.model_validate(doc)
+
+
+async def request_pdf(document_id: UUID, db: AsyncSession) -> GeneratedDocumentResponse:
+    """Queue a PDF render for a document without one, e.g. after a failed render.
+
+    A render still "rendering" after PDF_RENDER_TIMEOUT lost its worker and
+    is queued again.
+    """
+    from app.tasks.document_tasks import PDF_RENDER_TIMEOUT, html_hash, render_document_pdf
+
+    doc = await db.get(GeneratedDocument, document_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    stalled = doc.pdf_status == "rendering" and (
+        doc.pdf_started_at is None or doc.pdf_started_at < datetime.now(timezone.utc) - PDF_RENDER_TIMEOUT
+    )
+    if doc.pdf_status in ("pending", "rendering", "ready") and not stalled:
+        return GeneratedDocumentResponse.model_validate(doc)
+    if not doc.html_content:
+        raise HTTPException(status_code=400, detail="Document has no HTML to render")
+
+    doc.html_hash = html_hash(doc.html_content)
+    doc.pdf_status = "pending"
+    doc.pdf_error = None
+    await db.commit()
+    await db.refresh(doc)
+    render_document_pdf.delay(str(doc.id))
     return GeneratedDocumentResponse.model_validate(doc)
 
 
@@ -202,18 +263,40 @@ async def _gather_document_data(
     return data
 
 
-def _render_template(document_type: str, data: dict, template: Optional[DocumentTemplate] = None) -> str:
-    """Render a document template with Jinja2."""
-    from jinja2 import Environment, BaseLoader
+def _compile(name: str, source: str):
+    """Compile ``source``, reusing bytecode another process already cached for it."""
+    bucket = _env.bytecode_cache.get_bucket(_env, name, None, source)
+    if bucket.code is None:
+        bucket.code = _env.compile(source, name)
+        _env.bytecode_cache.set_bucket(bucket)
+    return _env.template_class.from_code(_env, bucket.code, _env.make_globals(None))
 
+
+def compiled_template(document_type: str, template: Optional[DocumentTemplate] = None):
+    """Return the compiled template, compiling only on a new template version.
+
+    Custom templates are keyed by id and ``updated_at``, built-in ones by
+    document type and DEFAULT_TEMPLATES_VERSION.
+    """
     if template and template.template_content:
-        template_str = template.template_content
+        key = str(template.id)
+        version = template.updated_at
     else:
-        template_str = _get_default_template(document_type)
+        template = None
+        key = f"default:{document_type}"
+        version = DEFAULT_TEMPLATES_VERSION
+
+    entry = _compiled.get(key)
+    if entry is None or entry[0] != version:
+        source = template.template_content if template else _get_default_template(document_type)
+        entry = (version, _compile(f"{key}@{version}", source))
+        _compiled[key] = entry
+    return entry[1]
 
-    env = Environment(loader=BaseLoader())
-    tmpl = env.from_string(template_str)
-    return tmpl.render(**data)
+
+def _render_template(document_type: str, data: dict, template: Optional[DocumentTemplate] = None) -> str:
+    """Render a document template with Jinja2."""
+    return compiled_template(document_type, template).render(**data)
 
 
 def _get_default_template(document_type: str) -> str:
@@ -3,8 +3,9 @@ from datetime import datetime, timezone
 from typing import Optional
 from uuid import UUID
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.notification_log import NotificationLog
+from app.models.webhook_event import WebhookEvent
 from app.models.communication import Communication
 from app.config import Settings
 
@@ -41,38 +42,38 @@ async def send_email(
         return {"id": None, "status": "failed", "error": str(e)}
 
 
-async def process_webhook(
-    event_type: str, data: dict, db: AsyncSession
+def _parse_event_time(value) -> Optional[datetime]:
+    """Parse a provider ISO-8601 timestamp, tolerating missing or malformed values."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+async def stage_webhook_event(
+    payload: dict, db: AsyncSession, event_id: Optional[str] = None
 ) -> None:
-    """Process a Resend webhook event and update notification log."""
-    message_id = data.get("email_id")
-    if not message_id:
-        return
+    """Durably stage a Resend webhook for the batched delivery worker.
 
-    stmt = select(NotificationLog).where(
-        NotificationLog.resend_message_id == message_id
-    )
-    result = await db.execute(stmt)
-    log = result.scalar_one_or_none()
-    if not log:
-        logger.warning(f"No notification log found for message_id={message_id}")
-        return
-
-    now = datetime.now(timezone.utc)
-    if event_type == "email.delivered":
-        log.delivered_at = now
-        log.status = "delivered"
-    elif event_type == "email.opened":
-        log.opened_at = now
-    elif event_type == "email.clicked":
-        log.clicked_at = now
-    elif event_type == "email.bounced":
-        log.bounced_at = now
-        log.bounce_reason = data.get("bounce", {}).get("message", "Unknown")
-        log.status = "bounced"
-    elif event_type == "email.complained":
-        log.status = "complained"
+    Redelivered events (same svix-id, or same type/message/timestamp when the
+    header is absent) are dropped by the unique ``event_id``.
+    """
+    event_type = payload.get("type", "")
+    data = payload.get("data") or {}
+    message_id = data.get("email_id")
+    event_id = event_id or f"{event_type}:{message_id}:{payload.get('created_at')}"
 
+    stmt = pg_insert(WebhookEvent).values(
+        provider="resend",
+        event_id=event_id,
+        event_type=event_type,
+        message_id=message_id,
+        payload=payload,
+        occurred_at=_parse_event_time(payload.get("created_at")),
+    ).on_conflict_do_nothing(index_elements=["event_id"])
+    await db.execute(stmt)
     await db.commit()
 
 
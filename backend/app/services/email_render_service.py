@@ -0,0 +1,105 @@
+"""Notification email rendering with compiled, in-process cached Jinja templates.
+
+Templates are compiled once per (template, version) — an EmailTemplate's
+``updated_at`` or DEFAULT_TEMPLATES_VERSION for the built-in bodies — and
+rendered in bulk from context the caller has already fetched, so rendering
+a batch never touches the database.
+"""
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+from jinja2.sandbox import SandboxedEnvironment
+
+logger = logging.getLogger(__name__)
+
+# Bump when DEFAULT_TEMPLATES change so workers recompile them
+DEFAULT_TEMPLATES_VERSION = 1
+
+# Agent-authored templates are untrusted: sandboxed, and bodies are autoescaped
+_body_env = SandboxedEnvironment(autoescape=True)
+_subject_env = SandboxedEnvironment(autoescape=False)
+
+# template key -> (version, compiled subject, compiled body)
+_compiled = {}
+
+DEFAULT_TEMPLATES = {
+    "reminder": (
+        "{{ subject }}",
+        """<p>Hi {{ recipient_name or "there" }},</p>
+<p>This is a reminder that <strong>{{ milestone.title }}</strong>{% if transaction.property_address %} for {{ transaction.property_address }}{% endif %} is due {{ milestone.due_date or "soon" }}.</p>
+<p>Please reach out if anything is holding this up.</p>""",
+    ),
+    "due_today": (
+        "{{ subject }}",
+        """<p>Hi {{ recipient_name or "there" }},</p>
+<p><strong>{{ milestone.title }}</strong>{% if transaction.property_address %} for {{ transaction.property_address }}{% endif %} is due today.</p>
+<p>Please confirm once it is complete.</p>""",
+    ),
+    "overdue": (
+        "{{ subject }}",
+        """<p>Hi {{ recipient_name or "there" }},</p>
+<p><strong>{{ milestone.title }}</strong>{% if transaction.property_address %} for {{ transaction.property_address }}{% endif %} was due {{ milestone.due_date or "recently" }} and is now overdue.</p>
+<p>Please send an update as soon as possible so closing stays on schedule.</p>""",
+    ),
+    "digest": (
+        "{% if items|length == 1 %}{{ items[0].subject }}{% else %}{{ items|length }} transaction reminders{% endif %}",
+        """<p>Hi {{ recipient_name or "there" }},</p>
+<p>Here is your summary of upcoming transaction items:</p>
+<ul>
+{% for item in items %}<li><strong>{{ item.milestone.title or item.subject }}</strong>{% if item.transaction.property_address %} — {{ item.transaction.property_address }}{% endif %}{% if item.milestone.due_date %} (due {{ item.milestone.due_date }}){% endif %}</li>
+{% endfor %}</ul>""",
+    ),
+}
+
+
+def default_template_name(notification_type: str) -> str:
+    """Map a notification type (reminder, due_today, overdue_l1..3, digest) to a built-in template."""
+    if notification_type.startswith("overdue"):
+        return "overdue"
+    return notification_type if notification_type in DEFAULT_TEMPLATES else "reminder"
+
+
+def compiled_template(email_template=None, notification_type: str = "reminder"):
+    """Return (subject, body) compiled templates, compiling only on a new template version."""
+    if email_template is not None:
+        key = str(email_template.id)
+        version = email_template.updated_at
+        sources = (email_template.subject_template, email_template.body_template)
+    else:
+        key = default_template_name(notification_type)
+        version = DEFAULT_TEMPLATES_VERSION
+        sources = DEFAULT_TEMPLATES[key]
+
+    entry = _compiled.get(key)
+    if entry is None or entry[0] != version:
+        entry = (
+            version,
+            _subject_env.from_string(sources[0]),
+            _body_env.from_string(sources[1]),
+        )
+        _compiled[key] = entry
+    return entry[1], entry[2]
+
+
+def render(context: dict, email_template=None, notification_type: str = "reminder") -> Tuple[str, str]:
+    """Render one (subject, html) pair from pre-fetched context."""
+    subject_tmpl, body_tmpl = compiled_template(email_template, notification_type)
+    return subject_tmpl.render(**context).strip(), body_tmpl.render(**context)
+
+
+def render_many(jobs: Iterable[Tuple[dict, Optional[object], str]]) -> List[Tuple[str, str]]:
+    """Render a batch of (context, email_template, notification_type) jobs in order.
+
+    A job whose custom template fails to render falls back to the built-in
+    template so one bad agent template cannot block a send batch.
+    """
+    rendered = []
+    for context, email_template, notification_type in jobs:
+        try:
+            rendered.append(render(context, email_template, notification_type))
+        except Exception as e:
+            if email_template is None:
+                raise
+            logger.warning(f"Email template {email_template.id} failed to render, using default: {e}")
+            rendered.append(render(context, None, notification_type))
+    return rendered
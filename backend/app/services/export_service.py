@@ -0,0 +1,41 @@
+import logging
+from typing import List
+from uuid import UUID
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.export_watermark import ExportWatermark
+from app.models.user import User
+from app.schemas.export import ParquetExportRequest, ParquetExportStarted, ExportDatasetStatus
+
+logger = logging.getLogger(__name__)
+
+# Exports cover every brokerage's rows, so only these roles may run or inspect them
+EXPORT_ROLES = ("broker", "admin")
+
+
+async def _require_export_role(agent_id: UUID, db: AsyncSession) -> None:
+    user = await db.get(User, agent_id)
+    if not user or user.role not in EXPORT_ROLES:
+        raise HTTPException(status_code=403, detail="Only brokers and admins can manage Parquet exports")
+
+
+async def start_parquet_export(
+    data: ParquetExportRequest, agent_id: UUID, db: AsyncSession,
+) -> ParquetExportStarted:
+    """Queue a Parquet export to MinIO; the nightly job runs the same task."""
+    from app.tasks.export_tasks import DATASETS, export_parquet_datasets
+
+    await _require_export_role(agent_id, db)
+    datasets = data.datasets or list(DATASETS)
+    unknown = set(datasets) - set(DATASETS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown datasets: {', '.join(sorted(unknown))}")
+    result = export_parquet_datasets.delay(datasets, data.full)
+    return ParquetExportStarted(task_id=result.id, datasets=datasets, full=data.full)
+
+
+async def list_export_status(agent_id: UUID, db: AsyncSession) -> List[ExportDatasetStatus]:
+    await _require_export_role(agent_id, db)
+    result = await db.execute(select(ExportWatermark).order_by(ExportWatermark.dataset))
+    return [ExportDatasetStatus.model_validate(w) for w in result.scalars().all()]
@@ -0,0 +1,297 @@
+"""Monte Carlo forecast of an agent's commission income from open deals.
+
+Each simulation draws, for every open deal, whether it closes and how far
+its closing slips past the scheduled date. Close probabilities start from
+the historical close rate of finished deals in the same state and financing
+type (shrunk toward the overall rate when there are few), shifted in log-odds
+by the deal's health score and milestone progress. Slippage is more likely
+the more milestones are overdue. All simulations run as numpy array
+operations, in batches that bound memory, and income is bucketed by UTC
+closing month. The simulation runs in a worker thread, off the event loop,
+and the simulation count is capped so one forecast's CPU time is bounded.
+
+Results are cached per agent in pipeline_forecasts; app.forecast_triggers
+invalidates them on pipeline writes.
+"""
+from datetime import datetime, time, timedelta, timezone
+from uuid import UUID
+
+import anyio
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.commission import TransactionCommission, PipelineForecast
+from app.models.milestone import Milestone
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.schemas.commission import (
+    PipelineForecastResponse, ForecastMonth, ForecastTotals, ForecastDeal,
+)
+
+FORECAST_SIMULATIONS = 20_000
+FORECAST_TTL = timedelta(hours=6)  # historical rates drift without any pipeline write
+# Simulations run in batches of at most this many (simulation, deal) cells
+SIMULATION_BATCH_CELLS = 2_000_000
+# Fewer simulations are run for large pipelines so a forecast stays around a second of CPU
+MAX_SIMULATION_CELLS = 20_000_000
+MIN_SIMULATIONS = 1_000
+
+HISTORY_WINDOW = timedelta(days=730)
+DEFAULT_CLOSE_RATE = 0.8
+PRIOR_WEIGHT = 10  # pseudo-deals pulling sparse (state, financing) rates toward the overall rate
+HEALTH_WEIGHT = 3.0  # log-odds shift per unit of health below 100 (health 50 -> -1.5)
+PROGRESS_WEIGHT = 1.5  # log-odds shift per unit of milestone progress around the midpoint
+MIN_CLOSE_PROBABILITY, MAX_CLOSE_PROBABILITY = 0.01, 0.995
+SLIP_PROBABILITY = 0.2
+SLIP_PROBABILITY_PER_OVERDUE = 0.15
+MAX_SLIP_PROBABILITY = 0.9
+SLIP_MEAN_DAYS = 21.0  # exponential
+
+
+async def _historical_close_rates(agent_id: UUID, db: AsyncSession):
+    """({(state, financing_type): rate}, overall rate) over recently finished deals.
+
+    Scoped to the agent's brokerage, or to the agent alone without one.
+    """
+    brokerage_id = (await db.execute(select(User.brokerage_id).where(User.id == agent_id))).scalar_one_or_none()
+    closed = Transaction.status == "closed"
+    stmt = (
+        select(
+            Transaction.property_state,
+            Transaction.financing_type,
+            func.count().filter(closed).label("closed"),
+            func.count().label("finished"),
+        )
+        .where(
+            Transaction.status.in_(["closed", "cancelled"]),
+            Transaction.updated_at >= datetime.now(timezone.utc) - HISTORY_WINDOW,
+        )
+        .group_by(Transaction.property_state, Transaction.financing_type)
+    )
+    if brokerage_id:
+        stmt = stmt.join(User, User.id == Transaction.agent_id).where(User.brokerage_id == brokerage_id)
+    else:
+        stmt = stmt.where(Transaction.agent_id == agent_id)
+    rows = (await db.execute(stmt)).all()
+
+    closed_total = sum(row.closed for row in rows)
+    finished_total = sum(row.finished for row in rows)
+    overall = (closed_total + PRIOR_WEIGHT * DEFAULT_CLOSE_RATE) / (finished_total + PRIOR_WEIGHT)
+    rates = {
+        (row.property_state, row.financing_type): (row.closed + PRIOR_WEIGHT * overall) / (row.finished + PRIOR_WEIGHT)
+        for row in rows
+    }
+    return rates, overall
+
+
+async def _open_deals(agent_id: UUID, db: AsyncSession):
+    """The agent's unpaid commissions on open deals with their milestone counts."""
+    from app.tasks.compliance_tasks import ACTIVE_TRANSACTION_STATUSES, CLOSED_MILESTONE_STATUSES
+
+    now = datetime.now(timezone.utc)
+    milestones = (
+        select(
+            Milestone.transaction_id,
+            func.count().label("total"),
+            func.count().filter(Milestone.status.in_(CLOSED_MILESTONE_STATUSES)).label("done"),
+            func.count().filter(
+                Milestone.status.notin_(CLOSED_MILESTONE_STATUSES), Milestone.due_date < now,
+            ).label("overdue"),
+        )
+        .group_by(Milestone.transaction_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(
+            Transaction.id,
+            Transaction.closing_date,
+            Transaction.health_score,
+            Transaction.property_state,
+            Transaction.financing_type,
+            func.coalesce(
+                TransactionCommission.projected_net, TransactionCommission.gross_commission, 0
+            ).label("income"),
+            func.coalesce(milestones.c.total, 0).label("milestones"),
+            func.coalesce(milestones.c.done, 0).label("done"),
+            func.coalesce(milestones.c.overdue, 0).label("overdue"),
+        )
+        .join(Transaction, Transaction.id == TransactionCommission.transaction_id)
+        .outerjoin(milestones, milestones.c.transaction_id == Transaction.id)
+        .where(
+            TransactionCommission.agent_id == agent_id,
+            TransactionCommission.status != "paid",
+            Transaction.status.in_(ACTIVE_TRANSACTION_STATUSES),
+        )
+        .order_by(Transaction.id)
+    )
+    return result.all()
+
+
+def close_probabilities(base_rate, health_score, progress):
+    """Per-deal close probability: the historical rate shifted in log-odds.
+
+    ``health_score`` is 0-100 (NaN counts as 100, like the compliance rules);
+    ``progress`` is the share of milestones done (NaN without milestones).
+    """
+    health = np.nan_to_num(health_score, nan=100.0) / 100.0
+    progress = np.nan_to_num(progress, nan=0.5)
+    base = np.clip(base_rate, MIN_CLOSE_PROBABILITY, MAX_CLOSE_PROBABILITY)
+    log_odds = np.log(base / (1 - base)) + HEALTH_WEIGHT * (health - 1.0) + PROGRESS_WEIGHT * (progress - 0.5)
+    return np.clip(1 / (1 + np.exp(-log_odds)), MIN_CLOSE_PROBABILITY, MAX_CLOSE_PROBABILITY)
+
+
+def simulate(income, close_probability, slip_probability, scheduled_days, month_edges, simulations, rng):
+    """Run the simulations; returns (income, closings), each shaped (simulations, months).
+
+    ``scheduled_days`` are the deals' closing dates in days from the start of
+    the first month (past dates already moved to now); ``month_edges`` are the
+    month starts in the same units, plus the end of the horizon.
+    """
+    deals = len(income)
+    months = len(month_edges) - 1
+    # Month starts fall on whole days, so a day -> month table replaces a binary search;
+    # the last entry catches everything past the horizon
+    day_month = np.searchsorted(month_edges, np.arange(int(month_edges[-1]) + 1), side="right") - 1
+    income_by_month = np.zeros((simulations, months))
+    closings_by_month = np.zeros((simulations, months))
+    batch = max(1, SIMULATION_BATCH_CELLS // max(deals, 1))
+    for start in range(0, simulations, batch):
+        size = min(batch, simulations - start)
+        closes = rng.random((size, deals), dtype=np.float32) < close_probability
+        slip = rng.standard_exponential((size, deals), dtype=np.float32) * np.float32(SLIP_MEAN_DAYS)
+        slip[rng.random((size, deals), dtype=np.float32) >= slip_probability] = 0
+        day = (scheduled_days + slip).astype(np.int32)
+        month = day_month[np.minimum(day, len(day_month) - 1)]
+        counted = closes & (month < months)
+        # Flatten (simulation, month) so one bincount buckets the whole batch
+        cell = (np.arange(size)[:, None] * months + month)[counted]
+        weights = np.broadcast_to(income, (size, deals))[counted]
+        income_by_month[start:start + size] = np.bincount(cell, weights, minlength=size * months).reshape(size, months)
+        closings_by_month[start:start + size] = np.bincount(cell, minlength=size * months).reshape(size, months)
+    return income_by_month, closings_by_month
+
+
+def _in_horizon_probability(scheduled_days, slip_probability, horizon_days):
+    """P(closing date after slippage falls before the horizon end), in closed form."""
+    room = horizon_days - scheduled_days
+    slipped_in = np.where(room > 0, 1 - np.exp(-np.maximum(room, 0) / SLIP_MEAN_DAYS), 0.0)
+    return np.where(room > 0, (1 - slip_probability) + slip_probability * slipped_in, 0.0)
+
+
+async def compute_pipeline_forecast(
+    agent_id: UUID, db: AsyncSession, simulations: int = FORECAST_SIMULATIONS, months: int = 12, seed=None,
+) -> PipelineForecastResponse:
+    from app.partitioning import add_months, month_start
+
+    now = datetime.now(timezone.utc)
+    rates, overall = await _historical_close_rates(agent_id, db)
+    rows = await _open_deals(agent_id, db)
+    scheduled = [row for row in rows if row.closing_date is not None]
+
+    first_month = month_start(now)
+    horizon_start = datetime.combine(first_month, time.min, tzinfo=timezone.utc)
+    month_edges = np.array([
+        (datetime.combine(add_months(first_month, i), time.min, tzinfo=timezone.utc) - horizon_start).total_seconds() / 86400
+        for i in range(months + 1)
+    ])
+    now_days = (now - horizon_start).total_seconds() / 86400
+
+    income = np.array([float(row.income) for row in scheduled], dtype=float)
+    probability = close_probabilities(
+        np.array([rates.get((row.property_state, row.financing_type), overall) for row in scheduled], dtype=float),
+        np.array([row.health_score if row.health_score is not None else np.nan for row in scheduled], dtype=float),
+        np.array([row.done / row.milestones if row.milestones else np.nan for row in scheduled], dtype=float),
+    )
+    overdue = np.array([row.overdue for row in scheduled], dtype=float)
+    slip_probability = np.minimum(SLIP_PROBABILITY + SLIP_PROBABILITY_PER_OVERDUE * overdue, MAX_SLIP_PROBABILITY)
+    scheduled_days = np.maximum(
+        np.array([(row.closing_date - horizon_start).total_seconds() / 86400 for row in scheduled], dtype=float),
+        now_days,
+    )
+
+    simulations = min(simulations, max(MIN_SIMULATIONS, MAX_SIMULATION_CELLS // max(len(scheduled), 1)))
+    rng = np.random.default_rng(seed)
+    income_by_month, closings_by_month = await anyio.to_thread.run_sync(
+        simulate, income, probability, slip_probability, scheduled_days, month_edges, simulations, rng,
+    )
+    p10, p50, p90 = np.percentile(income_by_month, [10, 50, 90], axis=0)
+    totals = income_by_month.sum(axis=1)
+    # Per-deal expectations are exact rather than read off the draws
+    in_horizon = _in_horizon_probability(scheduled_days, slip_probability, month_edges[-1])
+
+    return PipelineForecastResponse(
+        generated_at=now,
+        simulations=simulations,
+        deal_count=len(rows),
+        unscheduled_deals=len(rows) - len(scheduled),
+        total=ForecastTotals(
+            expected=round(float(totals.mean()), 2),
+            p10=round(float(np.percentile(totals, 10)), 2),
+            p50=round(float(np.percentile(totals, 50)), 2),
+            p90=round(float(np.percentile(totals, 90)), 2),
+        ),
+        by_month=[
+            ForecastMonth(
+                month=add_months(first_month, i).strftime("%Y-%m"),
+                expected_closings=round(float(closings_by_month[:, i].mean()), 4),
+                expected=round(float(income_by_month[:, i].mean()), 2),
+                p10=round(float(p10[i]), 2),
+                p50=round(float(p50[i]), 2),
+                p90=round(float(p90[i]), 2),
+            )
+            for i in range(months)
+        ],
+        deals=[
+            ForecastDeal(
+                transaction_id=row.id,
+                close_probability=round(float(probability[i]), 4),
+                expected_income=round(float(income[i] * probability[i] * in_horizon[i]), 2),
+            )
+            for i, row in enumerate(scheduled)
+        ],
+    )
+
+
+async def get_pipeline_forecast(
+    agent_id: UUID, db: AsyncSession, simulations: int = FORECAST_SIMULATIONS, months: int = 12,
+    refresh: bool = False,
+) -> PipelineForecastResponse:
+    """The cached forecast when it is current and was run with the same parameters; otherwise recompute and cache it.
+
+    The cache is keyed by the requested ``simulations``; the response reports
+    how many were actually run after the MAX_SIMULATION_CELLS cap.
+    """
+    started_at = datetime.now(timezone.utc)
+    if not refresh:
+        cached = (await db.execute(
+            select(PipelineForecast).where(PipelineForecast.agent_id == agent_id)
+        )).scalar_one_or_none()
+        if (
+            cached is not None and cached.result is not None
+            and cached.simulations == simulations and cached.months == months
+            and cached.computed_at > started_at - FORECAST_TTL
+        ):
+            return PipelineForecastResponse(**cached.result, cached=True)
+
+    # Seeded per agent so unchanged inputs give a stable answer
+    forecast = await compute_pipeline_forecast(agent_id, db, simulations, months, seed=agent_id.int)
+    stmt = pg_insert(PipelineForecast).values(
+        agent_id=agent_id, simulations=simulations, months=months,
+        result=forecast.model_dump(mode="json", exclude={"cached"}), computed_at=started_at,
+    )
+    # Don't overwrite an invalidation that happened after the inputs were read
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["agent_id"],
+        set_={
+            "simulations": stmt.excluded.simulations,
+            "months": stmt.excluded.months,
+            "result": stmt.excluded.result,
+            "computed_at": stmt.excluded.computed_at,
+            "updated_at": func.now(),
+        },
+        where=(PipelineForecast.invalidated_at.is_(None)) | (PipelineForecast.invalidated_at < started_at),
+    ))
+    await db.commit()
+    return forecast
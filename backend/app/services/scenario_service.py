@@ -0,0 +1,192 @@
+"""Commission what-if scenarios over an agent's open pipeline.
+
+The pipeline is loaded once into numpy arrays (one element per deal, ordered
+by expected closing date) and every scenario is a handful of array
+operations over them, so thousands of deals evaluate in milliseconds.
+Nothing is written.
+"""
+from dataclasses import dataclass
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.commission import TransactionCommission, CommissionSplit
+from app.models.transaction import Transaction
+from app.schemas.commission import (
+    CommissionScenario, ScenarioRequest, ScenarioTotals, ScenarioResult, ScenarioResponse,
+)
+
+
+@dataclass
+class PipelineArrays:
+    transaction_ids: np.ndarray  # str
+    price: np.ndarray  # NaN when the deal has no usable price
+    gross: np.ndarray  # as recorded
+    # Recorded split amounts and net, for the baseline
+    broker_amount: np.ndarray
+    other_amount: np.ndarray
+    net: np.ndarray
+    # The waterfall each deal is priced by (see commission_plan.apply_plan)
+    referral_pct: np.ndarray  # share of gross
+    referral_flat: np.ndarray
+    broker_pct: np.ndarray  # explicit broker lines, share of gross
+    broker_flat: np.ndarray
+    plan_broker_rate: np.ndarray  # plan company split as recorded, share of gross after referrals
+    plan_team_pct: np.ndarray  # plan team lines, share of the agent's share after the company split
+    other_pct: np.ndarray  # explicit team and other lines, share of gross
+    other_flat: np.ndarray
+
+    def __len__(self):
+        return len(self.gross)
+
+
+async def load_pipeline_arrays(agent_id: UUID, db: AsyncSession) -> PipelineArrays:
+    """One grouped query: the agent's unpaid commissions on open deals with their splits summed by kind."""
+    from app.tasks.compliance_tasks import ACTIVE_TRANSACTION_STATUSES
+
+    split_type = CommissionSplit.split_type
+    is_referral = split_type == "referral"
+    is_broker = split_type == "broker"
+    is_other = ~is_referral & ~is_broker
+    explicit = ~CommissionSplit.from_plan
+    is_pct = CommissionSplit.is_percentage
+
+    def total(condition, amount):
+        return func.coalesce(func.sum(case((condition, func.coalesce(amount, 0)), else_=0)), 0)
+
+    gross = func.coalesce(TransactionCommission.gross_commission, 0)
+    result = await db.execute(
+        select(
+            TransactionCommission.transaction_id,
+            Transaction.purchase_price_value.label("price"),
+            gross.label("gross"),
+            TransactionCommission.projected_net.label("net"),
+            total(is_broker, CommissionSplit.calculated_amount).label("broker_amount"),
+            total(~is_broker, CommissionSplit.calculated_amount).label("other_amount"),
+            total(is_referral, CommissionSplit.calculated_amount).label("referral_amount"),
+            total(is_referral & is_pct, CommissionSplit.percentage).label("referral_pct"),
+            total(is_referral & ~is_pct, CommissionSplit.flat_amount).label("referral_flat"),
+            total(is_broker & explicit & is_pct, CommissionSplit.percentage).label("broker_pct"),
+            total(is_broker & explicit & ~is_pct, CommissionSplit.flat_amount).label("broker_flat"),
+            total(is_broker & CommissionSplit.from_plan, CommissionSplit.calculated_amount).label("plan_broker_amount"),
+            total(is_other & CommissionSplit.from_plan, CommissionSplit.percentage).label("plan_team_pct"),
+            total(is_other & explicit & is_pct, CommissionSplit.percentage).label("other_pct"),
+            total(is_other & explicit & ~is_pct, CommissionSplit.flat_amount).label("other_flat"),
+        )
+        .join(Transaction, Transaction.id == TransactionCommission.transaction_id)
+        .outerjoin(CommissionSplit, CommissionSplit.transaction_commission_id == TransactionCommission.id)
+        .where(
+            TransactionCommission.agent_id == agent_id,
+            TransactionCommission.status != "paid",
+            Transaction.status.in_(ACTIVE_TRANSACTION_STATUSES),
+        )
+        .group_by(TransactionCommission.id, Transaction.id)
+        .order_by(Transaction.closing_date.asc().nulls_last(), Transaction.id)
+    )
+    rows = result.all()
+
+    def column(name):
+        return np.array([float(getattr(r, name)) if getattr(r, name) is not None else np.nan for r in rows], dtype=float)
+
+    gross = column("gross")
+    broker_amount = column("broker_amount")
+    other_amount = column("other_amount")
+    net = column("net")
+    # The plan's company split is graduated and capped at the agent's position; its
+    # recorded amount over the base it was taken from gives the rate that applied
+    base = gross - column("referral_amount")
+    plan_broker_amount = column("plan_broker_amount")
+    plan_broker_rate = np.divide(plan_broker_amount, base, out=np.zeros(len(rows)), where=base > 0)
+
+    return PipelineArrays(
+        transaction_ids=np.array([str(r.transaction_id) for r in rows], dtype=str),
+        price=column("price"),
+        gross=gross,
+        broker_amount=broker_amount,
+        other_amount=other_amount,
+        net=np.where(np.isnan(net), gross - broker_amount - other_amount, net),
+        referral_pct=column("referral_pct"),
+        referral_flat=column("referral_flat"),
+        broker_pct=column("broker_pct"),
+        broker_flat=column("broker_flat"),
+        plan_broker_rate=plan_broker_rate,
+        plan_team_pct=column("plan_team_pct"),
+        other_pct=column("other_pct"),
+        other_flat=column("other_flat"),
+    )
+
+
+def _totals(deal_count, gross, broker, other, net) -> ScenarioTotals:
+    return ScenarioTotals(
+        deal_count=round(float(deal_count), 4),
+        gross=round(float(gross.sum()), 2),
+        broker_split=round(float(broker.sum()), 2),
+        other_splits=round(float(other.sum()), 2),
+        net=round(float(net.sum()), 2),
+    )
+
+
+def recorded_totals(p: PipelineArrays) -> ScenarioTotals:
+    """The pipeline as recorded: gross, split amounts and projected net."""
+    return _totals(len(p), p.gross, p.broker_amount, p.other_amount, p.net)
+
+
+def evaluate_scenario(p: PipelineArrays, scenario: CommissionScenario) -> ScenarioTotals:
+    """Apply ``scenario`` to every deal at once, through the same waterfall as apply_plan.
+
+    Referrals come off gross, the company split off what is left (plan deals)
+    or off gross (explicit broker lines), and plan team lines off the agent's
+    share after that.
+    """
+    weight = np.ones(len(p))
+    if scenario.fall_out_transaction_ids:
+        weight[np.isin(p.transaction_ids, [str(t) for t in scenario.fall_out_transaction_ids])] = 0.0
+    if scenario.fall_out_rate is not None:
+        weight *= 1.0 - float(scenario.fall_out_rate)
+
+    priced = ~np.isnan(p.price)
+    gross = p.gross
+    if scenario.rate is not None:
+        gross = np.where(priced, p.price * float(scenario.rate), gross)
+    if scenario.tiers:
+        tiers = sorted(scenario.tiers, key=lambda t: float(t.get("min", 0)))
+        mins = np.array([float(t.get("min", 0)) for t in tiers])
+        rates = np.array([float(t.get("rate", 0)) for t in tiers])
+        tier = np.searchsorted(mins, np.nan_to_num(p.price, nan=-np.inf), side="right") - 1
+        reached = priced & (tier >= 0)
+        gross = np.where(reached, p.price * rates[np.clip(tier, 0, None)], gross)
+
+    referrals = np.minimum(gross * p.referral_pct + p.referral_flat, gross)
+    after_referrals = gross - referrals
+    if scenario.broker_split_percentage is not None:
+        rate = float(scenario.broker_split_percentage)
+        broker = np.where(p.plan_broker_rate > 0, after_referrals * rate, gross * rate)
+    else:
+        broker = after_referrals * p.plan_broker_rate + gross * p.broker_pct + p.broker_flat
+    gross, referrals, broker = gross * weight, referrals * weight, broker * weight
+    if scenario.annual_cap is not None:
+        # Deals are ordered by expected closing, so the cap is consumed in that order
+        room = max(float(scenario.annual_cap) - float(scenario.cap_paid_to_date), 0.0)
+        paid = np.minimum(np.cumsum(broker), room)
+        broker = np.diff(paid, prepend=0.0)
+    team = (gross - referrals - broker) * p.plan_team_pct
+    other = referrals + team + (gross * p.other_pct + p.other_flat * weight)
+
+    return _totals(weight.sum(), gross, broker, other, gross - broker - other)
+
+
+async def run_scenarios(agent_id: UUID, request: ScenarioRequest, db: AsyncSession) -> ScenarioResponse:
+    pipeline = await load_pipeline_arrays(agent_id, db)
+    baseline = recorded_totals(pipeline)
+    results = []
+    for scenario in request.scenarios:
+        totals = evaluate_scenario(pipeline, scenario)
+        results.append(ScenarioResult(
+            name=scenario.name,
+            totals=totals,
+            delta_gross=round(totals.gross - baseline.gross, 2),
+            delta_net=round(totals.net - baseline.net, 2),
+        ))
+    return ScenarioResponse(deal_count=len(pipeline), baseline=baseline, scenarios=results)
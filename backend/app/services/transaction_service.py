@@ -1,4 +1,6 @@
 import logging
+from decimal import Decimal
+from typing import Optional
 from uuid import UUID
 from fastapi import HTTPException
 from sqlalchemy import select
@@ -39,7 +41,12 @@ async def create_transaction(transaction_create: TransactionCreate, db: AsyncSes
     return TransactionResponse.model_validate(new_transaction)
 
 
-async def list_transactions(pagination_params: PaginationParams, db: AsyncSession):
+async def list_transactions(
+    pagination_params: PaginationParams,
+    db: AsyncSession,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+):
     offset = (pagination_params.page - 1) * pagination_params.limit
     stmt = (
         select(Transaction)
@@ -48,6 +55,11 @@ async def list_transactions(pagination_params: PaginationParams, db: AsyncSessio
         .offset(offset)
         .limit(pagination_params.limit)
     )
+    # Price bounds use the indexed purchase_price_value; deals without a usable price never match
+    if min_price is not None:
+        stmt = stmt.where(Transaction.purchase_price_value >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(Transaction.purchase_price_value <= max_price)
     result = await db.execute(stmt)
     transactions = result.scalars().all()
 
@@ -83,9 +95,17 @@ async def update_transaction(id: UUID, transaction_update: TransactionUpdate, db
         raise HTTPException(status_code=404, detail="Transaction not found")
 
     update_data = transaction_update.model_dump(exclude_unset=True)
+    repricing = {"purchase_price", "closing_date"} & {
+        field for field, value in update_data.items() if getattr(transaction, field) != value
+    }
     for field, value in update_data.items():
         setattr(transaction, field, value)
 
+    # Keep the deal's projected commission in step with its price (and plan year)
+    if repricing:
+        from app.services.commission_service import recalculate_transaction_commission
+        await recalculate_transaction_commission(transaction, db)
+
     # Log amendment
     amendment = Amendment(
         transaction_id=id,
@@ -98,7 +118,8 @@ async def update_transaction(id: UUID, transaction_update: TransactionUpdate, db
     )
     db.add(amendment)
     await db.commit()
-    await db.refresh(transaction, ["parties"])
+    # updated_at is set by the database on update
+    await db.refresh(transaction, ["updated_at", "parties"])
 
     return TransactionResponse.model_validate(transaction)
 
@@ -0,0 +1,244 @@
+"""Celery tasks for brokerage analytics — incremental day x agent rollups."""
+import logging
+from datetime import timedelta
+
+from app.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+_sync_session_factory = None
+
+
+def _get_sync_session():
+    """Create a synchronous database session for Celery tasks."""
+    global _sync_session_factory
+    if _sync_session_factory is None:
+        import os
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+
+        db_url = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:pass@db/ttc")
+        sync_url = db_url.replace("+asyncpg", "")
+        engine = create_engine(sync_url)
+        _sync_session_factory = sessionmaker(bind=engine)
+    return _sync_session_factory()
+
+
+# Keys are refreshed once no write has touched them for this long
+ROLLUP_DEBOUNCE = timedelta(seconds=10)
+ROLLUP_BATCH_SIZE = 5000
+REBUILD_AGENT_CHUNK = 100
+
+METRICS = (
+    "deals_opened", "deals_closed", "closed_volume", "closed_commission",
+    "days_to_close_total", "days_to_close_count",
+    "pipeline_deals", "pipeline_volume", "pipeline_commission",
+    "violations_opened", "violations_resolved",
+)
+
+
+def agent_team_sql(agent_id):
+    """The team an agent's rollups are attributed to: their earliest membership."""
+    from app.models import TeamMember
+    from sqlalchemy import select
+
+    return (
+        select(TeamMember.team_id)
+        .where(TeamMember.user_id == agent_id)
+        .order_by(TeamMember.created_at, TeamMember.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def _day_sql(column):
+    from sqlalchemy import func
+    return func.date(func.timezone("UTC", column))
+
+
+def _rollup_rows(session, agent_ids, days=None):
+    """Recompute rollup metrics for ``agent_ids`` (optionally only on ``days``).
+
+    Returns {(agent_id, day): {metric: value}} for every key with activity.
+    """
+    from app.models import ComplianceViolation, Transaction, TransactionCommission
+    from app.tasks.compliance_tasks import ACTIVE_TRANSACTION_STATUSES
+    from sqlalchemy import select, func, and_, extract
+
+    rows = {}
+
+    def add(stmt, agent, day):
+        if days is not None:
+            stmt = stmt.where(day.in_(days))
+        for row in session.execute(stmt.group_by(agent, day)).mappings():
+            values = rows.setdefault((row["agent_id"], row["day"]), dict.fromkeys(METRICS, 0))
+            for metric in METRICS:
+                if row.get(metric) is not None:
+                    values[metric] = row[metric]
+
+    opened_day = _day_sql(Transaction.created_at)
+    add(
+        select(Transaction.agent_id, opened_day.label("day"), func.count().label("deals_opened"))
+        .where(Transaction.agent_id.in_(agent_ids)),
+        Transaction.agent_id, opened_day,
+    )
+
+    closing_day = _day_sql(Transaction.closing_date)
+    closed = Transaction.status == "closed"
+    pipeline = Transaction.status.in_(ACTIVE_TRANSACTION_STATUSES)
+    timed = and_(closed, Transaction.contract_execution_date.isnot(None))
+    price = Transaction.purchase_price_value
+    commission = func.coalesce(TransactionCommission.actual_gross, TransactionCommission.gross_commission)
+    days_to_close = extract("epoch", Transaction.closing_date - Transaction.contract_execution_date) / 86400
+    add(
+        select(
+            Transaction.agent_id,
+            closing_day.label("day"),
+            func.count().filter(closed).label("deals_closed"),
+            func.coalesce(func.sum(price).filter(closed), 0).label("closed_volume"),
+            func.coalesce(func.sum(commission).filter(closed), 0).label("closed_commission"),
+            func.coalesce(func.sum(days_to_close).filter(timed), 0).label("days_to_close_total"),
+            func.count().filter(timed).label("days_to_close_count"),
+            func.count().filter(pipeline).label("pipeline_deals"),
+            func.coalesce(func.sum(price).filter(pipeline), 0).label("pipeline_volume"),
+            func.coalesce(func.sum(TransactionCommission.gross_commission).filter(pipeline), 0).label("pipeline_commission"),
+        )
+        .outerjoin(TransactionCommission, TransactionCommission.transaction_id == Transaction.id)
+        .where(
+            Transaction.agent_id.in_(agent_ids),
+            Transaction.closing_date.isnot(None),
+            closed | pipeline,
+        ),
+        Transaction.agent_id, closing_day,
+    )
+
+    raised_day = _day_sql(ComplianceViolation.created_at)
+    add(
+        select(ComplianceViolation.agent_id, raised_day.label("day"), func.count().label("violations_opened"))
+        .where(ComplianceViolation.agent_id.in_(agent_ids)),
+        ComplianceViolation.agent_id, raised_day,
+    )
+    resolved_day = _day_sql(ComplianceViolation.resolved_at)
+    add(
+        select(ComplianceViolation.agent_id, resolved_day.label("day"), func.count().label("violations_resolved"))
+        .where(ComplianceViolation.agent_id.in_(agent_ids), ComplianceViolation.resolved_at.isnot(None)),
+        ComplianceViolation.agent_id, resolved_day,
+    )
+    return rows
+
+
+def _refresh_rollups(session, agent_ids, days=None):
+    """Rewrite the rollup rows of ``agent_ids`` on ``days`` (all days when None).
+
+    Keys left without activity are deleted. Returns the number of rows upserted.
+    """
+    from app.models import AnalyticsDailyRollup, User
+    from sqlalchemy import select, delete, func, tuple_
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+    agent_ids = list(agent_ids)
+    rows = _rollup_rows(session, agent_ids, days)
+
+    scope = delete(AnalyticsDailyRollup).where(AnalyticsDailyRollup.agent_id.in_(agent_ids))
+    if days is not None:
+        scope = scope.where(AnalyticsDailyRollup.day.in_(days))
+        if rows:
+            scope = scope.where(tuple_(AnalyticsDailyRollup.agent_id, AnalyticsDailyRollup.day).notin_(list(rows)))
+    session.execute(scope)
+    if not rows:
+        return 0
+
+    attribution = {
+        row.id: (row.brokerage_id, row.team_id)
+        for row in session.execute(
+            select(User.id, User.brokerage_id, agent_team_sql(User.id).label("team_id"))
+            .where(User.id.in_({agent_id for agent_id, _ in rows}))
+        )
+    }
+    values = []
+    for (agent_id, day), metrics in sorted(rows.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        brokerage_id, team_id = attribution.get(agent_id, (None, None))
+        values.append({"agent_id": agent_id, "day": day, "brokerage_id": brokerage_id, "team_id": team_id, **metrics})
+    for start in range(0, len(values), ROLLUP_BATCH_SIZE):
+        stmt = pg_insert(AnalyticsDailyRollup).values(values[start:start + ROLLUP_BATCH_SIZE])
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=["agent_id", "day"],
+            set_={
+                **{column: stmt.excluded[column] for column in ("brokerage_id", "team_id", *METRICS)},
+                "updated_at": func.now(),
+            },
+        ))
+    return len(values)
+
+
+@celery_app.task(name="app.tasks.analytics_tasks.refresh_analytics_rollups")
+def refresh_analytics_rollups():
+    """Every 15s: recompute the (agent, day) rollups whose source rows changed.
+
+    Keys are queued by app.analytics_triggers (and the compliance evaluator)
+    and only picked up once no write has touched them for ROLLUP_DEBOUNCE.
+    """
+    from app.models import AnalyticsRollupChange
+    from sqlalchemy import select, delete
+    from datetime import datetime, timezone
+
+    session = _get_sync_session()
+    try:
+        cutoff = datetime.now(timezone.utc) - ROLLUP_DEBOUNCE
+        due = select(AnalyticsRollupChange.id).where(
+            AnalyticsRollupChange.requested_at <= cutoff
+        ).limit(ROLLUP_BATCH_SIZE).with_for_update(skip_locked=True)
+        # Claim by deleting: a write after this point queues the key again
+        keys = session.execute(
+            delete(AnalyticsRollupChange)
+            .where(AnalyticsRollupChange.id.in_(due.scalar_subquery()))
+            .returning(AnalyticsRollupChange.agent_id, AnalyticsRollupChange.day)
+        ).all()
+        if not keys:
+            session.commit()
+            return
+
+        # One pass over the claimed agents and days; extra (agent, day)
+        # combinations it touches are recomputed from source too, so stay correct
+        upserted = _refresh_rollups(session, {key.agent_id for key in keys}, {key.day for key in keys})
+        session.commit()
+        logger.info(f"Refreshed {upserted} analytics rollups for {len(keys)} changed keys")
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error refreshing analytics rollups: {e}")
+        raise
+    finally:
+        session.close()
+
+
+@celery_app.task(name="app.tasks.analytics_tasks.rebuild_analytics_rollups")
+def rebuild_analytics_rollups(brokerage_id: str = None):
+    """Recompute all rollups from source, e.g. after a backfill or bulk statement.
+
+    Not scheduled; run once after deploying the rollup tables and whenever
+    rows were changed by statements that bypass the session hooks.
+    """
+    from app.models import User
+    from sqlalchemy import select
+    from uuid import UUID
+
+    session = _get_sync_session()
+    try:
+        stmt = select(User.id).order_by(User.id)
+        if brokerage_id:
+            stmt = stmt.where(User.brokerage_id == UUID(str(brokerage_id)))
+        agent_ids = session.execute(stmt).scalars().all()
+        rows = 0
+        # Commit per chunk so a large rebuild never holds long row locks
+        for start in range(0, len(agent_ids), REBUILD_AGENT_CHUNK):
+            rows += _refresh_rollups(session, agent_ids[start:start + REBUILD_AGENT_CHUNK])
+            session.commit()
+        logger.info(f"Rebuilt {rows} analytics rollups for {len(agent_ids)} agents")
+        return {"agents": len(agent_ids), "rows": rows}
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error rebuilding analytics rollups: {e}")
+        raise
+    finally:
+        session.close()
@@ -0,0 +1,219 @@
+"""Batch helpers for Celery jobs.
+
+Maintenance: large UPDATE/DELETE maintenance is run as a series of short
+transactions of at most ``batch_size`` rows, walking the table in
+(created_at, id) order with a pause between batches so row locks stay brief
+and replicas keep up. The keyset position is committed with each batch in
+maintenance_checkpoints, so a run that dies part-way resumes after the last
+committed batch.
+
+Partitioned jobs: nightly jobs fan out one Celery task per partition (a
+brokerage, say). Each partition commits on its own together with its
+batch_job_partitions row, so re-running the coordinator for the same run key
+only dispatches partitions that have not finished. Partition work streams
+rows through server-side cursors rather than materializing them.
+"""
+import logging
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_PAUSE_SECONDS = 0.2
+
+# Rows fetched per round-trip when streaming through a server-side cursor
+STREAM_CHUNK_SIZE = 1000
+
+
+def run_batched(
+    session,
+    job_name,
+    model,
+    criteria,
+    values=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    pause_seconds=DEFAULT_PAUSE_SECONDS,
+    max_batches=None,
+):
+    """Delete (or, given ``values``, update) rows of ``model`` matching ``criteria`` in batches.
+
+    ``model`` needs ``id`` and ``created_at`` columns. Returns progress stats:
+    rows and batches this run, total rows for the (possibly resumed) run,
+    elapsed seconds, rows/s and whether the run reached the end.
+    """
+    from app.models import MaintenanceCheckpoint
+    from sqlalchemy import select, update, delete, tuple_
+
+    checkpoint = session.execute(
+        select(MaintenanceCheckpoint).where(MaintenanceCheckpoint.job_name == job_name)
+    ).scalar_one_or_none()
+    if checkpoint is None:
+        checkpoint = MaintenanceCheckpoint(job_name=job_name)
+        session.add(checkpoint)
+    if checkpoint.started_at is None or checkpoint.finished_at is not None:
+        checkpoint.last_created_at = None
+        checkpoint.last_id = None
+        checkpoint.rows_processed = 0
+        checkpoint.batches = 0
+        checkpoint.started_at = datetime.now(timezone.utc)
+        checkpoint.finished_at = None
+    else:
+        logger.info(f"Resuming {job_name} after {checkpoint.rows_processed} rows")
+    session.commit()
+
+    start = time.perf_counter()
+    rows = 0
+    batches = 0
+    finished = False
+    while max_batches is None or batches < max_batches:
+        stmt = (
+            select(model.id, model.created_at)
+            .where(*criteria)
+            .order_by(model.created_at, model.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        if checkpoint.last_created_at is not None:
+            stmt = stmt.where(
+                tuple_(model.created_at, model.id) > (checkpoint.last_created_at, checkpoint.last_id)
+            )
+        keys = session.execute(stmt).all()
+        if not keys:
+            finished = True
+            break
+
+        # The created_at bounds let Postgres prune partitioned tables to the batch's range
+        in_batch = (
+            model.id.in_([key.id for key in keys]),
+            model.created_at >= keys[0].created_at,
+            model.created_at <= keys[-1].created_at,
+        )
+        if values is None:
+            stmt = delete(model).where(*in_batch)
+        else:
+            stmt = update(model).where(*in_batch).values(**values)
+        result = session.execute(stmt.execution_options(synchronize_session=False))
+
+        checkpoint.last_id, checkpoint.last_created_at = keys[-1]
+        checkpoint.rows_processed += result.rowcount
+        checkpoint.batches += 1
+        session.commit()
+
+        rows += result.rowcount
+        batches += 1
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"{job_name}: batch {checkpoint.batches}, {checkpoint.rows_processed} rows "
+            f"({rows / elapsed if elapsed else 0:,.0f} rows/s)"
+        )
+        if len(keys) < batch_size:
+            finished = True
+            break
+        time.sleep(pause_seconds)
+
+    if finished:
+        checkpoint.finished_at = datetime.now(timezone.utc)
+        session.commit()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "job": job_name,
+        "rows": rows,
+        "batches": batches,
+        "total_rows": checkpoint.rows_processed,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed else 0.0,
+        "finished": finished,
+    }
+
+
+def stream_chunks(session, stmt, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the rows of ``stmt`` in lists of ``chunk_size`` through a server-side cursor."""
+    result = session.execute(stmt.execution_options(yield_per=chunk_size))
+    yield from result.partitions()
+
+
+def dispatch_partitions(session, task, job_name, run_key, partition_keys):
+    """Record a run's partitions and enqueue ``task(run_key, partition_key)`` for each unfinished one."""
+    from app.models import BatchJobPartition
+    from sqlalchemy import select
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+    if partition_keys:
+        session.execute(
+            pg_insert(BatchJobPartition)
+            .values([
+                {"job_name": job_name, "run_key": run_key, "partition_key": key, "status": "pending", "attempts": 0}
+                for key in partition_keys
+            ])
+            .on_conflict_do_nothing(index_elements=["job_name", "run_key", "partition_key"])
+        )
+    done = set(session.execute(
+        select(BatchJobPartition.partition_key).where(
+            BatchJobPartition.job_name == job_name,
+            BatchJobPartition.run_key == run_key,
+            BatchJobPartition.status == "done",
+        )
+    ).scalars().all())
+    session.commit()
+
+    pending = [key for key in partition_keys if key not in done]
+    for key in pending:
+        task.apply_async(args=[run_key, key])
+    logger.info(f"{job_name} {run_key}: dispatched {len(pending)} of {len(partition_keys)} partitions")
+    return pending
+
+
+def run_partition(session, job_name, run_key, partition_key, work):
+    """Run ``work(session, partition_key)`` as one committed unit and record its outcome and timing.
+
+    ``work`` returns the number of rows it processed. Its writes commit
+    together with the partition's ``done`` status.
+    """
+    from app.models import BatchJobPartition
+    from sqlalchemy import update
+
+    key = (
+        BatchJobPartition.job_name == job_name,
+        BatchJobPartition.run_key == run_key,
+        BatchJobPartition.partition_key == partition_key,
+    )
+    session.execute(
+        update(BatchJobPartition).where(*key).values(
+            status="running",
+            attempts=BatchJobPartition.attempts + 1,
+            started_at=datetime.now(timezone.utc),
+            error=None,
+        )
+    )
+    session.commit()
+
+    start = time.perf_counter()
+    try:
+        rows = work(session, partition_key)
+        elapsed = time.perf_counter() - start
+        session.execute(
+            update(BatchJobPartition).where(*key).values(
+                status="done",
+                rows=rows,
+                finished_at=datetime.now(timezone.utc),
+                duration_seconds=elapsed,
+            )
+        )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        session.execute(
+            update(BatchJobPartition).where(*key).values(
+                status="failed",
+                finished_at=datetime.now(timezone.utc),
+                duration_seconds=time.perf_counter() - start,
+                error=str(e)[:2000],
+            )
+        )
+        session.commit()
+        raise
+
+    logger.info(f"{job_name} {run_key} partition {partition_key}: {rows} rows in {elapsed:.2f}s")
+    return {"partition": partition_key, "rows": rows, "seconds": round(elapsed, 3)}
@@ -0,0 +1,179 @@
+"""Celery tasks for commission plans — plan-year positions and bulk repricing."""
+import logging
+
+from app.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+_sync_session_factory = None
+
+
+def _get_sync_session():
+    """Create a synchronous database session for Celery tasks."""
+    global _sync_session_factory
+    if _sync_session_factory is None:
+        import os
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+
+        db_url = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:pass@db/ttc")
+        sync_url = db_url.replace("+asyncpg", "")
+        engine = create_engine(sync_url)
+        _sync_session_factory = sessionmaker(bind=engine)
+    return _sync_session_factory()
+
+
+RECOMPUTE_BATCH_SIZE = 500
+
+
+def _ytd_positions_sql():
+    """(agent_id, plan_year, gross, company_dollar, deals) of every paid commission, grouped.
+
+    Mirrors commission_service._ytd_contribution: the plan year of
+    plan_year_date (set when the commission was paid; the closing date or
+    last update for rows paid before it existed), gross after referral
+    fees, and broker splits as company dollar.
+    """
+    from app.models import CommissionConfig, CommissionSplit, Transaction, TransactionCommission
+    from sqlalchemy import select, func, case, extract, Integer
+
+    splits = (
+        select(
+            CommissionSplit.transaction_commission_id,
+            func.sum(CommissionSplit.calculated_amount).filter(CommissionSplit.split_type == "referral").label("referrals"),
+            func.sum(CommissionSplit.calculated_amount).filter(CommissionSplit.split_type == "broker").label("company_dollar"),
+        )
+        .group_by(CommissionSplit.transaction_commission_id)
+        .subquery()
+    )
+    closed_at = func.timezone("UTC", func.coalesce(
+        TransactionCommission.plan_year_date, Transaction.closing_date, TransactionCommission.updated_at,
+    ))
+    start_month = func.coalesce(CommissionConfig.plan_year_start_month, 1)
+    year = (
+        extract("year", closed_at) - case((extract("month", closed_at) < start_month, 1), else_=0)
+    ).cast(Integer)
+    gross = func.coalesce(TransactionCommission.actual_gross, TransactionCommission.gross_commission, 0)
+    return (
+        select(
+            TransactionCommission.agent_id,
+            year.label("plan_year"),
+            func.sum(gross - func.coalesce(splits.c.referrals, 0)).label("gross"),
+            func.sum(func.coalesce(splits.c.company_dollar, 0)).label("company_dollar"),
+            func.count().label("deals"),
+        )
+        .join(Transaction, Transaction.id == TransactionCommission.transaction_id)
+        .outerjoin(CommissionConfig, CommissionConfig.agent_id == TransactionCommission.agent_id)
+        .outerjoin(splits, splits.c.transaction_commission_id == TransactionCommission.id)
+        .where(TransactionCommission.status == "paid")
+        .group_by(TransactionCommission.agent_id, year)
+    )
+
+
+def _rebuild_positions(session, agent_id=None):
+    """Replace the positions of ``agent_id`` (all agents when None); returns the rows written."""
+    from app.models import AgentCommissionYTD, TransactionCommission
+    from sqlalchemy import select, delete, func
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+    positions = _ytd_positions_sql()
+    scope = delete(AgentCommissionYTD)
+    if agent_id:
+        positions = positions.where(TransactionCommission.agent_id == agent_id)
+        scope = scope.where(AgentCommissionYTD.agent_id == agent_id)
+    positions = positions.subquery()
+    session.execute(scope)
+    columns = ["agent_id", "plan_year", "gross", "company_dollar", "deals"]
+    return session.execute(
+        pg_insert(AgentCommissionYTD).from_select(
+            ["id", *columns],
+            select(func.gen_random_uuid(), *(positions.c[column] for column in columns)),
+        )
+    ).rowcount
+
+
+@celery_app.task(name="app.tasks.commission_tasks.rebuild_commission_ytd")
+def rebuild_commission_ytd(agent_id: str = None):
+    """Recompute plan-year positions from the paid commissions.
+
+    Not scheduled; positions are posted incrementally as commissions are
+    paid. Run once after deploying plans and after bulk statements that
+    bypass commission_service.
+    """
+    from uuid import UUID
+
+    session = _get_sync_session()
+    try:
+        rows = _rebuild_positions(session, UUID(str(agent_id)) if agent_id else None)
+        session.commit()
+        logger.info(f"Rebuilt {rows} commission plan-year positions")
+        return {"positions": rows}
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error rebuilding commission positions: {e}")
+        raise
+    finally:
+        session.close()
+
+
+@celery_app.task(name="app.tasks.commission_tasks.recompute_agent_commissions")
+def recompute_agent_commissions(agent_id: str, rebuild_positions: bool = False):
+    """Reprice every unpaid commission of an agent, e.g. after their plan changed.
+
+    Queued by commission_service.upsert_config. Commissions are repriced in
+    chunks, each committed on its own, against the plan and plan-year
+    positions read once up front. ``rebuild_positions`` first recomputes the
+    positions, for when the plan year start moved.
+    """
+    from app.models import AgentCommissionYTD, CommissionConfig, Transaction, TransactionCommission
+    from app.services.commission_plan import CommissionPlan, plan_year
+    from app.services.commission_service import reprice_commission
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    from datetime import datetime, timezone
+    from decimal import Decimal
+    from uuid import UUID
+
+    agent_id = UUID(str(agent_id))
+    session = _get_sync_session()
+    try:
+        if rebuild_positions:
+            _rebuild_positions(session, agent_id)
+        config = session.execute(
+            select(CommissionConfig).where(CommissionConfig.agent_id == agent_id)
+        ).scalar_one_or_none()
+        plan = CommissionPlan.from_config(config) if config else None
+        positions = {
+            row.plan_year: (row.gross, row.company_dollar)
+            for row in session.execute(select(AgentCommissionYTD).where(AgentCommissionYTD.agent_id == agent_id)).scalars()
+        }
+        commission_ids = session.execute(
+            select(TransactionCommission.id)
+            .where(TransactionCommission.agent_id == agent_id, TransactionCommission.status != "paid")
+            .order_by(TransactionCommission.id)
+        ).scalars().all()
+
+        now = datetime.now(timezone.utc)
+        for start in range(0, len(commission_ids), RECOMPUTE_BATCH_SIZE):
+            rows = session.execute(
+                select(TransactionCommission, Transaction.purchase_price_value, Transaction.closing_date)
+                .join(Transaction, Transaction.id == TransactionCommission.transaction_id)
+                .options(selectinload(TransactionCommission.splits))
+                .where(TransactionCommission.id.in_(commission_ids[start:start + RECOMPUTE_BATCH_SIZE]))
+            ).all()
+            for commission, purchase_price, closing_date in rows:
+                position = None
+                if plan is not None:
+                    year = plan_year(closing_date or now, plan.year_start_month)
+                    position = positions.get(year, (Decimal("0"), Decimal("0")))
+                reprice_commission(commission, purchase_price, plan, position)
+            session.commit()
+        logger.info(f"Recomputed {len(commission_ids)} commissions for agent {agent_id}")
+        return {"commissions": len(commission_ids)}
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error recomputing commissions for agent {agent_id}: {e}")
+        raise
+    finally:
+        session.close()
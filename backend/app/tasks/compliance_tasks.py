@@ -1,89 +1,93 @@
 """Celery tasks for Phase 7: Brokerage — compliance evaluation and performance snapshots."""
 import logging
-from datetime import date
+from collections import defaultdict
+from datetime import date, timedelta
 
 from app.celery_app import celery_app
 
 logger = logging.getLogger(__name__)
 
 
+# Nightly jobs fan out one task per brokerage, so the engine is shared per worker process
+_sync_session_factory = None
+
+
 def _get_sync_session():
-    import os
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
-    db_url = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:pass@db/ttc")
-    sync_url = db_url.replace("+asyncpg", "")
-    engine = create_engine(sync_url)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """Create a synchronous database session for Celery tasks."""
+    global _sync_session_factory
+    if _sync_session_factory is None:
+        import os
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+
+        db_url = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:pass@db/ttc")
+        sync_url = db_url.replace("+asyncpg", "")
+        engine = create_engine(sync_url)
+        _sync_session_factory = sessionmaker(bind=engine)
+    return _sync_session_factory()
+
+
+ACTIVE_TRANSACTION_STATUSES = ("active", "confirmed", "pending_close")
+CLOSED_MILESTONE_STATUSES = ("completed", "waived", "cancelled")
+
+# Tables each rule type reads. Every rule also reads transactions, whose
+# status and agent decide which transactions are in scope.
+RULE_DEPENDENCIES = {
+    "milestone_deadline": {"transactions", "milestones"},
+    "required_party": {"transactions", "parties"},
+    "required_document": {"transactions", "files"},
+    "required_communication": {"transactions", "communications"},
+    "health_score_min": {"transactions"},
+    "closing_date_required": {"transactions"},
+}
+
+# Re-evaluate a transaction once its writes have been quiet this long
+REEVALUATION_DEBOUNCE = timedelta(seconds=30)
+REEVALUATION_BATCH_SIZE = 1000
+
+
+def rule_types_reading(table):
+    """Rule types whose result can change when ``table`` is written."""
+    return _RULE_TYPES_BY_TABLE.get(table, ())
+
+
+_RULE_TYPES_BY_TABLE = {}
+for _rule_type, _tables in RULE_DEPENDENCIES.items():
+    for _table in _tables:
+        _RULE_TYPES_BY_TABLE.setdefault(_table, []).append(_rule_type)
 
 
 @celery_app.task(name="app.tasks.compliance_tasks.evaluate_all_compliance")
 def evaluate_all_compliance():
-    """Nightly: evaluate compliance rules for all active brokerage transactions."""
+    """Nightly: full consistency check of compliance results, one task per brokerage.
+
+    Results are normally kept current by reevaluate_pending_compliance; this
+    run re-checks everything and reports how many results had drifted.
+    """
     from app.models.brokerage import Brokerage, ComplianceRule
-    from app.models import Transaction
+    from app.tasks.batching import dispatch_partitions
     from sqlalchemy import select
-    from sqlalchemy.orm import selectinload
 
     session = _get_sync_session()
     try:
-        # Get all active brokerages
-        brokerages = session.execute(
-            select(Brokerage).where(Brokerage.is_active == True)
-        ).scalars().all()
-
-        total_checks = 0
-        for brokerage in brokerages:
-            rules = session.execute(
-                select(ComplianceRule).where(
-                    ComplianceRule.brokerage_id == brokerage.id,
+        brokerage_ids = session.execute(
+            select(Brokerage.id)
+            .where(
+                Brokerage.is_active == True,
+                select(ComplianceRule.id).where(
+                    ComplianceRule.brokerage_id == Brokerage.id,
                     ComplianceRule.is_active == True,
-                )
-            ).scalars().all()
-
-            if not rules:
-                continue
-
-            # Get all active transactions for this brokerage's agents
-            from app.models.brokerage import BrokerageAgent
-            agent_ids = session.execute(
-                select(BrokerageAgent.user_id).where(
-                    BrokerageAgent.brokerage_id == brokerage.id,
-                    BrokerageAgent.is_active == True,
-                )
-            ).scalars().all()
-
-            if not agent_ids:
-                continue
-
-            transactions = session.execute(
-                select(Transaction)
-                .options(
-                    selectinload(Transaction.milestones),
-                    selectinload(Transaction.parties),
-                    selectinload(Transaction.files),
-                    selectinload(Transaction.communications),
-                )
-                .where(
-                    Transaction.agent_id.in_(agent_ids),
-                    Transaction.status.in_(["active", "confirmed", "pending_close"]),
-                )
-            ).scalars().all()
-
-            for txn in transactions:
-                for rule in rules:
-                    # Check if rule applies to this transaction status
-                    applies_to = rule.applies_to_status
-                    if applies_to and txn.status not in applies_to:
-                        continue
-
-                    passed = _evaluate_rule(txn, rule)
-                    _upsert_compliance_check(session, txn.id, rule.id, txn.agent_id, passed, rule.severity)
-                    total_checks += 1
-
-        session.commit()
-        logger.info(f"Compliance evaluation complete: {total_checks} checks across {len(brokerages)} brokerages")
+                ).exists(),
+            )
+            .order_by(Brokerage.id)
+        ).scalars().all()
+        dispatch_partitions(
+            session,
+            evaluate_brokerage_compliance,
+            "evaluate_all_compliance",
+            date.today().isoformat(),
+            [str(brokerage_id) for brokerage_id in brokerage_ids],
+        )
     except Exception as e:
         session.rollback()
         logger.error(f"Error in compliance evaluation: {e}")
@@ -92,164 +96,405 @@ def evaluate_all_compliance():
         session.close()
 
 
-def _evaluate_rule(transaction, rule):
-    """Evaluate a single compliance rule against a transaction."""
-    params = rule.parameters or {}
+@celery_app.task(name="app.tasks.compliance_tasks.evaluate_brokerage_compliance")
+def evaluate_brokerage_compliance(run_key, brokerage_id):
+    """Evaluate every active rule of one brokerage, as one partition of evaluate_all_compliance."""
+    from app.tasks.batching import run_partition
+
+    session = _get_sync_session()
+    try:
+        return run_partition(session, "evaluate_all_compliance", run_key, brokerage_id, _evaluate_brokerage)
+    except Exception as e:
+        logger.error(f"Error evaluating compliance for brokerage {brokerage_id}: {e}")
+        raise
+    finally:
+        session.close()
+
+
+def _evaluate_brokerage(session, brokerage_id):
+    from app.models.brokerage import ComplianceRule
+    from sqlalchemy import select
+
+    rules = session.execute(
+        select(ComplianceRule).where(
+            ComplianceRule.brokerage_id == brokerage_id,
+            ComplianceRule.is_active == True,
+        )
+    ).scalars().all()
+
+    total_checks = 0
+    total_failing = 0
+    total_changed = 0
+    for rule in rules:
+        checked, failing, changed = _evaluate_rule(session, rule)
+        total_checks += checked
+        total_failing += failing
+        total_changed += changed
+
+    logger.info(
+        f"Compliance evaluation for brokerage {brokerage_id}: {total_checks} checks, "
+        f"{total_failing} failing across {len(rules)} rules"
+    )
+    if total_changed:
+        # Non-zero outside of new or edited rules means the incremental path missed a write
+        logger.warning(f"Compliance consistency check changed {total_changed} results for brokerage {brokerage_id}")
+    return total_checks
+
+
+def _rule_predicate(rule, now):
+    """Compile a rule into a SQL boolean that is true when a transaction passes it.
+
+    The expression is correlated with Transaction, so one query evaluates the
+    rule for every transaction in scope. Returns None for rule types that are
+    not evaluated automatically.
+    """
+    from app.models import Transaction, Milestone, Party, File, Communication
+    from sqlalchemy import select, exists, func, true
+    from datetime import datetime, time, timedelta
+
+    params = rule.conditions or {}
 
     if rule.rule_type == "milestone_deadline":
         max_overdue = params.get("max_overdue_days", 0)
-        for m in transaction.milestones:
-            if m.status in ("completed", "waived", "cancelled"):
-                continue
-            if m.due_date:
-                days_overdue = (date.today() - m.due_date.date()).days if hasattr(m.due_date, 'date') else 0
-                if days_overdue > max_overdue:
-                    return False
-        return True
+        # Overdue by more than max_overdue whole days, as of today's date
+        cutoff = datetime.combine(now.date() - timedelta(days=max_overdue), time.min, tzinfo=now.tzinfo)
+        return ~exists().where(
+            Milestone.transaction_id == Transaction.id,
+            Milestone.status.notin_(CLOSED_MILESTONE_STATUSES),
+            Milestone.due_date < cutoff,
+        )
 
     elif rule.rule_type == "required_party":
         required_role = params.get("role")
         if required_role:
-            return any(p.role == required_role for p in transaction.parties)
-        return True
+            return exists().where(Party.transaction_id == Transaction.id, Party.role == required_role)
+        return true()
 
     elif rule.rule_type == "required_document":
         required_type = params.get("content_type")
         if required_type:
-            return any(f.content_type == required_type for f in transaction.files)
-        return True
+            return exists().where(File.transaction_id == Transaction.id, File.content_type == required_type)
+        return true()
 
     elif rule.rule_type == "required_communication":
         min_count = params.get("min_count", 1)
-        return len(transaction.communications) >= min_count
+        # Counting stops at min_count rows
+        found = (
+            select(Communication.id)
+            .where(Communication.transaction_id == Transaction.id)
+            .limit(min_count)
+            .correlate(Transaction)
+            .subquery()
+        )
+        return select(func.count()).select_from(found).scalar_subquery() >= min_count
 
     elif rule.rule_type == "health_score_min":
         min_score = params.get("min_score", 50)
-        return (transaction.health_score or 100) >= min_score
+        return func.coalesce(Transaction.health_score, 100) >= min_score
 
     elif rule.rule_type == "closing_date_required":
-        return transaction.closing_date is not None
+        return Transaction.closing_date.isnot(None)
+
+    return None
+
+
+def _evaluate_rule(session, rule, transaction_ids=None):
+    """Evaluate one rule for all of its brokerage's in-scope transactions with a single query.
+
+    Failing transactions get an open violation (bulk upsert); open violations
+    of passing transactions are resolved. A violation someone resolved by
+    hand is an override and is not reopened. Returns (checked, failing,
+    changed), where changed counts violations opened or resolved.
+    """
+    from app.models import Transaction, User
+    from app.models.brokerage import ComplianceViolation
+    from app.tasks.batching import stream_chunks
+    from sqlalchemy import select, exists
+    from datetime import datetime, timezone
+
+    now = datetime.now(timezone.utc)
+    predicate = _rule_predicate(rule, now)
+    if predicate is None:
+        logger.debug(f"Compliance rule {rule.id} has type {rule.rule_type!r}, which is not evaluated automatically")
+        return 0, 0, 0
+
+    statuses = (rule.conditions or {}).get("applies_to_status") or ACTIVE_TRANSACTION_STATUSES
+    overridden = exists().where(
+        ComplianceViolation.rule_id == rule.id,
+        ComplianceViolation.transaction_id == Transaction.id,
+        ComplianceViolation.resolved == True,
+        ComplianceViolation.resolved_by.isnot(None),
+    )
+    stmt = (
+        select(
+            Transaction.id,
+            Transaction.agent_id,
+            predicate.label("passed"),
+            overridden.label("overridden"),
+        )
+        .join(User, User.id == Transaction.agent_id)
+        .where(User.brokerage_id == rule.brokerage_id, Transaction.status.in_(statuses))
+    )
+    if transaction_ids is not None:
+        stmt = stmt.where(Transaction.id.in_(transaction_ids))
+
+    checked = 0
+    failing_count = 0
+    changed = 0
+    for rows in stream_chunks(session, stmt):
+        failing = [row for row in rows if not row.passed and not row.overridden]
+        passing_ids = [row.id for row in rows if row.passed]
+        changed += _write_rule_results(session, rule, failing, passing_ids, now)
+        checked += len(rows)
+        failing_count += len(failing)
+    return checked, failing_count, changed
+
+
+def _write_rule_results(session, rule, failing, passing_ids, now):
+    """Upsert open violations for failing rows and resolve those of passing transactions.
+
+    Returns the number of violations newly opened or resolved; their
+    analytics rollups are queued for refresh.
+    """
+    from app.analytics_triggers import queue_rollup_keys
+    from app.models.brokerage import ComplianceViolation
+    from sqlalchemy import update, literal_column
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+    changed = 0
+    rollup_keys = set()
+    if failing:
+        message = rule.description or f"Failed compliance rule: {rule.name}"
+        stmt = pg_insert(ComplianceViolation).values([
+            {
+                "rule_id": rule.id,
+                "transaction_id": row.id,
+                "agent_id": row.agent_id,
+                "severity": rule.severity,
+                "message": message,
+                "resolved": False,
+            }
+            for row in failing
+        ])
+        inserted = session.execute(stmt.on_conflict_do_update(
+            index_elements=["rule_id", "transaction_id"],
+            index_where=ComplianceViolation.resolved == False,
+            set_={
+                "agent_id": stmt.excluded.agent_id,
+                "severity": stmt.excluded.severity,
+                "message": stmt.excluded.message,
+                "updated_at": now,
+            },
+        ).returning(
+            literal_column("xmax = 0").label("inserted"),
+            ComplianceViolation.agent_id,
+            ComplianceViolation.created_at,
+        )).all()
+        opened = [row for row in inserted if row.inserted]
+        rollup_keys.update((row.agent_id, row.created_at) for row in opened)
+        changed += len(opened)
+    if passing_ids:
+        resolved = session.execute(
+            update(ComplianceViolation)
+            .where(
+                ComplianceViolation.rule_id == rule.id,
+                ComplianceViolation.resolved == False,
+                ComplianceViolation.transaction_id.in_(passing_ids),
+            )
+            .values(resolved=True, resolved_at=now, updated_at=now)
+            .returning(ComplianceViolation.agent_id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        rollup_keys.update((agent_id, now) for agent_id in resolved)
+        changed += len(resolved)
+    queue_rollup_keys(session.connection(), rollup_keys)
+    return changed
 
-    return True
 
+@celery_app.task(name="app.tasks.compliance_tasks.reevaluate_pending_compliance")
+def reevaluate_pending_compliance():
+    """Every 30s: re-evaluate (transaction, rule type) pairs whose inputs changed.
 
-def _upsert_compliance_check(session, transaction_id, rule_id, agent_id, passed, severity):
-    """Create or update a compliance check record."""
-    from app.models.brokerage import ComplianceCheck
-    from sqlalchemy import select
+    Pairs are queued by app.compliance_triggers and only picked up once no
+    write has touched them for REEVALUATION_DEBOUNCE.
+    """
+    from app.models import Transaction, User
+    from app.models.brokerage import ComplianceRule, ComplianceReevaluation
+    from sqlalchemy import select, delete
+    from datetime import datetime, timezone
 
-    existing = session.execute(
-        select(ComplianceCheck).where(
-            ComplianceCheck.transaction_id == transaction_id,
-            ComplianceCheck.rule_id == rule_id,
-        )
-    ).scalar_one_or_none()
-
-    status = "pass" if passed else ("warning" if severity == "warning" else "fail")
-
-    if existing:
-        if existing.status != "overridden":
-            existing.status = status
-            existing.checked_at = date.today()
-    else:
-        check = ComplianceCheck(
-            transaction_id=transaction_id,
-            rule_id=rule_id,
-            agent_id=agent_id,
-            status=status,
-        )
-        session.add(check)
+    session = _get_sync_session()
+    try:
+        cutoff = datetime.now(timezone.utc) - REEVALUATION_DEBOUNCE
+        due = select(ComplianceReevaluation.id).where(
+            ComplianceReevaluation.requested_at <= cutoff
+        ).limit(REEVALUATION_BATCH_SIZE).with_for_update(skip_locked=True)
+        # Claim by deleting: a write after this point queues the pair again
+        pairs = session.execute(
+            delete(ComplianceReevaluation)
+            .where(ComplianceReevaluation.id.in_(due.scalar_subquery()))
+            .returning(ComplianceReevaluation.transaction_id, ComplianceReevaluation.rule_type)
+        ).all()
+        if not pairs:
+            session.commit()
+            return
+
+        brokerage_by_txn = dict(session.execute(
+            select(Transaction.id, User.brokerage_id)
+            .join(User, User.id == Transaction.agent_id)
+            .where(
+                Transaction.id.in_({pair.transaction_id for pair in pairs}),
+                User.brokerage_id.isnot(None),
+            )
+        ).all())
+
+        # (brokerage, rule type) -> transactions to re-check
+        pending = defaultdict(set)
+        for transaction_id, rule_type in pairs:
+            brokerage_id = brokerage_by_txn.get(transaction_id)
+            if brokerage_id is not None:
+                pending[(brokerage_id, rule_type)].add(transaction_id)
+
+        rules = session.execute(
+            select(ComplianceRule).where(
+                ComplianceRule.is_active == True,
+                ComplianceRule.brokerage_id.in_({brokerage_id for brokerage_id, _ in pending}),
+                ComplianceRule.rule_type.in_({rule_type for _, rule_type in pending}),
+            )
+        ).scalars().all() if pending else []
+
+        checks = 0
+        for rule in rules:
+            transaction_ids = pending.get((rule.brokerage_id, rule.rule_type))
+            if transaction_ids:
+                checked, _, _ = _evaluate_rule(session, rule, transaction_ids=list(transaction_ids))
+                checks += checked
+
+        session.commit()
+        logger.info(f"Re-evaluated {checks} compliance checks for {len(pairs)} changed pairs")
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error re-evaluating compliance: {e}")
+        raise
+    finally:
+        session.close()
 
 
 @celery_app.task(name="app.tasks.compliance_tasks.compute_performance_snapshots")
 def compute_performance_snapshots():
-    """Nightly: compute agent performance snapshots for all brokerages."""
-    from app.models.brokerage import Brokerage, BrokerageAgent, AgentPerformanceSnapshot
-    from app.models import Transaction
-    from sqlalchemy import select, func
-    from datetime import datetime
+    """Nightly: compute agent performance snapshots, one task per brokerage."""
+    from app.models.brokerage import Brokerage
+    from app.tasks.batching import dispatch_partitions
+    from sqlalchemy import select
 
     session = _get_sync_session()
     try:
-        today = date.today()
-        year_start = date(today.year, 1, 1)
-        month_start = date(today.year, today.month, 1)
-
-        brokerages = session.execute(
-            select(Brokerage).where(Brokerage.is_active == True)
+        brokerage_ids = session.execute(
+            select(Brokerage.id).where(Brokerage.is_active == True).order_by(Brokerage.id)
         ).scalars().all()
-
-        for brokerage in brokerages:
-            agents = session.execute(
-                select(BrokerageAgent).where(
-                    BrokerageAgent.brokerage_id == brokerage.id,
-                    BrokerageAgent.is_active == True,
-                )
-            ).scalars().all()
-
-            for ba in agents:
-                # Check if snapshot already exists for today
-                existing = session.execute(
-                    select(AgentPerformanceSnapshot).where(
-                        AgentPerformanceSnapshot.agent_id == ba.user_id,
-                        AgentPerformanceSnapshot.snapshot_date == today,
-                    )
-                ).scalar_one_or_none()
-
-                # Count transactions
-                active_deals = session.execute(
-                    select(func.count(Transaction.id)).where(
-                        Transaction.agent_id == ba.user_id,
-                        Transaction.status.in_(["active", "confirmed", "pending_close"]),
-                    )
-                ).scalar() or 0
-
-                closed_ytd = session.execute(
-                    select(func.count(Transaction.id)).where(
-                        Transaction.agent_id == ba.user_id,
-                        Transaction.status == "closed",
-                        Transaction.updated_at >= year_start,
-                    )
-                ).scalar() or 0
-
-                closed_mtd = session.execute(
-                    select(func.count(Transaction.id)).where(
-                        Transaction.agent_id == ba.user_id,
-                        Transaction.status == "closed",
-                        Transaction.updated_at >= month_start,
-                    )
-                ).scalar() or 0
-
-                lost_ytd = session.execute(
-                    select(func.count(Transaction.id)).where(
-                        Transaction.agent_id == ba.user_id,
-                        Transaction.status.in_(["cancelled", "deleted"]),
-                        Transaction.updated_at >= year_start,
-                    )
-                ).scalar() or 0
-
-                if existing:
-                    existing.active_deals = active_deals
-                    existing.closed_ytd = closed_ytd
-                    existing.closed_mtd = closed_mtd
-                    existing.lost_ytd = lost_ytd
-                else:
-                    snapshot = AgentPerformanceSnapshot(
-                        agent_id=ba.user_id,
-                        brokerage_id=brokerage.id,
-                        snapshot_date=today,
-                        active_deals=active_deals,
-                        closed_ytd=closed_ytd,
-                        closed_mtd=closed_mtd,
-                        lost_ytd=lost_ytd,
-                    )
-                    session.add(snapshot)
-
-        session.commit()
-        logger.info(f"Performance snapshots computed for {len(brokerages)} brokerages")
+        dispatch_partitions(
+            session,
+            compute_brokerage_snapshots,
+            "compute_performance_snapshots",
+            date.today().isoformat(),
+            [str(brokerage_id) for brokerage_id in brokerage_ids],
+        )
     except Exception as e:
         session.rollback()
         logger.error(f"Error computing performance snapshots: {e}")
         raise
     finally:
         session.close()
+
+
+@celery_app.task(name="app.tasks.compliance_tasks.compute_brokerage_snapshots")
+def compute_brokerage_snapshots(run_key, brokerage_id):
+    """Compute today's snapshot for each agent of one brokerage, as one partition."""
+    from app.tasks.batching import run_partition
+
+    session = _get_sync_session()
+    try:
+        return run_partition(session, "compute_performance_snapshots", run_key, brokerage_id, _snapshot_brokerage)
+    except Exception as e:
+        logger.error(f"Error computing performance snapshots for brokerage {brokerage_id}: {e}")
+        raise
+    finally:
+        session.close()
+
+
+def _snapshot_brokerage(session, brokerage_id):
+    """Upsert today's PerformanceSnapshot (period: year to date) for every agent of a brokerage.
+
+    All metrics come from one aggregate query grouped by agent and are
+    written back with one bulk upsert per streamed chunk.
+    """
+    from app.models import Transaction, TransactionCommission, User
+    from app.models.brokerage import PerformanceSnapshot
+    from app.tasks.batching import stream_chunks
+    from sqlalchemy import select, func, and_, extract
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    from datetime import datetime, time, timezone
+
+    today = date.today()
+    year_start = datetime.combine(date(today.year, 1, 1), time.min, tzinfo=timezone.utc)
+    month_start = datetime.combine(date(today.year, today.month, 1), time.min, tzinfo=timezone.utc)
+    snapshot_end = datetime.combine(today, time.min, tzinfo=timezone.utc)
+
+    closed = Transaction.status == "closed"
+    closed_ytd = and_(closed, Transaction.updated_at >= year_start)
+    days_to_close = extract("epoch", Transaction.closing_date - Transaction.contract_execution_date) / 86400
+    stmt = (
+        select(
+            User.id.label("agent_id"),
+            func.count(Transaction.id).filter(Transaction.status.in_(ACTIVE_TRANSACTION_STATUSES)).label("active_deals"),
+            func.count(Transaction.id).filter(closed_ytd).label("closed_ytd"),
+            func.count(Transaction.id).filter(closed, Transaction.updated_at >= month_start).label("closed_mtd"),
+            func.count(Transaction.id).filter(
+                Transaction.status.in_(["cancelled", "deleted"]), Transaction.updated_at >= year_start,
+            ).label("lost_ytd"),
+            func.sum(Transaction.purchase_price_value).filter(closed_ytd).label("volume_ytd"),
+            func.sum(
+                func.coalesce(TransactionCommission.actual_gross, TransactionCommission.gross_commission)
+            ).filter(closed_ytd).label("commission_ytd"),
+            func.avg(days_to_close).filter(closed_ytd).label("avg_days_to_close"),
+        )
+        .outerjoin(Transaction, Transaction.agent_id == User.id)
+        .outerjoin(TransactionCommission, TransactionCommission.transaction_id == Transaction.id)
+        .where(User.brokerage_id == brokerage_id)
+        .group_by(User.id)
+    )
+
+    agents = 0
+    for rows in stream_chunks(session, stmt):
+        values = [
+            {
+                "agent_id": row.agent_id,
+                "brokerage_id": brokerage_id,
+                "period_start": year_start,
+                "period_end": snapshot_end,
+                "metrics": {
+                    "active_deals": row.active_deals,
+                    "closed_ytd": row.closed_ytd,
+                    "closed_mtd": row.closed_mtd,
+                    "lost_ytd": row.lost_ytd,
+                    "volume_ytd": float(row.volume_ytd or 0),
+                    "commission_ytd": float(row.commission_ytd or 0),
+                    "avg_days_to_close": (
+                        round(float(row.avg_days_to_close), 1) if row.avg_days_to_close is not None else None
+                    ),
+                },
+            }
+            for row in rows
+        ]
+        insert = pg_insert(PerformanceSnapshot).values(values)
+        session.execute(insert.on_conflict_do_update(
+            index_elements=["agent_id", "period_end"],
+            set_={
+                "brokerage_id": insert.excluded.brokerage_id,
+                "period_start": insert.excluded.period_start,
+                "metrics": insert.excluded.metrics,
+                "updated_at": func.now(),
+            },
+        ))
+        agents += len(rows)
+    return agents
@@ -0,0 +1,131 @@
+"""Celery tasks for generated documents — PDF rendering.
+
+WeasyPrint is CPU-bound and holds the GIL, so PDFs are rendered only here,
+on the "pdf" queue, which its own prefork (process pool) worker consumes.
+The API stores the HTML and queues the render. PDFs are stored in MinIO
+under the sha256 of their HTML, so identical HTML renders once.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+
+from app.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+PDF_PREFIX = "documents/pdf"
+
+# A render past the soft limit raises SoftTimeLimitExceeded and is marked
+# failed; the hard limit kills a worker stuck inside WeasyPrint.
+PDF_SOFT_TIME_LIMIT = 120
+PDF_TIME_LIMIT = 180
+# A "rendering" document older than this lost its worker and may be requeued
+PDF_RENDER_TIMEOUT = timedelta(seconds=PDF_TIME_LIMIT * 2)
+
+
+_sync_session_factory = None
+
+
+def _get_sync_session():
+    """Create a synchronous database session for Celery tasks."""
+    global _sync_session_factory
+    if _sync_session_factory is None:
+        import os
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+
+        db_url = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:pass@db/ttc")
+        sync_url = db_url.replace("+asyncpg", "")
+        engine = create_engine(sync_url)
+        _sync_session_factory = sessionmaker(bind=engine)
+    return _sync_session_factory()
+
+
+def html_hash(html: str) -> str:
+    import hashlib
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def _inline_only_fetcher(url, *args, **kwargs):
+    """Let documents embed data: URIs but never fetch from the network or disk."""
+    from weasyprint import default_url_fetcher
+
+    if not url.startswith("data:"):
+        raise ValueError(f"External resources are not allowed in documents: {url}")
+    return default_url_fetcher(url, *args, **kwargs)
+
+
+def _render_pdf(html: str) -> bytes:
+    from weasyprint import HTML
+    return HTML(string=html, url_fetcher=_inline_only_fetcher).write_pdf()
+
+
+def _upload_pdf(pdf: bytes, object_name: str) -> str:
+    """Store ``pdf`` and return its URL."""
+    import io
+    from app.services.storage_service import BUCKET_NAME, minio_client
+
+    if not minio_client.bucket_exists(BUCKET_NAME):
+        minio_client.make_bucket(BUCKET_NAME)
+    minio_client.put_object(BUCKET_NAME, object_name, io.BytesIO(pdf), length=len(pdf), content_type="application/pdf")
+    return _pdf_url(object_name)
+
+
+def _pdf_url(object_name: str) -> str:
+    from app.services.storage_service import BUCKET_NAME, minio_client
+    return minio_client.presigned_get_object(BUCKET_NAME, object_name)
+
+
+@celery_app.task(
+    name="app.tasks.document_tasks.render_document_pdf",
+    soft_time_limit=PDF_SOFT_TIME_LIMIT,
+    time_limit=PDF_TIME_LIMIT,
+)
+def render_document_pdf(document_id: str):
+    """Render a generated document's HTML to PDF and link it as file_url.
+
+    Queued by document_service when a document is generated or a render is
+    requested again. If a document with the same HTML hash already has a
+    PDF, that object is linked instead of rendering.
+    """
+    from app.models import GeneratedDocument
+    from sqlalchemy import select
+    from uuid import UUID
+
+    session = _get_sync_session()
+    try:
+        doc = session.get(GeneratedDocument, UUID(str(document_id)))
+        if doc is None or doc.pdf_status == "ready":
+            return {"status": doc.pdf_status if doc else "missing"}
+        digest = doc.html_hash or html_hash(doc.html_content or "")
+        object_name = f"{PDF_PREFIX}/{digest}.pdf"
+
+        rendered = session.execute(
+            select(GeneratedDocument.id).where(
+                GeneratedDocument.html_hash == digest,
+                GeneratedDocument.pdf_status == "ready",
+            ).limit(1)
+        ).first()
+        if rendered:
+            doc.file_url = _pdf_url(object_name)
+        else:
+            doc.pdf_status = "rendering"
+            doc.pdf_started_at = datetime.now(timezone.utc)
+            session.commit()
+            doc.file_url = _upload_pdf(_render_pdf(doc.html_content or ""), object_name)
+        doc.html_hash = digest
+        doc.pdf_status = "ready"
+        doc.pdf_error = None
+        session.commit()
+        logger.info(f"PDF for document {document_id} {'reused' if rendered else 'rendered'}: {object_name}")
+        return {"status": "ready", "rendered": not rendered}
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error rendering PDF for document {document_id}: {e}")
+        doc = session.get(GeneratedDocument, UUID(str(document_id)))
+        if doc is not None:
+            doc.pdf_status = "failed"
+            doc.pdf_error = str(e)[:1000]
+            session.commit()
+        raise
+    finally:
+        session.close()
@@ -0,0 +1,269 @@
+"""Celery tasks for BI exports — typed Parquet datasets in MinIO.
+
+Each dataset is written as Hive-style partitions,
+``exports/parquet/<dataset>/brokerage_id=<id>/month=<YYYY-MM>/<run>-<n>.parquet``,
+where month is the row's created_at month, so every version of a row lands
+in the same partition. Runs are incremental on updated_at: each writes the
+rows changed since the dataset's ExportWatermark, and readers keep the
+latest updated_at per id. Hard deletes are not exported.
+"""
+import json
+import logging
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+_sync_session_factory = None
+
+
+def _get_sync_session():
+    """Create a synchronous database session for Celery tasks."""
+    global _sync_session_factory
+    if _sync_session_factory is None:
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+
+        db_url = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:pass@db/ttc")
+        sync_url = db_url.replace("+asyncpg", "")
+        engine = create_engine(sync_url)
+        _sync_session_factory = sessionmaker(bind=engine)
+    return _sync_session_factory()
+
+
+EXPORT_PREFIX = "exports/parquet"
+EXPORT_ROW_GROUP_SIZE = 50_000
+# Rows committed by transactions still open at run time may carry an older
+# updated_at; stopping this far short of now lets the next run pick them up
+EXPORT_LAG = timedelta(minutes=5)
+DATASETS = ("transactions", "milestones", "transaction_commissions", "commission_splits")
+
+
+def _dataset_query(dataset):
+    """(model, [(column name, SQL expression, Arrow type)], join path) for a dataset.
+
+    Every dataset also gets id, brokerage_id, created_at and updated_at.
+    """
+    import pyarrow as pa
+    from app.models import CommissionSplit, Milestone, Transaction, TransactionCommission, User
+
+    ts = pa.timestamp("us", tz="UTC")
+    if dataset == "transactions":
+        return Transaction, [
+            ("agent_id", Transaction.agent_id, pa.string()),
+            ("status", Transaction.status, pa.string()),
+            ("representation_side", Transaction.representation_side, pa.string()),
+            ("financing_type", Transaction.financing_type, pa.string()),
+            ("property_city", Transaction.property_city, pa.string()),
+            ("property_state", Transaction.property_state, pa.string()),
+            ("property_zip", Transaction.property_zip, pa.string()),
+            ("purchase_price", Transaction.purchase_price_value, pa.decimal128(14, 2)),
+            ("earnest_money", Transaction.earnest_money_value, pa.decimal128(14, 2)),
+            ("contract_execution_date", Transaction.contract_execution_date, ts),
+            ("closing_date", Transaction.closing_date, ts),
+            ("health_score", Transaction.health_score, pa.float64()),
+        ], [(User, User.id == Transaction.agent_id)]
+    if dataset == "milestones":
+        return Milestone, [
+            ("transaction_id", Milestone.transaction_id, pa.string()),
+            ("agent_id", Transaction.agent_id, pa.string()),
+            ("type", Milestone.type, pa.string()),
+            ("title", Milestone.title, pa.string()),
+            ("status", Milestone.status, pa.string()),
+            ("responsible_party_role", Milestone.responsible_party_role, pa.string()),
+            ("due_date", Milestone.due_date, ts),
+            ("completed_at", Milestone.completed_at, ts),
+            ("sort_order", Milestone.sort_order, pa.int32()),
+        ], [(Transaction, Transaction.id == Milestone.transaction_id), (User, User.id == Transaction.agent_id)]
+    if dataset == "transaction_commissions":
+        return TransactionCommission, [
+            ("transaction_id", TransactionCommission.transaction_id, pa.string()),
+            ("agent_id", TransactionCommission.agent_id, pa.string()),
+            ("commission_type", TransactionCommission.commission_type, pa.string()),
+            ("rate", TransactionCommission.rate, pa.decimal128(5, 4)),
+            ("flat_amount", TransactionCommission.flat_amount, pa.decimal128(12, 2)),
+            ("tiered_rates", TransactionCommission.tiered_rates, pa.string()),
+            ("gross_commission", TransactionCommission.gross_commission, pa.decimal128(12, 2)),
+            ("projected_net", TransactionCommission.projected_net, pa.decimal128(12, 2)),
+            ("actual_gross", TransactionCommission.actual_gross, pa.decimal128(12, 2)),
+            ("actual_net", TransactionCommission.actual_net, pa.decimal128(12, 2)),
+            ("status", TransactionCommission.status, pa.string()),
+            ("is_dual_agency", TransactionCommission.is_dual_agency, pa.bool_()),
+        ], [(User, User.id == TransactionCommission.agent_id)]
+    if dataset == "commission_splits":
+        return CommissionSplit, [
+            ("transaction_commission_id", CommissionSplit.transaction_commission_id, pa.string()),
+            ("transaction_id", TransactionCommission.transaction_id, pa.string()),
+            ("agent_id", TransactionCommission.agent_id, pa.string()),
+            ("split_type", CommissionSplit.split_type, pa.string()),
+            ("recipient_name", CommissionSplit.recipient_name, pa.string()),
+            ("is_percentage", CommissionSplit.is_percentage, pa.bool_()),
+            ("percentage", CommissionSplit.percentage, pa.decimal128(5, 4)),
+            ("flat_amount", CommissionSplit.flat_amount, pa.decimal128(12, 2)),
+            ("calculated_amount", CommissionSplit.calculated_amount, pa.decimal128(12, 2)),
+        ], [
+            (TransactionCommission, TransactionCommission.id == CommissionSplit.transaction_commission_id),
+            (User, User.id == TransactionCommission.agent_id),
+        ]
+    raise ValueError(f"Unknown dataset: {dataset}")
+
+
+def _arrow_value(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _upload_to_minio(path, object_name):
+    from app.services.storage_service import BUCKET_NAME, minio_client
+
+    if not minio_client.bucket_exists(BUCKET_NAME):
+        minio_client.make_bucket(BUCKET_NAME)
+    minio_client.fput_object(BUCKET_NAME, object_name, path, content_type="application/vnd.apache.parquet")
+
+
+def _export_dataset(session, dataset, since, until, run_key, upload=None):
+    """Write the rows of ``dataset`` with ``since < updated_at <= until`` as partitioned Parquet.
+
+    Rows stream from a server-side cursor ordered by partition, so only one
+    file is open at a time and each cursor chunk becomes one row group.
+    Returns (rows, object names written).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from sqlalchemy import select, func
+    from app.models import User
+    from app.tasks.batching import stream_chunks
+
+    upload = upload or _upload_to_minio
+    model, columns, joins = _dataset_query(dataset)
+    ts = pa.timestamp("us", tz="UTC")
+    schema = pa.schema(
+        [("id", pa.string()), ("brokerage_id", pa.string())]
+        + [(name, arrow_type) for name, _, arrow_type in columns]
+        + [("created_at", ts), ("updated_at", ts)]
+    )
+    month = func.to_char(func.timezone("UTC", model.created_at), "YYYY-MM")
+    stmt = select(
+        month.label("partition_month"),
+        model.id,
+        User.brokerage_id,
+        *(expr.label(name) for name, expr, _ in columns),
+        model.created_at,
+        model.updated_at,
+    ).select_from(model)
+    for target, onclause in joins:
+        stmt = stmt.outerjoin(target, onclause)
+    stmt = stmt.where(model.updated_at <= until)
+    if since is not None:
+        stmt = stmt.where(model.updated_at > since)
+    stmt = stmt.order_by(User.brokerage_id, month, model.updated_at, model.id)
+
+    rows = 0
+    written = []
+    partition = writer = path = None
+
+    def close():
+        writer.close()
+        brokerage, month_key = partition
+        object_name = (
+            f"{EXPORT_PREFIX}/{dataset}/brokerage_id={brokerage or 'none'}/month={month_key}/"
+            f"{run_key}-{len(written):05d}.parquet"
+        )
+        upload(path, object_name)
+        os.unlink(path)
+        written.append(object_name)
+
+    try:
+        for chunk in stream_chunks(session, stmt, EXPORT_ROW_GROUP_SIZE):
+            # Split the chunk where the (brokerage, month) partition changes
+            start = 0
+            while start < len(chunk):
+                key = (chunk[start].brokerage_id, chunk[start].partition_month)
+                end = start
+                while end < len(chunk) and (chunk[end].brokerage_id, chunk[end].partition_month) == key:
+                    end += 1
+                if key != partition:
+                    if writer is not None:
+                        close()
+                    fd, path = tempfile.mkstemp(suffix=".parquet")
+                    os.close(fd)
+                    writer = pq.ParquetWriter(path, schema, compression="zstd")
+                    partition = key
+                batch = chunk[start:end]
+                writer.write_table(pa.Table.from_pydict(
+                    {field.name: [_arrow_value(getattr(row, field.name)) for row in batch] for field in schema},
+                    schema=schema,
+                ))
+                rows += len(batch)
+                start = end
+        if writer is not None:
+            close()
+            writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+            os.unlink(path)
+    return rows, written
+
+
+@celery_app.task(name="app.tasks.export_tasks.export_parquet_datasets")
+def export_parquet_datasets(datasets=None, full: bool = False):
+    """Nightly: export rows changed since each dataset's watermark as Parquet to MinIO.
+
+    ``full`` ignores the watermarks and rewrites every row, e.g. for a new
+    consumer. Each dataset's watermark only advances once its files are
+    uploaded, so a failed run is retried from the same point. A dataset's
+    watermark row stays locked while it is exported; a concurrent run skips
+    datasets that another run is already exporting.
+    """
+    from app.models import ExportWatermark
+    from sqlalchemy import select
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+    session = _get_sync_session()
+    try:
+        until = datetime.now(timezone.utc) - EXPORT_LAG
+        run_key = until.strftime("%Y%m%dT%H%M%S")
+        stats = {}
+        for dataset in datasets or DATASETS:
+            session.execute(
+                pg_insert(ExportWatermark).values(dataset=dataset)
+                .on_conflict_do_nothing(index_elements=["dataset"])
+            )
+            session.commit()
+            watermark = session.execute(
+                select(ExportWatermark)
+                .where(ExportWatermark.dataset == dataset)
+                .with_for_update(skip_locked=True)
+            ).scalar_one_or_none()
+            if watermark is None:
+                logger.info(f"Skipping {dataset}: another export run has it locked")
+                continue
+            since = None if full else watermark.exported_through
+            if since is not None and since >= until:
+                session.commit()
+                continue
+
+            rows, written = _export_dataset(session, dataset, since, until, run_key)
+            watermark.exported_through = until
+            watermark.last_rows = rows
+            watermark.last_files = len(written)
+            watermark.last_run_at = datetime.now(timezone.utc)
+            session.commit()
+            stats[dataset] = {"rows": rows, "files": len(written)}
+            logger.info(f"Exported {rows} {dataset} rows to {len(written)} Parquet files")
+        return stats
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error exporting Parquet datasets: {e}")
+        raise
+    finally:
+        session.close()
@@ -0,0 +1,74 @@
+"""Celery tasks for database maintenance — monthly log-table partitions and staging-table retention."""
+import logging
+from datetime import datetime, timedelta, timezone
+
+from app.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+# Applied webhook events are kept this long for debugging, then purged
+WEBHOOK_EVENT_RETENTION = timedelta(days=30)
+
+
+def _get_sync_session():
+    import os
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    db_url = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:pass@db/ttc")
+    sync_url = db_url.replace("+asyncpg", "")
+    engine = create_engine(sync_url)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+@celery_app.task(name="app.tasks.maintenance_tasks.maintain_partitions")
+def maintain_partitions():
+    """Daily: make sure each partitioned log table has partitions for the coming months."""
+    from app.partitioning import PARTITIONED_TABLES, ensure_partitions, is_partitioned
+
+    session = _get_sync_session()
+    try:
+        conn = session.connection()
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(conn, table):
+                logger.warning(f"{table} is not partitioned yet; run the database migrations")
+                continue
+            ensure_partitions(conn, table)
+        session.commit()
+        logger.info(f"Ensured monthly partitions for {', '.join(PARTITIONED_TABLES)}")
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error maintaining partitions: {e}")
+        raise
+    finally:
+        session.close()
+
+
+@celery_app.task(name="app.tasks.maintenance_tasks.purge_processed_webhook_events")
+def purge_processed_webhook_events():
+    """Daily: delete staged webhook events processed more than 30 days ago, in short batches."""
+    from app.models import WebhookEvent
+    from app.tasks.batching import run_batched
+
+    session = _get_sync_session()
+    try:
+        cutoff = datetime.now(timezone.utc) - WEBHOOK_EVENT_RETENTION
+        stats = run_batched(
+            session,
+            "purge_processed_webhook_events",
+            WebhookEvent,
+            # An event is processed after it is staged, so the created_at bound
+            # never drops a due row and keeps each batch scan short
+            [WebhookEvent.processed_at < cutoff, WebhookEvent.created_at < cutoff],
+        )
+        logger.info(
+            f"Purged {stats['rows']} processed webhook events in {stats['batches']} batches "
+            f"({stats['rows_per_second']:,.0f} rows/s)"
+        )
+        return stats
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error purging processed webhook events: {e}")
+        raise
+    finally:
+        session.close()
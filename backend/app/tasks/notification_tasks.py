@@ -1,56 +1,89 @@
 """Celery tasks for Phase 2: Nudge Engine — milestone reminders, email sending, draft expiration."""
 import logging
-from datetime import datetime, timedelta, date
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
 from app.celery_app import celery_app
 
 logger = logging.getLogger(__name__)
 
+# Retry backoff for failed sends: 30s, 2m, 8m, 30m, 2h
+RETRY_BACKOFF_SECONDS = [30, 120, 480, 1800, 7200]
+MAX_SEND_ATTEMPTS = 5
+
+# Countdown-scheduled retries may fire marginally before scheduled_for
+DISPATCH_TOLERANCE = timedelta(seconds=5)
+
+# The beat sweep only picks up notifications the event-driven path missed
+SWEEP_GRACE_PERIOD = timedelta(minutes=2)
+
+CLOSED_MILESTONE_STATUSES = ("completed", "waived", "cancelled")
+
+# notification_log is partitioned by created_at month; bounding pending-work
+# queries to recently created rows lets Postgres prune older partitions
+LIVE_NOTIFICATION_WINDOW = timedelta(days=7)
+
+# Digest recipients get one combined email once their oldest pending item is this old
+DIGEST_WINDOW = timedelta(hours=1)
+DIGEST_RECIPIENTS_PER_RUN = 200
+
+# Send-window defaults, overridable in users.notification_preferences
+DEFAULT_TIMEZONE = "America/New_York"
+DEFAULT_BUSINESS_HOURS_START = "09:00"
+DEFAULT_BUSINESS_HOURS_END = "18:00"
+
+# Staged Resend webhooks are applied in batches of this size
+WEBHOOK_BATCH_SIZE = 500
+WEBHOOK_BATCHES_PER_RUN = 20
+# An event can arrive before the send that produced its message id commits;
+# unmatched events are retried until they are this old
+WEBHOOK_UNMATCHED_TTL = timedelta(hours=1)
+# Delivery events never move a notification back down this order
+DELIVERY_STATUS_RANK = {"sent": 1, "delivered": 2, "bounced": 3, "complained": 3}
+
+
+# Per-notification delivery tasks are frequent, so the engine is shared per worker process
+_sync_session_factory = None
+
 
 def _get_sync_session():
     """Create a synchronous database session for Celery tasks."""
-    import os
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
+    global _sync_session_factory
+    if _sync_session_factory is None:
+        import os
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
 
-    db_url = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:pass@db/ttc")
-    # Celery needs sync driver
-    sync_url = db_url.replace("+asyncpg", "")
-    engine = create_engine(sync_url)
-    Session = sessionmaker(bind=engine)
-    return Session()
+        db_url = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:pass@db/ttc")
+        # Celery needs sync driver
+        sync_url = db_url.replace("+asyncpg", "")
+        engine = create_engine(sync_url)
+        _sync_session_factory = sessionmaker(bind=engine)
+    return _sync_session_factory()
 
 
 @celery_app.task(name="app.tasks.notification_tasks.check_milestone_reminders")
 def check_milestone_reminders():
-    """Hourly: check all active transactions for milestone reminders and escalations."""
+    """Hourly: reminders and escalations for agents inside their local send window."""
     from app.models import User, Transaction, Milestone, Party, NotificationRule
     from sqlalchemy import select
     from sqlalchemy.orm import selectinload
 
     session = _get_sync_session()
+    created = []
+    notification_ids = []
     try:
-        # Get all agents with active transactions and vacation_mode off
-        stmt = (
-            select(User)
-            .join(Transaction, Transaction.agent_id == User.id)
-            .where(Transaction.status.in_(["active", "confirmed", "pending_close"]))
-            .distinct()
-        )
-        agents = session.execute(stmt).scalars().all()
+        # Only agents inside their local send window do any work; reminders
+        # already sent today are skipped by their idempotency key
+        due_agents = _agents_in_send_window(session, datetime.now(timezone.utc))
+        agents = session.execute(
+            select(User).where(User.id.in_(list(due_agents)))
+        ).scalars().all() if due_agents else []
 
         for agent in agents:
-            prefs = agent.notification_preferences or {}
-            if prefs.get("vacation_mode", False):
-                continue
-
-            tz_name = prefs.get("timezone", "America/New_York")
-            try:
-                agent_tz = ZoneInfo(tz_name)
-            except Exception:
-                agent_tz = ZoneInfo("America/New_York")
-
+            agent_tz = due_agents[agent.id]
             agent_today = datetime.now(agent_tz).date()
 
             # Get agent's notification rules
@@ -90,7 +123,7 @@ def check_milestone_reminders():
                     if milestone.reminders_paused_until and milestone.reminders_paused_until > datetime.now(agent_tz):
                         continue
 
-                    due_date = milestone.due_date.date() if hasattr(milestone.due_date, 'date') else milestone.due_date
+                    due_date = milestone.due_date.astimezone(agent_tz).date() if hasattr(milestone.due_date, 'astimezone') else milestone.due_date
                     days_until = (due_date - agent_today).days
 
                     # Find matching rule
@@ -101,12 +134,12 @@ def check_milestone_reminders():
                     reminder_days = overrides.get("reminder_days_override") or rule.days_before
 
                     if days_until > 0 and days_until <= reminder_days:
-                        _create_reminder_notification(
-                            session, txn, milestone, agent, rule, "reminder", 0
+                        created += _create_reminder_notification(
+                            session, txn, milestone, agent, rule, "reminder", 0, agent_today
                         )
                     elif days_until == 0:
-                        _create_reminder_notification(
-                            session, txn, milestone, agent, rule, "due_today", 0
+                        created += _create_reminder_notification(
+                            session, txn, milestone, agent, rule, "due_today", 0, agent_today
                         )
                     elif days_until < 0:
                         days_overdue = abs(days_until)
@@ -117,13 +150,18 @@ def check_milestone_reminders():
                                 if days_overdue >= threshold:
                                     level = i + 1
                             notification_type = f"overdue_l{min(level, 3)}"
-                            _create_reminder_notification(
+                            created += _create_reminder_notification(
                                 session, txn, milestone, agent, rule,
-                                notification_type, min(level, 3)
+                                notification_type, min(level, 3), agent_today
                             )
 
+        session.flush()
+        # Most urgent first so escalations are at the head of the queue;
+        # digest items wait for send_notification_digests
+        created.sort(key=lambda n: n.escalation_level, reverse=True)
+        notification_ids = [n.id for n in created if n.status == "queued"]
         session.commit()
-        logger.info("Milestone reminder check completed")
+        logger.info(f"Milestone reminder check completed: {len(notification_ids)} notifications queued")
     except Exception as e:
         session.rollback()
         logger.error(f"Error checking milestone reminders: {e}")
@@ -131,12 +169,96 @@ def check_milestone_reminders():
     finally:
         session.close()
 
+    # Dispatch only after commit so the delivery worker can see the rows
+    for notification_id in notification_ids:
+        _enqueue_delivery(notification_id)
+
+
+@lru_cache(maxsize=None)
+def _zone(tz_name):
+    try:
+        return ZoneInfo(tz_name)
+    except Exception:
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def _parse_hour(value, default):
+    """'09:00' -> 9. Falls back to the default for missing or malformed values."""
+    try:
+        return int(str(value).split(":")[0])
+    except (TypeError, ValueError):
+        return int(default.split(":")[0])
+
+
+def _hour_in_range(hour, start, end):
+    """True if hour falls in [start, end), allowing ranges that wrap midnight."""
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def _in_send_window(hour, prefs):
+    """True if local ``hour`` is inside the agent's business hours and not inside quiet hours."""
+    start = _parse_hour(prefs.get("business_hours_start"), DEFAULT_BUSINESS_HOURS_START)
+    end = _parse_hour(prefs.get("business_hours_end"), DEFAULT_BUSINESS_HOURS_END)
+    if not _hour_in_range(hour, start, end):
+        return False
+    quiet = prefs.get("quiet_hours") or {}
+    if quiet.get("start") and quiet.get("end"):
+        return not _hour_in_range(hour, _parse_hour(quiet["start"], "00:00"), _parse_hour(quiet["end"], "00:00"))
+    return True
+
+
+def _agents_in_send_window(session, now_utc):
+    """Return {agent_id: ZoneInfo} for agents inside their send window on this hourly tick.
+
+    Agents are bucketed by current UTC offset so local time is resolved once
+    per bucket; only agents whose local hour is inside their send window (and
+    who are not on vacation, or on a suppressed weekend) are returned. Every
+    tick in the window selects them again, so a missed tick is caught up on
+    the next one; the per-local-date idempotency key stops repeat sends.
+    """
+    from app.models import User, Transaction
+    from sqlalchemy import select
 
-def _create_reminder_notification(session, transaction, milestone, agent, rule, notification_type, escalation_level):
-    """Create a notification log entry or email draft for a milestone reminder."""
+    rows = session.execute(
+        select(User.id, User.timezone, User.notification_preferences).where(
+            User.id.in_(
+                select(Transaction.agent_id)
+                .where(Transaction.status.in_(["active", "confirmed", "pending_close"]))
+            )
+        )
+    ).all()
+
+    buckets = defaultdict(list)
+    for agent_id, tz_column, prefs in rows:
+        prefs = prefs or {}
+        if prefs.get("vacation_mode", False):
+            continue
+        agent_tz = _zone(prefs.get("timezone") or tz_column or DEFAULT_TIMEZONE)
+        buckets[now_utc.astimezone(agent_tz).utcoffset()].append((agent_id, agent_tz, prefs))
+
+    due = {}
+    for offset, agents in buckets.items():
+        local_now = now_utc + offset
+        is_weekend = local_now.weekday() >= 5
+        for agent_id, agent_tz, prefs in agents:
+            if is_weekend and not prefs.get("send_on_weekends", False):
+                continue
+            if _in_send_window(local_now.hour, prefs):
+                due[agent_id] = agent_tz
+
+    logger.info(f"Reminder tick: {len(due)} of {len(rows)} agents in send window across {len(buckets)} UTC offsets")
+    return due
+
+
+def _create_reminder_notification(session, transaction, milestone, agent, rule, notification_type, escalation_level, agent_today):
+    """Create notification log entries for a milestone reminder. Returns the new entries."""
     from app.models import NotificationLog, Party
 
-    today_str = date.today().isoformat()
+    # Keyed on the agent's local date so one send window yields one reminder
+    today_str = agent_today.isoformat()
+    created = []
 
     # Get responsible party
     responsible_parties = [
@@ -144,7 +266,7 @@ def _create_reminder_notification(session, transaction, milestone, agent, rule,
         if p.role == milestone.responsible_party_role
     ]
     if not responsible_parties:
-        return
+        return created
 
     for party in responsible_parties:
         if not party.email:
@@ -158,11 +280,21 @@ def _create_reminder_notification(session, transaction, milestone, agent, rule,
         idempotency_key = f"{milestone.id}:{party.email}:{notification_type}:{today_str}"
         from sqlalchemy import select
         existing = session.execute(
-            select(NotificationLog).where(NotificationLog.idempotency_key == idempotency_key)
+            select(NotificationLog).where(
+                NotificationLog.idempotency_key == idempotency_key,
+                # Keys embed the agent-local date, so only the last two days can collide
+                NotificationLog.created_at >= datetime.utcnow() - timedelta(days=2),
+            )
         ).scalar_one_or_none()
         if existing:
             continue
 
+        # Digest recipients are batched; final escalations always go out on their own
+        digest = (
+            (party.notification_preference == "daily_digest" or rule.digest_enabled)
+            and escalation_level < 3
+        )
+
         # Create notification log entry
         log_entry = NotificationLog(
             transaction_id=transaction.id,
@@ -174,22 +306,362 @@ def _create_reminder_notification(session, transaction, milestone, agent, rule,
             recipient_name=party.name,
             recipient_role=party.role,
             subject=f"Reminder: {milestone.title}",
-            status="queued",
+            status="digest_pending" if digest else "queued",
             scheduled_for=datetime.utcnow(),
             idempotency_key=idempotency_key,
         )
         session.add(log_entry)
+        created.append(log_entry)
 
         # Update milestone tracking
         milestone.reminder_sent_count = (milestone.reminder_sent_count or 0) + 1
         milestone.escalation_level = escalation_level
 
+    return created
+
+
+def _enqueue_delivery(notification_id, countdown=None):
+    """Queue delivery of a single notification. The beat sweep covers broker failures."""
+    try:
+        deliver_notification.apply_async(args=[str(notification_id)], countdown=countdown)
+    except Exception as e:
+        logger.warning(f"Could not enqueue delivery for notification {notification_id}: {e}")
+
+
+def _claim_live_notifications(session, *criteria, limit=None, status="queued"):
+    """Lock pending notifications matching criteria; cancel stale ones with one bulk UPDATE.
+
+    Milestone status and recipient party state come back in the same joined
+    query that claims the batch, so pre-send validation costs no per-item
+    round-trips. Returns (live notifications, number cancelled).
+    """
+    from app.models import NotificationLog, Milestone, Party
+    from sqlalchemy import select, update, exists, or_, case
+
+    recipient_blocked = exists().where(
+        Party.transaction_id == NotificationLog.transaction_id,
+        Party.email == NotificationLog.recipient_email,
+        or_(
+            Party.email_bounced == True,
+            Party.unsubscribed_at.isnot(None),
+            Party.notification_preference == "none",
+        ),
+    )
+    stmt = (
+        select(NotificationLog, Milestone.status, recipient_blocked.label("recipient_blocked"))
+        .outerjoin(Milestone, Milestone.id == NotificationLog.milestone_id)
+        .where(
+            NotificationLog.status == status,
+            NotificationLog.created_at >= datetime.utcnow() - LIVE_NOTIFICATION_WINDOW,
+            *criteria,
+        )
+        .order_by(
+            NotificationLog.escalation_level.desc(),
+            NotificationLog.scheduled_for.asc(),
+        )
+        # Row lock so the sweep and duplicate deliveries can never double-send
+        .with_for_update(of=NotificationLog, skip_locked=True)
+    )
+    if limit:
+        stmt = stmt.limit(limit)
+    rows = session.execute(stmt).all()
+
+    live = []
+    milestone_closed = []
+    recipient_gone = []
+    for notif, milestone_status, blocked in rows:
+        if milestone_status in CLOSED_MILESTONE_STATUSES:
+            milestone_closed.append(notif.id)
+        elif blocked:
+            recipient_gone.append(notif.id)
+        else:
+            live.append(notif)
+
+    stale_ids = milestone_closed + recipient_gone
+    if stale_ids:
+        session.execute(
+            update(NotificationLog)
+            .where(NotificationLog.id.in_(stale_ids))
+            .values(
+                status="cancelled",
+                error_message=case(
+                    (NotificationLog.id.in_(milestone_closed), "Milestone completed before send"),
+                    else_="Recipient bounced or unsubscribed",
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+    return live, len(stale_ids)
+
+
+def _render_context(notif, milestones, transactions):
+    milestone = milestones.get(notif.milestone_id)
+    txn = transactions.get(notif.transaction_id)
+    return {
+        "subject": notif.subject or "Transaction Update",
+        "type": notif.type,
+        "escalation_level": notif.escalation_level,
+        "recipient_name": notif.recipient_name,
+        "recipient_role": notif.recipient_role,
+        "milestone": {
+            "title": milestone.title if milestone else None,
+            "due_date": milestone.due_date.strftime("%b %d, %Y") if milestone and milestone.due_date else None,
+        },
+        "transaction": {
+            "property_address": txn.property_address if txn else None,
+            "property_city": txn.property_city if txn else None,
+            "property_state": txn.property_state if txn else None,
+        },
+    }
+
+
+def _prefetch_render_data(session, notifications):
+    """Fetch milestones, transactions and rule templates for a whole batch in three queries."""
+    from app.models import Milestone, Transaction, NotificationRule, EmailTemplate
+    from sqlalchemy import select
+
+    milestone_ids = {n.milestone_id for n in notifications if n.milestone_id}
+    transaction_ids = {n.transaction_id for n in notifications}
+    rule_ids = {n.rule_id for n in notifications if n.rule_id}
+
+    milestones = {
+        row.id: row for row in session.execute(
+            select(Milestone.id, Milestone.title, Milestone.due_date)
+            .where(Milestone.id.in_(milestone_ids))
+        ).all()
+    } if milestone_ids else {}
+    transactions = {
+        row.id: row for row in session.execute(
+            select(
+                Transaction.id, Transaction.property_address,
+                Transaction.property_city, Transaction.property_state,
+            ).where(Transaction.id.in_(transaction_ids))
+        ).all()
+    } if transaction_ids else {}
+    templates = dict(session.execute(
+        select(NotificationRule.id, EmailTemplate)
+        .join(EmailTemplate, EmailTemplate.id == NotificationRule.template_id)
+        .where(NotificationRule.id.in_(rule_ids))
+    ).all()) if rule_ids else {}
+    return milestones, transactions, templates
+
+
+def _render_notifications(session, notifications):
+    """Render every notification in a batch; returns {notification id: (subject, html)}."""
+    from app.services import email_render_service
+
+    if not notifications:
+        return {}
+    milestones, transactions, templates = _prefetch_render_data(session, notifications)
+    rendered = email_render_service.render_many(
+        (_render_context(n, milestones, transactions), templates.get(n.rule_id), n.type)
+        for n in notifications
+    )
+    return {n.id: r for n, r in zip(notifications, rendered)}
+
+
+def _resend_send(resend_api_key, to_email, subject, html):
+    """Send one email through Resend and return the provider message id."""
+    import os
+    import resend as resend_lib
+
+    resend_lib.api_key = resend_api_key
+    result = resend_lib.Emails.send({
+        "from": os.getenv("RESEND_FROM_EMAIL", "noreply@armistead.re"),
+        "to": [to_email],
+        "subject": subject,
+        "html": html,
+    })
+    return result.get("id") if isinstance(result, dict) else str(result)
+
+
+def _send_notification(session, notif, resend_api_key, rendered):
+    """Send one rendered notification via Resend. Returns the retry delay in seconds on a retryable failure."""
+    import uuid
+    from app.models import Communication
+
+    subject, html = rendered
+    try:
+        notif.resend_message_id = _resend_send(
+            resend_api_key, notif.recipient_email, subject, html,
+        )
+        notif.status = "sent"
+        notif.sent_at = datetime.utcnow()
+
+        # Create communication record
+        comm = Communication(
+            id=uuid.uuid4(),
+            transaction_id=notif.transaction_id,
+            milestone_id=notif.milestone_id,
+            type="email",
+            recipient_email=notif.recipient_email,
+            subject=subject,
+            body=html,
+            status="sent",
+            delivery_status="sent",
+            sent_at=datetime.utcnow(),
+            notification_log_id=notif.id,
+        )
+        session.add(comm)
+        notif.communication_id = comm.id
+        return None
+
+    except Exception as e:
+        notif.retry_count = (notif.retry_count or 0) + 1
+        notif.error_message = str(e)
+        logger.error(f"Failed to send email to {notif.recipient_email}: {e}")
+        if notif.retry_count >= MAX_SEND_ATTEMPTS:
+            notif.status = "failed"
+            return None
+        delay = RETRY_BACKOFF_SECONDS[min(notif.retry_count - 1, len(RETRY_BACKOFF_SECONDS) - 1)]
+        # scheduled_for lets the sweep recover the retry if the countdown task is lost
+        notif.scheduled_for = datetime.utcnow() + timedelta(seconds=delay)
+        return delay
+
+
+@celery_app.task(name="app.tasks.notification_tasks.deliver_notification")
+def deliver_notification(notification_id):
+    """Event-driven: send one queued notification as soon as it is created or its retry is due."""
+    from app.models import NotificationLog
+    import os
+
+    resend_api_key = os.getenv("RESEND_API_KEY", "")
+    if not resend_api_key:
+        logger.warning("RESEND_API_KEY not set, skipping email send")
+        return
+
+    session = _get_sync_session()
+    retry_delay = None
+    try:
+        live, _ = _claim_live_notifications(
+            session,
+            NotificationLog.id == notification_id,
+            NotificationLog.scheduled_for <= datetime.utcnow() + DISPATCH_TOLERANCE,
+        )
+        # Nothing live: already sent, cancelled, rescheduled, or claimed by another worker
+        rendered = _render_notifications(session, live)
+        for notif in live:
+            retry_delay = _send_notification(session, notif, resend_api_key, rendered[notif.id])
+
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error delivering notification {notification_id}: {e}")
+        raise
+    finally:
+        session.close()
+
+    if retry_delay is not None:
+        _enqueue_delivery(notification_id, countdown=retry_delay)
+
 
 @celery_app.task(name="app.tasks.notification_tasks.send_queued_emails")
 def send_queued_emails():
-    """Every 5 min: send queued notification emails via Resend."""
-    from app.models import NotificationLog, Communication, Milestone
-    from sqlalchemy import select
+    """Every 5 min: safety sweep for queued notifications the event-driven path missed."""
+    from app.models import NotificationLog
+    import os
+
+    resend_api_key = os.getenv("RESEND_API_KEY", "")
+    if not resend_api_key:
+        logger.warning("RESEND_API_KEY not set, skipping email send")
+        return
+
+    session = _get_sync_session()
+    retries = []
+    try:
+        # Anything due within the grace period is still owned by its delivery task
+        cutoff = datetime.utcnow() - SWEEP_GRACE_PERIOD
+        notifications, cancelled = _claim_live_notifications(
+            session, NotificationLog.scheduled_for <= cutoff, limit=50,
+        )
+
+        # Only live notifications reach the sender, rendered in one pass
+        rendered = _render_notifications(session, notifications)
+        for notif in notifications:
+            retry_delay = _send_notification(session, notif, resend_api_key, rendered[notif.id])
+            if retry_delay is not None:
+                retries.append((notif.id, retry_delay))
+
+        session.commit()
+        logger.info(f"Swept {len(notifications)} queued emails, cancelled {cancelled} stale")
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error sending queued emails: {e}")
+        raise
+    finally:
+        session.close()
+
+    for notification_id, delay in retries:
+        _enqueue_delivery(notification_id, countdown=delay)
+
+
+def _send_digest(session, recipient_email, items, resend_api_key, render_data):
+    """Send one combined email for a recipient's items, updating every per-milestone log.
+
+    Returns whether the email was sent; on failure the items back off for a retry.
+    """
+    import uuid
+    from app.models import Communication
+    from app.services import email_render_service
+
+    milestones, transactions, _ = render_data
+    items.sort(key=lambda n: (-n.escalation_level, n.scheduled_for or datetime.min))
+    subject, html = email_render_service.render(
+        {
+            "recipient_name": items[0].recipient_name,
+            "items": [_render_context(n, milestones, transactions) for n in items],
+        },
+        notification_type="digest",
+    )
+    now = datetime.utcnow()
+
+    try:
+        message_id = _resend_send(resend_api_key, recipient_email, subject, html)
+    except Exception as e:
+        logger.error(f"Failed to send digest to {recipient_email}: {e}")
+        for notif in items:
+            notif.retry_count = (notif.retry_count or 0) + 1
+            notif.error_message = str(e)
+            if notif.retry_count >= MAX_SEND_ATTEMPTS:
+                notif.status = "failed"
+                continue
+            # Same backoff as single sends; the digest sweep skips items not yet due
+            delay = RETRY_BACKOFF_SECONDS[min(notif.retry_count - 1, len(RETRY_BACKOFF_SECONDS) - 1)]
+            notif.scheduled_for = now + timedelta(seconds=delay)
+        return False
+
+    # One communication per transaction keeps each deal's history complete
+    comms = {}
+    for notif in items:
+        comm = comms.get(notif.transaction_id)
+        if comm is None:
+            comm = Communication(
+                id=uuid.uuid4(),
+                transaction_id=notif.transaction_id,
+                type="email",
+                recipient_email=recipient_email,
+                subject=subject,
+                body=html,
+                status="sent",
+                delivery_status="sent",
+                sent_at=now,
+                notification_log_id=notif.id,
+                template_used="digest",
+            )
+            session.add(comm)
+            comms[notif.transaction_id] = comm
+        notif.status = "sent"
+        notif.sent_at = now
+        notif.resend_message_id = message_id
+        notif.communication_id = comm.id
+    return True
+
+
+@celery_app.task(name="app.tasks.notification_tasks.send_notification_digests")
+def send_notification_digests():
+    """Every 15 min: send one combined email per recipient whose digest window has closed."""
+    from app.models import NotificationLog
+    from sqlalchemy import select, func, case
     import os
 
     resend_api_key = os.getenv("RESEND_API_KEY", "")
@@ -199,77 +671,213 @@ def send_queued_emails():
 
     session = _get_sync_session()
     try:
-        now = datetime.utcnow()
-        stmt = (
-            select(NotificationLog)
+        # New items wait out the digest window; a failed digest's items are due at their backoff
+        due_at = case(
+            (NotificationLog.retry_count > 0, NotificationLog.scheduled_for),
+            else_=NotificationLog.scheduled_for + DIGEST_WINDOW,
+        )
+        is_due = due_at <= datetime.utcnow()
+        recipients = session.execute(
+            select(NotificationLog.recipient_email)
             .where(
-                NotificationLog.status == "queued",
-                NotificationLog.scheduled_for <= now,
+                NotificationLog.status == "digest_pending",
+                NotificationLog.created_at >= datetime.utcnow() - LIVE_NOTIFICATION_WINDOW,
             )
-            .order_by(
-                NotificationLog.escalation_level.desc(),
-                NotificationLog.scheduled_for.asc(),
+            .group_by(NotificationLog.recipient_email)
+            .having(func.bool_or(is_due))
+            .limit(DIGEST_RECIPIENTS_PER_RUN)
+        ).scalars().all()
+
+        sent = 0
+        cancelled = 0
+        if recipients:
+            items, cancelled = _claim_live_notifications(
+                session,
+                NotificationLog.recipient_email.in_(recipients),
+                is_due,
+                status="digest_pending",
             )
-            .limit(50)
+            render_data = _prefetch_render_data(session, items) if items else ({}, {}, {})
+            by_recipient = defaultdict(list)
+            for notif in items:
+                by_recipient[notif.recipient_email].append(notif)
+            sent = sum(
+                _send_digest(session, recipient_email, group, resend_api_key, render_data)
+                for recipient_email, group in by_recipient.items()
+            )
+
+        session.commit()
+        logger.info(f"Sent {sent} notification digests, cancelled {cancelled} stale items")
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error sending notification digests: {e}")
+        raise
+    finally:
+        session.close()
+
+
+def _earliest(current, candidate):
+    return candidate if current is None or (candidate is not None and candidate < current) else current
+
+
+def _apply_delivery_event(state, event_type, occurred_at, payload):
+    """Fold one webhook event into a notification's delivery state.
+
+    Timestamps keep their earliest value and status only moves up
+    DELIVERY_STATUS_RANK, so duplicate and out-of-order events converge on
+    the same result.
+    """
+    new_status = None
+    if event_type == "email.delivered":
+        state["delivered_at"] = _earliest(state["delivered_at"], occurred_at)
+        new_status = "delivered"
+    elif event_type == "email.opened":
+        state["opened_at"] = _earliest(state["opened_at"], occurred_at)
+    elif event_type == "email.clicked":
+        state["clicked_at"] = _earliest(state["clicked_at"], occurred_at)
+    elif event_type == "email.bounced":
+        state["bounced_at"] = _earliest(state["bounced_at"], occurred_at)
+        state["bounce_reason"] = state["bounce_reason"] or (
+            (payload.get("data") or {}).get("bounce", {}).get("message", "Unknown")
+        )
+        new_status = "bounced"
+    elif event_type == "email.complained":
+        new_status = "complained"
+
+    if new_status and DELIVERY_STATUS_RANK[new_status] > DELIVERY_STATUS_RANK.get(state["status"], 0):
+        state["status"] = new_status
+
+
+def _apply_webhook_batch(session, events, now):
+    """Apply a batch of staged webhook events with one lookup and one bulk update.
+
+    Returns (applied, unmatched) event counts.
+    """
+    from app.models import NotificationLog, Party, WebhookEvent
+    from sqlalchemy import select, update, case, bindparam
+
+    message_ids = {e.message_id for e in events if e.message_id}
+    state_columns = ("status", "delivered_at", "opened_at", "clicked_at", "bounced_at", "bounce_reason")
+    rows = session.execute(
+        select(
+            NotificationLog.id,
+            NotificationLog.created_at,
+            NotificationLog.resend_message_id,
+            NotificationLog.recipient_email,
+            *(getattr(NotificationLog, c) for c in state_columns),
+        ).where(NotificationLog.resend_message_id.in_(message_ids))
+    ).all() if message_ids else []
+
+    # A digest shares one message id across several notification logs
+    states_by_message = defaultdict(list)
+    for row in rows:
+        states_by_message[row.resend_message_id].append(
+            {
+                "id": row.id,
+                "created_at": row.created_at,
+                "recipient_email": row.recipient_email,
+                **{c: getattr(row, c) for c in state_columns},
+            }
         )
-        notifications = session.execute(stmt).scalars().all()
 
-        for notif in notifications:
-            # Pre-send validation: check if milestone was completed
-            if notif.milestone_id:
-                milestone = session.get(Milestone, notif.milestone_id)
-                if milestone and milestone.status in ("completed", "waived", "cancelled"):
-                    notif.status = "cancelled"
-                    notif.error_message = "Milestone completed before send"
-                    continue
+    changed = {}
+    bounced_emails, complained_emails = set(), set()
+    applied_ids, unmatched_ids = [], []
+    for event in sorted(events, key=lambda e: e.occurred_at or e.created_at):
+        states = states_by_message.get(event.message_id)
+        if not states:
+            unmatched_ids.append(event.id)
+            continue
+        for state in states:
+            _apply_delivery_event(state, event.event_type, event.occurred_at or event.created_at, event.payload)
+            changed[state["id"]] = state
+            if event.event_type == "email.bounced":
+                bounced_emails.add(state["recipient_email"])
+            elif event.event_type == "email.complained":
+                complained_emails.add(state["recipient_email"])
+        applied_ids.append(event.id)
+
+    if changed:
+        # Matching on created_at as well lets each row's update prune to its month's partition
+        log = NotificationLog.__table__
+        session.execute(
+            update(log).where(log.c.id == bindparam("log_id"), log.c.created_at == bindparam("log_created_at")),
+            [
+                {"log_id": s["id"], "log_created_at": s["created_at"], **{c: s[c] for c in state_columns}}
+                for s in changed.values()
+            ],
+        )
+    if bounced_emails:
+        session.execute(
+            update(Party)
+            .where(Party.email.in_(bounced_emails), Party.email_bounced.isnot(True))
+            .values(email_bounced=True, bounced_at=now)
+        )
+    if complained_emails:
+        session.execute(
+            update(Party)
+            .where(Party.email.in_(complained_emails), Party.unsubscribed_at.is_(None))
+            .values(unsubscribed_at=now)
+        )
+    if applied_ids:
+        session.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id.in_(applied_ids))
+            .values(processed_at=now, attempts=WebhookEvent.attempts + 1)
+        )
+    if unmatched_ids:
+        session.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id.in_(unmatched_ids))
+            .values(
+                attempts=WebhookEvent.attempts + 1,
+                processed_at=case(
+                    (WebhookEvent.created_at < now - WEBHOOK_UNMATCHED_TTL, now),
+                    else_=None,
+                ),
+            )
+        )
+    return len(applied_ids), len(unmatched_ids)
 
-            try:
-                import resend as resend_lib
-                resend_lib.api_key = resend_api_key
-                result = resend_lib.Emails.send({
-                    "from": os.getenv("RESEND_FROM_EMAIL", "noreply@armistead.re"),
-                    "to": [notif.recipient_email],
-                    "subject": notif.subject or "Transaction Update",
-                    "html": f"<p>{notif.subject}</p>",
-                })
-                notif.status = "sent"
-                notif.sent_at = datetime.utcnow()
-                notif.resend_message_id = result.get("id") if isinstance(result, dict) else str(result)
-
-                # Create communication record
-                comm = Communication(
-                    transaction_id=notif.transaction_id,
-                    milestone_id=notif.milestone_id,
-                    type="email",
-                    recipient_email=notif.recipient_email,
-                    subject=notif.subject or "",
-                    body=notif.subject or "",
-                    status="sent",
-                    delivery_status="sent",
-                    sent_at=datetime.utcnow(),
-                    notification_log_id=notif.id,
-                )
-                session.add(comm)
-                notif.communication_id = comm.id
-
-            except Exception as e:
-                notif.retry_count = (notif.retry_count or 0) + 1
-                if notif.retry_count >= 5:
-                    notif.status = "failed"
-                    notif.error_message = str(e)
-                else:
-                    # Exponential backoff: 30s, 2m, 8m, 30m, 2h
-                    backoff_seconds = [30, 120, 480, 1800, 7200]
-                    delay = backoff_seconds[min(notif.retry_count - 1, 4)]
-                    notif.scheduled_for = datetime.utcnow() + timedelta(seconds=delay)
-                    notif.error_message = str(e)
-                logger.error(f"Failed to send email to {notif.recipient_email}: {e}")
 
-        session.commit()
-        logger.info(f"Processed {len(notifications)} queued emails")
+@celery_app.task(name="app.tasks.notification_tasks.process_webhook_events")
+def process_webhook_events():
+    """Every 10s: apply staged Resend webhook events to notification logs and parties in batches."""
+    from app.models import WebhookEvent
+    from sqlalchemy import select, tuple_
+
+    session = _get_sync_session()
+    applied = 0
+    unmatched = 0
+    try:
+        # Keyset over receipt order so unmatched events are not re-read within a run
+        cursor = None
+        for _ in range(WEBHOOK_BATCHES_PER_RUN):
+            stmt = (
+                select(WebhookEvent)
+                .where(WebhookEvent.processed_at.is_(None))
+                .order_by(WebhookEvent.created_at, WebhookEvent.id)
+                .limit(WEBHOOK_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            if cursor is not None:
+                stmt = stmt.where(tuple_(WebhookEvent.created_at, WebhookEvent.id) > cursor)
+            events = session.execute(stmt).scalars().all()
+            if not events:
+                break
+            cursor = (events[-1].created_at, events[-1].id)
+
+            batch_applied, batch_unmatched = _apply_webhook_batch(session, events, datetime.now(timezone.utc))
+            session.commit()
+            applied += batch_applied
+            unmatched += batch_unmatched
+            if len(events) < WEBHOOK_BATCH_SIZE:
+                break
+
+        logger.info(f"Applied {applied} webhook events, {unmatched} not yet matched to a notification")
     except Exception as e:
         session.rollback()
-        logger.error(f"Error sending queued emails: {e}")
+        logger.error(f"Error processing webhook events: {e}")
         raise
     finally:
         session.close()
@@ -277,24 +885,25 @@ def send_queued_emails():
 
 @celery_app.task(name="app.tasks.notification_tasks.expire_stale_drafts")
 def expire_stale_drafts():
-    """Daily: expire email drafts older than 48 hours."""
+    """Daily: expire email drafts older than 48 hours, in short batches."""
     from app.models import EmailDraft
-    from sqlalchemy import select, update
+    from app.tasks.batching import run_batched
 
     session = _get_sync_session()
     try:
         cutoff = datetime.utcnow() - timedelta(hours=48)
-        stmt = (
-            update(EmailDraft)
-            .where(
-                EmailDraft.status == "draft",
-                EmailDraft.created_at < cutoff,
-            )
-            .values(status="expired")
+        stats = run_batched(
+            session,
+            "expire_stale_drafts",
+            EmailDraft,
+            [EmailDraft.status == "draft", EmailDraft.created_at < cutoff],
+            values={"status": "expired"},
         )
-        result = session.execute(stmt)
-        session.commit()
-        logger.info(f"Expired {result.rowcount} stale email drafts")
+        logger.info(
+            f"Expired {stats['rows']} stale email drafts in {stats['batches']} batches "
+            f"({stats['rows_per_second']:,.0f} rows/s)"
+        )
+        return stats
     except Exception as e:
         session.rollback()
         logger.error(f"Error expiring stale drafts: {e}")
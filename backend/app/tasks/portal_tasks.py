@@ -1,11 +1,13 @@
 """Celery tasks for Phase 3: Party Portal — access log cleanup."""
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from app.celery_app import celery_app
 
 logger = logging.getLogger(__name__)
 
+ACCESS_LOG_RETENTION = timedelta(days=180)
+
 
 def _get_sync_session():
     import os
@@ -20,17 +22,31 @@ def _get_sync_session():
 
 @celery_app.task(name="app.tasks.portal_tasks.cleanup_access_logs")
 def cleanup_access_logs():
-    """Daily: delete portal access logs older than 180 days."""
+    """Daily: drop portal access log partitions older than 180 days.
+
+    Whole months are dropped as partitions; only the rows of the month that
+    straddles the cutoff are deleted, in short batches.
+    """
     from app.models.portal import PortalAccessLog
-    from sqlalchemy import delete
+    from app.partitioning import drop_partitions_before
+    from app.tasks.batching import run_batched
 
     session = _get_sync_session()
     try:
-        cutoff = datetime.utcnow() - timedelta(days=180)
-        stmt = delete(PortalAccessLog).where(PortalAccessLog.accessed_at < cutoff)
-        result = session.execute(stmt)
+        cutoff = datetime.now(timezone.utc) - ACCESS_LOG_RETENTION
+        dropped = drop_partitions_before(session.connection(), PortalAccessLog.__tablename__, cutoff)
         session.commit()
-        logger.info(f"Cleaned up {result.rowcount} old portal access logs")
+        stats = run_batched(
+            session,
+            "cleanup_access_logs",
+            PortalAccessLog,
+            [PortalAccessLog.created_at < cutoff],
+        )
+        logger.info(
+            f"Dropped {len(dropped)} portal access log partitions and {stats['rows']} older rows "
+            f"in {stats['batches']} batches"
+        )
+        return stats
     except Exception as e:
         session.rollback()
         logger.error(f"Error cleaning up portal access logs: {e}")
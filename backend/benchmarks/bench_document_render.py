@@ -0,0 +1,64 @@
+"""Benchmark document template rendering throughput (previews and generation).
+
+Usage (from backend/):  python -m benchmarks.bench_document_render [count]
+"""
+import sys
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services import document_service
+
+
+def _data(i):
+    return {
+        "transaction": {
+            "property_address": f"{i} Peachtree St",
+            "closing_date": "Mar 14, 2026",
+            "financing_type": "conventional",
+            "purchase_price": "$500,000",
+        },
+        "milestones": [
+            {"title": f"Milestone {m}", "status": "pending", "due_date": "Mar 1, 2026", "responsible_party_role": "agent"}
+            for m in range(12)
+        ],
+        "parties": [
+            {"name": f"Party {p}", "role": "buyer", "email": f"p{p}@example.com", "phone": "555-0100"}
+            for p in range(4)
+        ],
+        "document_type": "closing_checklist",
+    }
+
+
+def main(count=2000):
+    custom = SimpleNamespace(
+        id=uuid.uuid4(),
+        updated_at=datetime(2026, 1, 1),
+        template_content="<h1>{{ transaction.property_address }}</h1>"
+        "<ul>{% for m in milestones %}<li>{{ m.title }}: {{ m.status }}</li>{% endfor %}</ul>",
+    )
+    types = ["closing_checklist", "net_sheet", "timeline", "cover_letter"]
+    jobs = [(types[i % len(types)], _data(i), custom if i % 5 == 0 else None) for i in range(count)]
+
+    start = time.perf_counter()
+    for document_type, data, template in jobs[:200]:
+        document_service._env.from_string(
+            template.template_content if template else document_service._get_default_template(document_type)
+        ).render(**data)
+    uncached = (time.perf_counter() - start) / 200
+
+    # Warm the compiled-template cache, as a long-lived process would be
+    for document_type, data, template in jobs[:len(types) + 1]:
+        document_service._render_template(document_type, data, template)
+
+    start = time.perf_counter()
+    for document_type, data, template in jobs:
+        document_service._render_template(document_type, data, template)
+    cached = (time.perf_counter() - start) / count
+    print(f"Compile per render: {uncached * 1e6:,.0f} us/render")
+    print(f"Cached templates:   {cached * 1e6:,.0f} us/render ({1 / cached:,.0f} renders/s, {uncached / cached:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,49 @@
+"""Benchmark notification email rendering throughput.
+
+Usage (from backend/):  python -m benchmarks.bench_email_render [count]
+"""
+import sys
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services import email_render_service
+
+
+def _context(i):
+    return {
+        "subject": f"Reminder: Appraisal Completed #{i}",
+        "type": "reminder",
+        "escalation_level": 0,
+        "recipient_name": f"Lender {i}",
+        "recipient_role": "lender",
+        "milestone": {"title": "Appraisal Completed", "due_date": "Mar 14, 2026"},
+        "transaction": {"property_address": f"{i} Peachtree St", "property_city": "Atlanta", "property_state": "GA"},
+    }
+
+
+def main(count=5000):
+    custom = SimpleNamespace(
+        id=uuid.uuid4(),
+        updated_at=datetime(2026, 1, 1),
+        subject_template="{{ milestone.title }} due {{ milestone.due_date }}",
+        body_template="<p>Hi {{ recipient_name }},</p><p>{{ milestone.title }} at {{ transaction.property_address }}.</p>",
+    )
+    types = ["reminder", "due_today", "overdue_l1", "overdue_l3"]
+    jobs = [
+        (_context(i), custom if i % 4 == 0 else None, types[i % len(types)])
+        for i in range(count)
+    ]
+
+    # Warm the compiled-template cache, as a long-lived worker would be
+    email_render_service.render_many(jobs[:len(types) + 1])
+
+    start = time.perf_counter()
+    email_render_service.render_many(jobs)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {count} emails in {elapsed * 1000:.1f} ms ({count / elapsed:,.0f} emails/s)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,94 @@
+"""Benchmark insert and retention cost of a monthly-partitioned log table vs a plain one.
+
+Both tables mirror portal_access_logs and are filled with rows spread over
+the last 12 months. Retention removes everything older than 180 days: one
+DELETE on the plain table, partition drops plus a boundary DELETE on the
+partitioned one. A hot-path query over the last 7 days shows pruning.
+
+Runs in a scratch schema that is dropped afterwards.
+
+Usage (from backend/):  DATABASE_URL=... python -m benchmarks.bench_partitioning [rows]
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, text
+
+from app.partitioning import add_months, drop_partitions_before, ensure_partitions, month_start
+
+SCHEMA = "bench_partitioning"
+COLUMNS = """
+    id uuid NOT NULL DEFAULT gen_random_uuid(),
+    portal_access_id uuid NOT NULL,
+    action varchar(50) NOT NULL,
+    ip_address varchar(45),
+    created_at timestamptz NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now()
+"""
+FILL = """
+    INSERT INTO {table} (portal_access_id, action, ip_address, created_at)
+    SELECT gen_random_uuid(), 'view', '10.0.0.1',
+           now() - (random() * interval '365 days')
+    FROM generate_series(1, :rows)
+"""
+
+
+def _timed(conn, label, fn):
+    start = time.perf_counter()
+    result = fn()
+    conn.commit()
+    print(f"  {label:<34} {time.perf_counter() - start:8.2f} s")
+    return result
+
+
+def main(rows=10_000_000):
+    url = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:pass@db/ttc")
+    engine = create_engine(url.replace("+asyncpg", "+psycopg2"))
+    cutoff = datetime.now(timezone.utc) - timedelta(days=180)
+    recent = datetime.now(timezone.utc) - timedelta(days=7)
+
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"SET search_path TO {SCHEMA}"))
+        conn.execute(text(f"CREATE TABLE plain_log ({COLUMNS}, PRIMARY KEY (id))"))
+        conn.execute(text("CREATE INDEX ON plain_log (created_at)"))
+        conn.execute(text(f"CREATE TABLE part_log ({COLUMNS}, PRIMARY KEY (created_at, id)) PARTITION BY RANGE (created_at)"))
+        ensure_partitions(conn, "part_log", start=add_months(month_start(datetime.now(timezone.utc)), -12))
+        conn.commit()
+
+        try:
+            print(f"{rows:,} rows over 12 months")
+            print("plain table")
+            _timed(conn, "insert", lambda: conn.execute(text(FILL.format(table="plain_log")), {"rows": rows}))
+            _timed(conn, "last-7-days count", lambda: conn.execute(
+                text("SELECT count(*) FROM plain_log WHERE created_at >= :recent"), {"recent": recent}))
+            deleted = _timed(conn, "retention DELETE", lambda: conn.execute(
+                text("DELETE FROM plain_log WHERE created_at < :cutoff"), {"cutoff": cutoff}).rowcount)
+            print(f"    {deleted:,} rows deleted; table still holds their dead tuples until VACUUM")
+
+            print("partitioned table")
+            _timed(conn, "insert", lambda: conn.execute(text(FILL.format(table="part_log")), {"rows": rows}))
+            _timed(conn, "last-7-days count", lambda: conn.execute(
+                text("SELECT count(*) FROM part_log WHERE created_at >= :recent"), {"recent": recent}))
+            plan = conn.execute(
+                text("EXPLAIN SELECT count(*) FROM part_log WHERE created_at >= :recent"), {"recent": recent}
+            ).scalars().all()
+            scanned = sum(1 for line in plan if "part_log_" in line and "Scan" in line)
+            print(f"    plan scans {scanned} partitions")
+            dropped = _timed(conn, "retention partition drop", lambda: drop_partitions_before(conn, "part_log", cutoff))
+            print(f"    {len(dropped)} partitions dropped")
+            deleted = _timed(conn, "retention boundary DELETE", lambda: conn.execute(
+                text("DELETE FROM part_log WHERE created_at < :cutoff"), {"cutoff": cutoff}).rowcount)
+            print(f"    {deleted:,} rows deleted from the boundary month")
+        finally:
+            conn.rollback()
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+            conn.commit()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
@@ -0,0 +1,64 @@
+"""Benchmark commission what-if scenarios over a synthetic open pipeline.
+
+Builds PipelineArrays for ``deals`` random deals (no database) and times
+each scenario kind through scenario_service.evaluate_scenario.
+
+Usage (from backend/):  python -m benchmarks.bench_scenarios [deals]
+"""
+import sys
+import time
+import uuid
+
+import numpy as np
+
+from app.schemas.commission import CommissionScenario
+from app.services.scenario_service import PipelineArrays, evaluate_scenario
+
+RUNS = 200
+
+
+def main(deals=5_000):
+    rng = np.random.default_rng(0)
+    price = rng.uniform(150_000, 1_500_000, deals)
+    price[rng.random(deals) < 0.02] = np.nan
+    gross = np.nan_to_num(price * 0.03, nan=5_000.0)
+    # Half the deals are priced by a plan (30% company split, 10% team), half by explicit 20% broker lines
+    on_plan = rng.random(deals) < 0.5
+    zeros = np.zeros(deals)
+    pipeline = PipelineArrays(
+        transaction_ids=np.array([str(uuid.uuid4()) for _ in range(deals)]),
+        price=price,
+        gross=gross,
+        broker_amount=zeros,
+        other_amount=zeros,
+        net=gross,
+        referral_pct=np.where(rng.random(deals) < 0.1, 0.25, 0.0),
+        referral_flat=zeros,
+        broker_pct=np.where(on_plan, 0.0, 0.2),
+        broker_flat=zeros,
+        plan_broker_rate=np.where(on_plan, 0.3, 0.0),
+        plan_team_pct=np.where(on_plan, 0.1, 0.0),
+        other_pct=zeros,
+        other_flat=np.where(rng.random(deals) < 0.3, 395.0, 0.0),
+    )
+    scenarios = [
+        CommissionScenario(name="baseline"),
+        CommissionScenario(name="rate", rate=0.025),
+        CommissionScenario(name="tiers", tiers=[{"min": 0, "rate": 0.025}, {"min": 500_000, "rate": 0.03}]),
+        CommissionScenario(name="split + cap", broker_split_percentage=0.3, annual_cap=25_000),
+        CommissionScenario(
+            name="fall-out", fall_out_rate=0.15,
+            fall_out_transaction_ids=list(pipeline.transaction_ids[:deals // 10]),
+        ),
+    ]
+
+    print(f"{deals} deals, {RUNS} runs per scenario")
+    for scenario in scenarios:
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            evaluate_scenario(pipeline, scenario)
+        print(f"  {scenario.name:<14} {(time.perf_counter() - start) / RUNS * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000)
@@ -28,5 +28,8 @@ asyncio.run(wait())
 echo "Running database seed..."
 python seed.py || echo "Seed skipped or already applied."
 
+echo "Running database migrations..."
+alembic upgrade head
+
 echo "Starting FastAPI server..."
 exec uvicorn app.main:app --host 0.0.0.0 --port 8000
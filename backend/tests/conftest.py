@@ -11,6 +11,7 @@ from datetime import datetime, timezone, timedelta
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
@@ -58,6 +59,17 @@ async def db_session(engine):
         yield session
 
 
+@pytest.fixture
+def sync_session_factory(engine):
+    """Synchronous sessions on the test database, for Celery tasks.
+
+    Task test modules point their task module's ``_get_sync_session`` at it.
+    """
+    sync_engine = create_engine(TEST_DATABASE_URL.replace("+asyncpg", "+psycopg2"))
+    yield sessionmaker(bind=sync_engine)
+    sync_engine.dispose()
+
+
 @pytest_asyncio.fixture
 async def client(engine):
     """Async HTTP test client with overridden DB + auth dependencies."""
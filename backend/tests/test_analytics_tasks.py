@@ -0,0 +1,88 @@
+"""Test incremental analytics rollups and the analytics query API."""
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+
+from app.tasks import analytics_tasks
+
+
+@pytest.fixture
+def sync_session(sync_session_factory, monkeypatch):
+    monkeypatch.setattr(analytics_tasks, "_get_sync_session", sync_session_factory)
+    monkeypatch.setattr(analytics_tasks, "ROLLUP_DEBOUNCE", timedelta(0))
+    return sync_session_factory
+
+
+@pytest_asyncio.fixture
+async def team(db_session, seed_user):
+    from app.models import Brokerage, Team, TeamMember
+    brokerage = Brokerage(name="Peach Realty")
+    db_session.add(brokerage)
+    await db_session.flush()
+    team = Team(brokerage_id=brokerage.id, name="Midtown")
+    db_session.add(team)
+    await db_session.flush()
+    seed_user.brokerage_id = brokerage.id
+    db_session.add(TeamMember(team_id=team.id, user_id=seed_user.id))
+    await db_session.commit()
+    return team
+
+
+def _rollups(session):
+    from app.models import AnalyticsDailyRollup
+    return {row.day: row for row in session.query(AnalyticsDailyRollup)}
+
+
+def test_rollups_follow_changed_rows(sync_session, team, seed_transaction):
+    from app.models import AnalyticsRollupChange, Transaction
+
+    analytics_tasks.refresh_analytics_rollups()
+    today = datetime.now(timezone.utc).date()
+    expected_close = seed_transaction.closing_date.astimezone(timezone.utc).date()
+    with sync_session() as session:
+        assert session.query(AnalyticsRollupChange).count() == 0
+        rollups = _rollups(session)
+        assert rollups[today].deals_opened == 1
+        assert rollups[today].team_id == team.id
+        assert rollups[expected_close].pipeline_deals == 1
+        assert rollups[expected_close].pipeline_volume == 500000
+
+        # Closing the deal early moves it off the expected day
+        txn = session.get(Transaction, seed_transaction.id)
+        txn.status = "closed"
+        txn.contract_execution_date = datetime.now(timezone.utc) - timedelta(days=31)
+        txn.closing_date = datetime.now(timezone.utc) - timedelta(days=1)
+        session.commit()
+
+    analytics_tasks.refresh_analytics_rollups()
+    with sync_session() as session:
+        rollups = _rollups(session)
+        assert expected_close not in rollups
+        closed = rollups[today - timedelta(days=1)]
+        assert closed.deals_closed == 1
+        assert closed.closed_volume == 500000
+        assert closed.days_to_close_count == 1
+
+
+@pytest.mark.asyncio
+async def test_analytics_query_groups_rollups(client, sync_session, team, seed_transaction):
+    analytics_tasks.refresh_analytics_rollups()
+    today = date.today()
+
+    response = await client.get(
+        f"/api/brokerages/{team.brokerage_id}/analytics",
+        params={"start_date": str(today - timedelta(days=1)), "end_date": str(today + timedelta(days=60)),
+                "group_by": ["team", "month"], "sort": "pipeline_volume"},
+    )
+    assert response.status_code == 200
+    rows = response.json()["rows"]
+    assert {row["team_id"] for row in rows} == {str(team.id)}
+    assert sum(row["deals_opened"] for row in rows) == 1
+    assert rows[0]["pipeline_volume"] == 500000
+
+    response = await client.get(
+        f"/api/brokerages/{team.brokerage_id}/analytics",
+        params={"start_date": str(today), "end_date": str(today), "group_by": ["day", "week"]},
+    )
+    assert response.status_code == 400
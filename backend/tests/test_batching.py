@@ -0,0 +1,97 @@
+"""Test the batched maintenance runner and the jobs built on it."""
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from app.tasks import maintenance_tasks, notification_tasks
+from app.tasks.batching import run_batched
+
+
+@pytest.fixture
+def sync_session(sync_session_factory, monkeypatch):
+    monkeypatch.setattr(notification_tasks, "_sync_session_factory", sync_session_factory)
+    monkeypatch.setattr(maintenance_tasks, "_get_sync_session", sync_session_factory)
+    return sync_session_factory
+
+
+@pytest.fixture
+def stale_drafts(sync_session, seed_transaction):
+    from app.models import EmailDraft
+    now = datetime.now(timezone.utc)
+    with sync_session() as session:
+        for i in range(5):
+            session.add(EmailDraft(
+                transaction_id=seed_transaction.id,
+                recipient_email=f"party{i}@test.com",
+                subject="Reminder",
+                body_html="<p>Reminder</p>",
+                email_type="reminder",
+                created_at=now - timedelta(days=3, minutes=i),
+            ))
+        session.add(EmailDraft(
+            transaction_id=seed_transaction.id,
+            recipient_email="fresh@test.com",
+            subject="Reminder",
+            body_html="<p>Reminder</p>",
+            email_type="reminder",
+        ))
+        session.commit()
+
+
+def test_interrupted_run_resumes_from_checkpoint(sync_session, stale_drafts):
+    from app.models import EmailDraft, MaintenanceCheckpoint
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=48)
+    criteria = [EmailDraft.status == "draft", EmailDraft.created_at < cutoff]
+
+    with sync_session() as session:
+        first = run_batched(session, "expire_test", EmailDraft, criteria,
+                            values={"status": "expired"}, batch_size=2, pause_seconds=0, max_batches=1)
+    assert first["rows"] == 2
+    assert first["finished"] is False
+
+    with sync_session() as session:
+        checkpoint = session.query(MaintenanceCheckpoint).filter_by(job_name="expire_test").one()
+        assert checkpoint.rows_processed == 2
+        assert checkpoint.finished_at is None
+
+        resumed = run_batched(session, "expire_test", EmailDraft, criteria,
+                              values={"status": "expired"}, batch_size=2, pause_seconds=0)
+    assert resumed["rows"] == 3
+    assert resumed["batches"] == 2
+    assert resumed["total_rows"] == 5
+    assert resumed["finished"] is True
+
+
+def test_expire_stale_drafts_leaves_recent_drafts(sync_session, stale_drafts):
+    from app.models import EmailDraft
+
+    stats = notification_tasks.expire_stale_drafts()
+
+    assert stats["rows"] == 5
+    with sync_session() as session:
+        statuses = {d.recipient_email: d.status for d in session.query(EmailDraft)}
+        assert statuses.pop("fresh@test.com") == "draft"
+        assert set(statuses.values()) == {"expired"}
+
+
+def test_purge_keeps_recent_and_unprocessed_webhook_events(sync_session):
+    from app.models import WebhookEvent
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=45)
+    with sync_session() as session:
+        session.add_all([
+            WebhookEvent(event_id="evt_old", event_type="email.delivered", payload={},
+                         created_at=old, processed_at=old),
+            WebhookEvent(event_id="evt_pending", event_type="email.delivered", payload={},
+                         created_at=old),
+            WebhookEvent(event_id="evt_recent", event_type="email.delivered", payload={},
+                         created_at=old, processed_at=now - timedelta(days=1)),
+        ])
+        session.commit()
+
+    stats = maintenance_tasks.purge_processed_webhook_events()
+
+    assert stats["rows"] == 1
+    with sync_session() as session:
+        remaining = {e.event_id for e in session.query(WebhookEvent)}
+    assert remaining == {"evt_pending", "evt_recent"}
@@ -0,0 +1,75 @@
+"""Test brokerage endpoints."""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_agent_performance_summary(client, db_session, seed_user, seed_transaction):
+    from app.models import Transaction, TransactionCommission
+
+    now = datetime.now(timezone.utc)
+    for price, days, gross in ((300000, 20, 9000), (200000, 30, 6000), (100000, 70, None)):
+        closed = Transaction(
+            id=uuid.uuid4(), agent_id=seed_user.id, representation_side="seller",
+            property_address="1 Sold Way", purchase_price={"amount": price},
+            contract_execution_date=now - timedelta(days=days), closing_date=now, status="closed",
+        )
+        db_session.add(closed)
+        await db_session.flush()
+        if gross:
+            db_session.add(TransactionCommission(
+                transaction_id=closed.id, agent_id=seed_user.id, gross_commission=gross,
+            ))
+    await db_session.commit()
+
+    response = await client.get(f"/api/agents/{seed_user.id}/performance-summary")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["transactions_closed"] == 3
+    assert data["active_transactions"] == 1
+    assert data["total_volume"] == 600000
+    assert data["total_commission"] == 15000
+    assert data["avg_days_to_close"] == 40.0
+    assert data["median_days_to_close"] == 30.0
+
+
+@pytest.mark.asyncio
+async def test_compliance_dashboard_counts_and_pages(client, db_session, seed_user, seed_transaction):
+    from app.models import Brokerage, ComplianceRule, ComplianceViolation
+
+    brokerage = Brokerage(name="Peach Realty")
+    db_session.add(brokerage)
+    await db_session.flush()
+    lender = ComplianceRule(brokerage_id=brokerage.id, name="Lender on file",
+                            rule_type="required_party", conditions={"role": "lender"})
+    closing = ComplianceRule(brokerage_id=brokerage.id, name="Closing date set",
+                             rule_type="closing_date_required", conditions={})
+    db_session.add_all([lender, closing])
+    await db_session.flush()
+    now = datetime.now(timezone.utc)
+    violations = ((lender, "warning", False), (closing, "violation", False), (lender, "warning", True))
+    for i, (rule, severity, resolved) in enumerate(violations):
+        db_session.add(ComplianceViolation(
+            rule_id=rule.id, transaction_id=seed_transaction.id, agent_id=seed_user.id,
+            severity=severity, message="Missing lender", resolved=resolved,
+            created_at=now - timedelta(hours=i),
+        ))
+    await db_session.commit()
+
+    url = f"/api/brokerages/{brokerage.id}/compliance-dashboard"
+    data = (await client.get(url, params={"limit": 2})).json()
+    assert data["total_violations"] == 3
+    assert data["unresolved_count"] == 2
+    assert data["by_severity"] == {"warning": 2, "violation": 1}
+    assert data["unresolved_by_severity"] == {"warning": 1, "violation": 1}
+    assert [v["resolved"] for v in data["recent_violations"]] == [False, False]
+
+    data = (await client.get(url, params={"limit": 2, "cursor": data["next_cursor"]})).json()
+    assert [v["resolved"] for v in data["recent_violations"]] == [True]
+    assert data["next_cursor"] is None
+
+    data = (await client.get(url, params={"agent_id": str(uuid.uuid4())})).json()
+    assert data["total_violations"] == 0
+    assert (await client.get(url, params={"cursor": "not-a-cursor"})).status_code == 400
@@ -0,0 +1,72 @@
+"""Test commission plan-year positions."""
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.tasks import commission_tasks
+
+
+@pytest.fixture
+def sync_session(sync_session_factory, monkeypatch):
+    monkeypatch.setattr(commission_tasks, "_get_sync_session", sync_session_factory)
+    return sync_session_factory
+
+
+def test_rebuild_commission_ytd(sync_session, seed_user, seed_transaction):
+    from app.models import AgentCommissionYTD, CommissionConfig, CommissionSplit, Transaction, TransactionCommission
+
+    with sync_session() as session:
+        # Plan years start in July: a March closing belongs to the previous year's plan
+        session.add(CommissionConfig(agent_id=seed_user.id, plan_year_start_month=7))
+        session.get(Transaction, seed_transaction.id).closing_date = datetime(2026, 3, 15, tzinfo=timezone.utc)
+        commission = TransactionCommission(
+            transaction_id=seed_transaction.id, agent_id=seed_user.id,
+            gross_commission=15000, actual_gross=16000, status="paid",
+        )
+        session.add(commission)
+        session.flush()
+        for split_type, amount in (("referral", 4000), ("broker", 3600), ("team_member", 840)):
+            session.add(CommissionSplit(
+                transaction_commission_id=commission.id, split_type=split_type,
+                recipient_name=split_type, calculated_amount=amount,
+            ))
+        session.add(AgentCommissionYTD(agent_id=seed_user.id, plan_year=2026, gross=1, company_dollar=1, deals=1))
+        session.commit()
+
+    assert commission_tasks.rebuild_commission_ytd(str(seed_user.id)) == {"positions": 1}
+    with sync_session() as session:
+        [position] = session.query(AgentCommissionYTD).all()
+        assert position.plan_year == 2025
+        assert position.gross == Decimal("12000")
+        assert position.company_dollar == Decimal("3600")
+        assert position.deals == 1
+
+
+def test_recompute_agent_commissions_after_plan_change(sync_session, seed_user, seed_transaction):
+    from app.models import CommissionConfig, CommissionSplit, TransactionCommission
+
+    with sync_session() as session:
+        config = CommissionConfig(agent_id=seed_user.id, broker_split_percentage=Decimal("0.3"))
+        session.add(config)
+        commission = TransactionCommission(
+            transaction_id=seed_transaction.id, agent_id=seed_user.id, rate=Decimal("0.03"),
+            gross_commission=15000, projected_net=10500,
+        )
+        session.add(commission)
+        session.flush()
+        session.add(CommissionSplit(
+            transaction_commission_id=commission.id, split_type="broker", recipient_name="Brokerage",
+            percentage=Decimal("0.3"), calculated_amount=4500, from_plan=True,
+        ))
+        session.commit()
+
+        config.broker_split_percentage = Decimal("0.2")
+        config.team_splits = {"members": [{"name": "Jane", "percentage": 0.1}]}
+        session.commit()
+
+    assert commission_tasks.recompute_agent_commissions(str(seed_user.id)) == {"commissions": 1}
+    with sync_session() as session:
+        splits = {s.split_type: s.calculated_amount for s in session.query(CommissionSplit)}
+        assert splits == {"broker": Decimal("3000"), "team_member": Decimal("1200")}
+        assert session.query(TransactionCommission).one().projected_net == Decimal("10800")
@@ -24,3 +24,406 @@ async def test_export_pipeline_csv(client, seed_user):
     response = await client.get("/api/pipeline/export")
     assert response.status_code == 200
     assert "text/csv" in response.headers.get("content-type", "")
+
+
+@pytest.mark.asyncio
+async def test_pipeline_summary_by_month(client, db_session, seed_user, seed_transaction):
+    from datetime import datetime, timezone
+    from app.models import TransactionCommission
+
+    db_session.add(TransactionCommission(
+        transaction_id=seed_transaction.id, agent_id=seed_user.id,
+        rate=0.03, gross_commission=15000, projected_net=12000,
+    ))
+    await db_session.commit()
+
+    response = await client.get("/api/pipeline", params={"months": 3})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["transaction_count"] == 1
+    assert float(data["total_projected_gross"]) == 15000
+    assert data["by_status"]["projected"] == {"count": 1, "gross": 15000.0, "net": 12000.0}
+    assert float(data["avg_commission_rate"]) == 0.03
+
+    closing_month = seed_transaction.closing_date.astimezone(timezone.utc).strftime("%Y-%m")
+    assert len(data["by_month"]) == 3
+    assert data["by_month"][0]["month"] == datetime.now(timezone.utc).strftime("%Y-%m")
+    assert {m["month"]: m["count"] for m in data["by_month"]}[closing_month] == 1
+    assert sum(m["gross"] for m in data["by_month"]) == 15000
+
+
+@pytest.mark.asyncio
+async def test_export_streams_flattened_splits_by_scope(client, db_session, seed_user, seed_transaction):
+    import csv
+    import io
+    import uuid
+    from app.models import Brokerage, CommissionSplit, Team, TeamMember, TransactionCommission
+
+    commission = TransactionCommission(
+        transaction_id=seed_transaction.id, agent_id=seed_user.id, gross_commission=15000,
+    )
+    db_session.add(commission)
+    await db_session.flush()
+    for name in ("Broker", "Referral Co"):
+        db_session.add(CommissionSplit(
+            transaction_commission_id=commission.id, split_type="broker",
+            recipient_name=name, percentage=0.1, calculated_amount=1500,
+        ))
+    await db_session.commit()
+
+    response = await client.get("/api/pipeline/export", params={"include_splits": True})
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert sorted(row["Split Recipient"] for row in rows) == ["Broker", "Referral Co"]
+    assert {row["Gross Commission"] for row in rows} == {"15000.00"}
+
+    # Team and brokerage scopes need the agent's brokerage
+    assert (await client.get("/api/pipeline/export", params={"scope": "brokerage"})).status_code == 400
+    brokerage = Brokerage(name="Peach Realty")
+    db_session.add(brokerage)
+    await db_session.flush()
+    team = Team(brokerage_id=brokerage.id, name="Midtown")
+    db_session.add(team)
+    await db_session.flush()
+    seed_user.brokerage_id = brokerage.id
+    db_session.add(TeamMember(team_id=team.id, user_id=seed_user.id))
+    await db_session.commit()
+
+    # A plain agent may not export their team or brokerage
+    team_params = {"scope": "team", "team_id": str(team.id)}
+    assert (await client.get("/api/pipeline/export", params=team_params)).status_code == 403
+    assert (await client.get("/api/pipeline/export", params={"scope": "brokerage"})).status_code == 403
+
+    # A team lead may export their own team only
+    seed_user.role = "team_lead"
+    other_team = Team(brokerage_id=brokerage.id, name="Buckhead")
+    db_session.add(other_team)
+    await db_session.commit()
+    response = await client.get("/api/pipeline/export", params=team_params)
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["Agent ID"] for row in rows] == [str(seed_user.id)]
+    other_params = {"scope": "team", "team_id": str(other_team.id)}
+    assert (await client.get("/api/pipeline/export", params=other_params)).status_code == 403
+    assert (await client.get("/api/pipeline/export", params={"scope": "brokerage"})).status_code == 403
+    response = await client.get("/api/pipeline/export", params={"scope": "team", "team_id": str(uuid.uuid4())})
+    assert response.status_code == 404
+
+    # A broker may export any team in the brokerage, and the brokerage itself
+    seed_user.role = "broker"
+    await db_session.commit()
+    assert (await client.get("/api/pipeline/export", params=other_params)).status_code == 200
+    response = await client.get("/api/pipeline/export", params={"scope": "brokerage"})
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert {row["Agent ID"] for row in rows} == {str(seed_user.id)}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_scenarios(client, db_session, seed_user, seed_transaction):
+    from sqlalchemy import select
+    from app.models import CommissionSplit, TransactionCommission
+
+    commission = TransactionCommission(
+        transaction_id=seed_transaction.id, agent_id=seed_user.id,
+        rate=0.03, gross_commission=15000, projected_net=11000,
+    )
+    db_session.add(commission)
+    await db_session.flush()
+    db_session.add(CommissionSplit(
+        transaction_commission_id=commission.id, split_type="broker",
+        recipient_name="Broker", percentage=0.2, calculated_amount=3000,
+    ))
+    db_session.add(CommissionSplit(
+        transaction_commission_id=commission.id, split_type="referral", recipient_name="Referral Co",
+        is_percentage=False, flat_amount=1000, calculated_amount=1000,
+    ))
+    await db_session.commit()
+
+    response = await client.post("/api/pipeline/scenarios", json={"scenarios": [
+        {"name": "lower rate", "rate": 0.025},
+        {"name": "tiers", "tiers": [{"min": 0, "rate": 0.02}, {"min": 400000, "rate": 0.035}]},
+        {"name": "capped", "annual_cap": 5000, "cap_paid_to_date": 4000},
+        {"name": "75/25", "broker_split_percentage": 0.25},
+        {"name": "lost", "fall_out_transaction_ids": [str(seed_transaction.id)]},
+        {"name": "half", "fall_out_rate": 0.5},
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["deal_count"] == 1
+    assert data["baseline"] == {"deal_count": 1, "gross": 15000, "broker_split": 3000, "other_splits": 1000, "net": 11000}
+
+    results = {s["name"]: s for s in data["scenarios"]}
+    assert results["lower rate"]["totals"]["gross"] == 12500
+    assert results["lower rate"]["delta_net"] == -2000
+    assert results["tiers"]["totals"]["gross"] == 17500
+    assert results["capped"]["totals"]["broker_split"] == 1000
+    assert results["capped"]["delta_net"] == 2000
+    assert results["75/25"]["totals"]["net"] == 10250
+    assert results["lost"]["totals"] == {"deal_count": 0, "gross": 0, "broker_split": 0, "other_splits": 0, "net": 0}
+    assert results["half"]["totals"]["net"] == 5500
+
+    # Nothing is written back
+    await db_session.refresh(commission)
+    assert float(commission.gross_commission) == 15000
+    splits = (await db_session.execute(select(CommissionSplit.calculated_amount))).scalars().all()
+    assert sorted(float(s) for s in splits) == [1000, 3000]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_scenarios_follow_the_plan_waterfall(client, seed_user, seed_transaction, monkeypatch):
+    from app.tasks import commission_tasks
+
+    monkeypatch.setattr(commission_tasks.recompute_agent_commissions, "delay", lambda *args: None)
+    await client.put("/api/commission-config", json={
+        "commission_type": "percentage", "default_rate": 0.02,
+        "broker_split_percentage": 0.3, "default_referral_fee_percentage": 0.25,
+        "team_splits": {"members": [{"name": "Jane", "percentage": 0.1}]},
+    })
+    recorded = (await client.post(f"/api/transactions/{seed_transaction.id}/commission", json={
+        "rate": 0.02, "splits": [{"split_type": "referral", "recipient_name": "Referral Co"}],
+    })).json()
+    assert float(recorded["projected_net"]) == 4725
+
+    response = await client.post("/api/pipeline/scenarios", json={"scenarios": [
+        {"name": "unchanged"},
+        {"name": "higher rate", "rate": 0.03},
+        {"name": "80/20", "broker_split_percentage": 0.2},
+    ]})
+    data = response.json()
+    # Referral 2,500 off the top, 30% of the remaining 7,500, then 10% of the agent's 5,250
+    assert data["baseline"] == {"deal_count": 1, "gross": 10000, "broker_split": 2250, "other_splits": 3025, "net": 4725}
+    results = {s["name"]: s for s in data["scenarios"]}
+    assert results["unchanged"]["totals"] == data["baseline"]
+    assert results["unchanged"]["delta_net"] == 0
+    assert results["higher rate"]["totals"]["net"] == 7087.5
+    assert results["80/20"]["totals"]["broker_split"] == 1500
+    assert results["80/20"]["delta_net"] == 675
+
+
+@pytest.mark.asyncio
+async def test_pipeline_forecast_cached_until_pipeline_changes(client, db_session, monkeypatch, seed_user, seed_transaction):
+    from datetime import datetime, timedelta, timezone
+    from app.models import Milestone, TransactionCommission
+    from app.services import forecast_service
+
+    db_session.add(TransactionCommission(
+        transaction_id=seed_transaction.id, agent_id=seed_user.id, gross_commission=15000, projected_net=12000,
+    ))
+    await db_session.commit()
+
+    params = {"months": 6, "simulations": 2000}
+    response = await client.get("/api/pipeline/forecast", params=params)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["cached"] is False
+    assert data["deal_count"] == 1
+    assert len(data["by_month"]) == 6
+    # One deal: every simulation earns either nothing or the full net
+    assert {m["p90"] for m in data["by_month"]} <= {0.0, 12000.0}
+    assert data["total"]["p90"] == 12000
+    assert 0 < data["total"]["expected"] < 12000
+    assert 0.5 < data["deals"][0]["close_probability"] < 1
+    assert abs(data["deals"][0]["expected_income"] - data["total"]["expected"]) < 600
+    assert sum(m["expected_closings"] for m in data["by_month"]) < 1
+
+    again = (await client.get("/api/pipeline/forecast", params=params)).json()
+    assert again["cached"] is True
+    assert again["total"] == data["total"]
+    assert (await client.get("/api/pipeline/forecast", params={"months": 3, "simulations": 2000})).json()["cached"] is False
+
+    # Large runs are capped by simulations x deals
+    monkeypatch.setattr(forecast_service, "MAX_SIMULATION_CELLS", 1500)
+    capped = (await client.get("/api/pipeline/forecast", params={**params, "refresh": True})).json()
+    assert capped["simulations"] == 1500
+    monkeypatch.undo()
+
+    # Overdue milestones lower the close probability and invalidate the cache
+    db_session.add(Milestone(
+        transaction_id=seed_transaction.id, type="inspection", title="Inspection", status="pending",
+        responsible_party_role="buyer_agent", sort_order=1,
+        due_date=datetime.now(timezone.utc) - timedelta(days=3),
+    ))
+    await db_session.commit()
+    changed = (await client.get("/api/pipeline/forecast", params=params)).json()
+    assert changed["cached"] is False
+    assert changed["deals"][0]["close_probability"] < data["deals"][0]["close_probability"]
+
+
+def test_forecast_simulation_buckets_income_by_month():
+    import numpy as np
+    from app.services.forecast_service import simulate
+
+    income_by_month, closings = simulate(
+        income=np.array([100.0, 50.0, 10.0]),
+        close_probability=np.array([1.0, 1.0, 0.0]),
+        slip_probability=np.zeros(3),
+        scheduled_days=np.array([5.0, 40.0, 5.0]),
+        month_edges=np.array([0.0, 31.0, 59.0]),
+        simulations=4,
+        rng=np.random.default_rng(0),
+    )
+    assert income_by_month.tolist() == [[100.0, 50.0]] * 4
+    assert closings.tolist() == [[1.0, 1.0]] * 4
+
+
+def test_commission_plan_graduated_cap_and_waterfall():
+    from decimal import Decimal as D
+    from types import SimpleNamespace
+    from app.services.commission_plan import CommissionPlan, apply_plan, normalize_tiers
+
+    config = SimpleNamespace(
+        broker_split_percentage=D("0.3"),
+        graduated_splits=normalize_tiers({"tiers": [
+            {"min": 100000, "broker_split_percentage": 0},
+            {"min": 50000, "broker_split_percentage": 0.2},
+        ]}),
+        annual_cap=D("20000"),
+        default_referral_fee_percentage=D("0.25"),
+        team_splits={"members": [{"name": "Jane", "percentage": 0.1}]},
+        plan_year_start_month=1,
+    )
+    plan = CommissionPlan.from_config(config)
+    assert [t for t, _ in plan.company_splits] == [0, 50000, 100000]
+
+    # 10k below the 50k threshold at 30%, 10k above it at 20%
+    assert plan.company_dollar(D("20000"), D("40000"), D("0")) == D("5000")
+    # The cap leaves room for only 1000 more
+    assert plan.company_dollar(D("20000"), D("40000"), D("19000")) == D("1000")
+    assert plan.company_split_rate(D("120000")) == 0
+
+    splits = apply_plan(plan, D("15000"), referrals=[("Referral Co", None, None)])
+    assert [(s.split_type, s.calculated_amount) for s in splits] == [
+        ("referral", D("3750.00")), ("broker", D("3375.00")), ("team_member", D("787.50")),
+    ]
+
+
+def test_reprice_drops_plan_lines_and_keeps_duplicate_referrals():
+    from decimal import Decimal as D
+    from app.models import CommissionSplit, TransactionCommission
+    from app.services.commission_plan import CommissionPlan
+    from app.services.commission_service import reprice_commission
+
+    commission = TransactionCommission(commission_type="percentage", rate=D("0.03"), splits=[
+        CommissionSplit(split_type="broker", recipient_name="Brokerage", is_percentage=True,
+                        percentage=D("0.2"), calculated_amount=D("3000"), from_plan=True),
+        CommissionSplit(split_type="referral", recipient_name="Referral Co", is_percentage=False,
+                        flat_amount=D("1000"), from_plan=False),
+        CommissionSplit(split_type="referral", recipient_name="Referral Co", is_percentage=False,
+                        flat_amount=D("500"), from_plan=False),
+    ])
+
+    # Without a plan the old plan broker line is removed, not left standing
+    reprice_commission(commission, D("500000"))
+    assert commission.gross_commission == D("15000")
+    assert sorted(s.calculated_amount for s in commission.splits) == [D("500"), D("1000")]
+    assert commission.projected_net == D("13500")
+
+    # With a plan both referrals to the same name stay separate lines
+    plan = CommissionPlan(company_splits=((D("0"), D("0.1")),), annual_cap=None,
+                          referral_fee_percentage=None, team_splits=())
+    reprice_commission(commission, D("500000"), plan)
+    assert sorted((s.split_type, s.calculated_amount) for s in commission.splits) == [
+        ("broker", D("1350.00")), ("referral", D("500")), ("referral", D("1000")),
+    ]
+    assert commission.projected_net == D("12150.00")
+
+
+@pytest.mark.asyncio
+async def test_commission_plan_applied_and_ytd_posted(client, db_session, seed_user, seed_transaction, monkeypatch):
+    from datetime import datetime, timezone
+    from app.tasks import commission_tasks
+
+    queued = []
+    monkeypatch.setattr(commission_tasks.recompute_agent_commissions, "delay", lambda *args: queued.append(args))
+
+    # Closing now keeps the deal in the current plan year
+    seed_transaction.closing_date = datetime.now(timezone.utc)
+    await db_session.commit()
+    response = await client.put("/api/commission-config", json={
+        "commission_type": "percentage", "default_rate": 0.03,
+        "broker_split_percentage": 0.3, "default_referral_fee_percentage": 0.25,
+        "graduated_splits": {"tiers": [{"min": 20000, "broker_split_percentage": 0.1}, {"min": 0, "broker_split_percentage": 0.3}]},
+        "annual_cap": 8000,
+        "team_splits": {"members": [{"name": "Jane", "percentage": 0.1}]},
+    })
+    assert response.status_code == 200
+    assert [t["min"] for t in response.json()["graduated_splits"]["tiers"]] == [0, 20000]
+    assert queued == [(str(seed_user.id), True)]
+
+    response = await client.post(f"/api/transactions/{seed_transaction.id}/commission", json={
+        "rate": 0.03, "splits": [{"split_type": "referral", "recipient_name": "Referral Co"}],
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert float(data["gross_commission"]) == 15000
+    assert sorted((s["split_type"], float(s["calculated_amount"])) for s in data["splits"]) == [
+        ("broker", 3375), ("referral", 3750), ("team_member", 787.5),
+    ]
+    assert float(data["projected_net"]) == 7087.5
+
+    position = (await client.get("/api/commission-config/position")).json()
+    assert position["deals"] == 0 and float(position["company_split_percentage"]) == 0.3
+
+    # Paying the commission posts it to the plan-year position; un-paying takes it back
+    await client.patch(f"/api/transactions/{seed_transaction.id}/commission", json={"status": "paid"})
+    position = (await client.get("/api/commission-config/position")).json()
+    assert position["deals"] == 1
+    assert float(position["gross"]) == 11250
+    assert float(position["company_dollar"]) == 3375
+    assert float(position["cap_remaining"]) == 4625
+
+    await client.patch(f"/api/transactions/{seed_transaction.id}/commission", json={"status": "pending"})
+    position = (await client.get("/api/commission-config/position")).json()
+    assert position["deals"] == 0 and float(position["gross"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_price_change_recalculates_commission(client, db_session, seed_user, seed_transaction):
+    response = await client.post(f"/api/transactions/{seed_transaction.id}/commission", json={
+        "rate": 0.03, "splits": [
+            {"split_type": "broker", "recipient_name": "Broker", "percentage": 0.2},
+            {"split_type": "referral", "recipient_name": "Referral Co", "is_percentage": False, "flat_amount": 1000},
+        ],
+    })
+    assert float(response.json()["projected_net"]) == 11000
+
+    response = await client.patch(f"/api/transactions/{seed_transaction.id}", json={"purchase_price": {"amount": 600000}})
+    assert response.status_code == 200
+    data = (await client.get(f"/api/transactions/{seed_transaction.id}/commission")).json()
+    assert float(data["gross_commission"]) == 18000
+    assert sorted(float(s["calculated_amount"]) for s in data["splits"]) == [1000, 3600]
+    assert float(data["projected_net"]) == 13400
+
+    # A manual override keeps its gross; splits still follow it
+    await client.patch(f"/api/transactions/{seed_transaction.id}/commission", json={
+        "gross_commission": 10000, "is_manual_override": True,
+    })
+    await client.patch(f"/api/transactions/{seed_transaction.id}", json={"purchase_price": {"amount": 700000}})
+    data = (await client.get(f"/api/transactions/{seed_transaction.id}/commission")).json()
+    assert float(data["gross_commission"]) == 10000
+    assert float(data["projected_net"]) == 7000
+
+
+@pytest.mark.asyncio
+async def test_paid_commission_reversed_from_the_year_it_was_posted_to(client, db_session, seed_user, seed_transaction):
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy import select, update
+    from app.models import AgentCommissionYTD, TransactionCommission
+
+    seed_transaction.closing_date = None
+    await db_session.commit()
+    await client.post(f"/api/transactions/{seed_transaction.id}/commission", json={"rate": 0.03})
+    await client.patch(f"/api/transactions/{seed_transaction.id}/commission", json={"status": "paid"})
+
+    # Without a closing date the payment time decides the year; pretend it was paid a year ago
+    this_year = datetime.now(timezone.utc).year
+    await db_session.execute(
+        update(TransactionCommission).values(plan_year_date=datetime.now(timezone.utc) - timedelta(days=366))
+    )
+    await db_session.execute(update(AgentCommissionYTD).values(plan_year=this_year - 1))
+    await db_session.commit()
+
+    await client.patch(f"/api/transactions/{seed_transaction.id}/commission", json={"status": "pending"})
+    db_session.expire_all()
+    positions = (await db_session.execute(select(AgentCommissionYTD))).scalars().all()
+    assert [(p.plan_year, p.deals, float(p.gross)) for p in positions] == [(this_year - 1, 0, 0)]
+    commission = (await db_session.execute(select(TransactionCommission))).scalar_one()
+    assert commission.plan_year_date is None
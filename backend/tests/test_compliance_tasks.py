@@ -0,0 +1,190 @@
+"""Test SQL-compiled compliance rule evaluation."""
+from datetime import datetime, timezone, timedelta
+
+import pytest
+import pytest_asyncio
+
+from app.celery_app import celery_app
+from app.tasks import compliance_tasks
+
+
+@pytest.fixture
+def sync_session(sync_session_factory, monkeypatch):
+    monkeypatch.setattr(compliance_tasks, "_get_sync_session", sync_session_factory)
+    # Run fanned-out partition tasks inline
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+    monkeypatch.setattr(celery_app.conf, "task_eager_propagates", True)
+    return sync_session_factory
+
+
+@pytest_asyncio.fixture
+async def brokerage(db_session, seed_user, seed_transaction):
+    """A brokerage with the seed agent, whose transaction has one overdue milestone and no lender."""
+    from app.models import Brokerage, ComplianceRule, Milestone
+    brokerage = Brokerage(name="Peach Realty")
+    db_session.add(brokerage)
+    await db_session.flush()
+    seed_user.brokerage_id = brokerage.id
+    db_session.add(Milestone(
+        transaction_id=seed_transaction.id,
+        type="inspection",
+        title="Inspection",
+        due_date=datetime.now(timezone.utc) - timedelta(days=3),
+        status="pending",
+        responsible_party_role="inspector",
+        sort_order=1,
+    ))
+    rules = {
+        "deadline": ComplianceRule(brokerage_id=brokerage.id, name="No overdue milestones",
+                                   rule_type="milestone_deadline", conditions={"max_overdue_days": 1}),
+        "lender": ComplianceRule(brokerage_id=brokerage.id, name="Lender on file",
+                                 rule_type="required_party", conditions={"role": "lender"}, severity="violation"),
+        "closing": ComplianceRule(brokerage_id=brokerage.id, name="Closing date set",
+                                  rule_type="closing_date_required", conditions={}),
+        "emails": ComplianceRule(brokerage_id=brokerage.id, name="Two emails sent",
+                                 rule_type="required_communication", conditions={"min_count": 2}),
+    }
+    db_session.add_all(rules.values())
+    await db_session.commit()
+    return rules
+
+
+def _open_violations(session):
+    from app.models import ComplianceViolation
+    return {
+        (v.rule_id, v.severity)
+        for v in session.query(ComplianceViolation).filter(ComplianceViolation.resolved == False)
+    }
+
+
+def test_rules_evaluate_in_sql_and_upsert_violations(sync_session, brokerage):
+    from app.models import BatchJobPartition
+    compliance_tasks.evaluate_all_compliance()
+    # Re-running must not duplicate open violations
+    with sync_session() as session:
+        session.query(BatchJobPartition).delete()
+        session.commit()
+    compliance_tasks.evaluate_all_compliance()
+
+    with sync_session() as session:
+        assert _open_violations(session) == {
+            (brokerage["deadline"].id, "warning"),
+            (brokerage["lender"].id, "violation"),
+            (brokerage["emails"].id, "warning"),
+        }
+
+
+def test_fixed_transactions_resolve_but_overrides_stick(sync_session, brokerage, seed_transaction):
+    from app.models import BatchJobPartition, ComplianceViolation, Milestone, Party
+    compliance_tasks.evaluate_all_compliance()
+
+    with sync_session() as session:
+        # The next night's run starts from scratch
+        session.query(BatchJobPartition).delete()
+        session.query(Milestone).update({"status": "completed"})
+        session.add(Party(transaction_id=seed_transaction.id, role="lender", name="Lena", email="l@test.com"))
+        override = session.query(ComplianceViolation).filter_by(rule_id=brokerage["emails"].id).one()
+        override.resolved = True
+        override.resolved_by = seed_transaction.agent_id
+        session.commit()
+
+    compliance_tasks.evaluate_all_compliance()
+
+    with sync_session() as session:
+        assert _open_violations(session) == set()
+        resolved = session.query(ComplianceViolation).filter(ComplianceViolation.resolved == True).count()
+        assert resolved == 3
+
+
+async def test_writes_queue_debounced_reevaluation(db_session, sync_session, brokerage, seed_transaction, monkeypatch):
+    from app.models import ComplianceReevaluation, ComplianceViolation, Party
+    compliance_tasks.evaluate_all_compliance()
+    with sync_session() as session:
+        # Drop the pairs queued while seeding
+        session.query(ComplianceReevaluation).delete()
+        session.commit()
+
+    db_session.add(Party(transaction_id=seed_transaction.id, role="lender", name="Lena", email="l@test.com"))
+    await db_session.commit()
+
+    with sync_session() as session:
+        queued = {(q.transaction_id, q.rule_type) for q in session.query(ComplianceReevaluation)}
+    assert queued == {(seed_transaction.id, "required_party")}
+
+    # Still inside the debounce window: nothing is picked up yet
+    compliance_tasks.reevaluate_pending_compliance()
+    with sync_session() as session:
+        assert session.query(ComplianceReevaluation).count() == 1
+
+    monkeypatch.setattr(compliance_tasks, "REEVALUATION_DEBOUNCE", timedelta(0))
+    compliance_tasks.reevaluate_pending_compliance()
+
+    with sync_session() as session:
+        assert session.query(ComplianceReevaluation).count() == 0
+        lender = session.query(ComplianceViolation).filter_by(rule_id=brokerage["lender"].id).one()
+        assert lender.resolved is True
+        # Other rules were not touched by the party write
+        assert (brokerage["deadline"].id, "warning") in _open_violations(session)
+
+
+def test_rerun_only_dispatches_unfinished_partitions(sync_session, brokerage):
+    from unittest.mock import patch
+    from app.models import BatchJobPartition
+
+    compliance_tasks.evaluate_all_compliance()
+    with sync_session() as session:
+        partition = session.query(BatchJobPartition).one()
+        assert partition.status == "done"
+        assert partition.rows == 4
+        assert partition.duration_seconds is not None
+
+    with patch.object(compliance_tasks.evaluate_brokerage_compliance, "apply_async") as apply_async:
+        compliance_tasks.evaluate_all_compliance()
+    apply_async.assert_not_called()
+
+
+def test_performance_snapshots_per_brokerage(sync_session, brokerage, seed_user):
+    from app.models import PerformanceSnapshot
+
+    compliance_tasks.compute_performance_snapshots()
+
+    with sync_session() as session:
+        snapshot = session.query(PerformanceSnapshot).one()
+        assert snapshot.agent_id == seed_user.id
+        assert snapshot.metrics["active_deals"] == 1
+
+
+def test_performance_snapshot_volume_commission_and_days(sync_session, brokerage, seed_user):
+    import uuid
+    from app.models import BatchJobPartition, PerformanceSnapshot, Transaction, TransactionCommission
+
+    with sync_session() as session:
+        for price, commission, days in ((400000, 12000, 30), ({"value": 200000}, 6000, 40)):
+            closed = Transaction(
+                id=uuid.uuid4(), agent_id=seed_user.id, representation_side="buyer",
+                financing_type="conventional", property_address="9 Closed Ct",
+                purchase_price=price if isinstance(price, dict) else {"amount": price},
+                contract_execution_date=datetime.now(timezone.utc) - timedelta(days=days),
+                closing_date=datetime.now(timezone.utc), status="closed",
+            )
+            session.add(closed)
+            session.flush()
+            session.add(TransactionCommission(
+                transaction_id=closed.id, agent_id=seed_user.id, gross_commission=commission,
+            ))
+        session.commit()
+
+    compliance_tasks.compute_performance_snapshots()
+    # A second run the same day updates the snapshot in place
+    with sync_session() as session:
+        session.query(BatchJobPartition).delete()
+        session.commit()
+    compliance_tasks.compute_performance_snapshots()
+
+    with sync_session() as session:
+        metrics = session.query(PerformanceSnapshot).one().metrics
+        assert metrics["active_deals"] == 1
+        assert metrics["closed_ytd"] == 2
+        assert metrics["volume_ytd"] == 600000
+        assert metrics["commission_ytd"] == 18000
+        assert metrics["avg_days_to_close"] == 35.0
@@ -0,0 +1,44 @@
+"""Test document template rendering and the compiled-template cache."""
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services import document_service
+
+
+def _template(updated_at, content):
+    return SimpleNamespace(
+        id=uuid.UUID("00000000-0000-0000-0000-0000000000bb"),
+        updated_at=updated_at,
+        template_content=content,
+    )
+
+
+def test_template_compiled_once_per_version(monkeypatch):
+    v1 = _template(datetime(2026, 1, 1), "<p>v1 {{ transaction.property_address }}</p>")
+    first = document_service.compiled_template("cover_letter", v1)
+    default = document_service.compiled_template("net_sheet")
+    monkeypatch.setattr(document_service, "_compile", None)  # any recompile would fail
+    assert document_service.compiled_template("cover_letter", v1) is first
+    assert document_service.compiled_template("net_sheet") is default
+    monkeypatch.undo()
+
+    v2 = _template(datetime(2026, 1, 2), "<p>v2 {{ transaction.property_address }}</p>")
+    html = document_service._render_template("cover_letter", {"transaction": {"property_address": "1 Main St"}}, v2)
+    assert html == "<p>v2 1 Main St</p>"
+
+
+def test_templates_are_sandboxed_and_escaped():
+    html = document_service._render_template(
+        "closing_checklist",
+        {"transaction": {"property_address": "<script>x</script>"}, "milestones": [], "parties": []},
+    )
+    assert "&lt;script&gt;" in html
+
+    unsafe = _template(datetime(2026, 1, 3), "{{ ''.__class__.__mro__ }}")
+    try:
+        document_service._render_template("cover_letter", {}, unsafe)
+    except Exception as e:
+        assert type(e).__name__ == "SecurityError"
+    else:
+        raise AssertionError("sandbox allowed access to dunder attributes")
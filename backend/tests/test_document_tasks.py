@@ -0,0 +1,99 @@
+"""Test off-request PDF rendering of generated documents."""
+import pytest
+
+from app.tasks import document_tasks
+
+
+@pytest.fixture
+def sync_session(sync_session_factory, monkeypatch):
+    monkeypatch.setattr(document_tasks, "_get_sync_session", sync_session_factory)
+    return sync_session_factory
+
+
+@pytest.fixture
+def pdf_backend(monkeypatch):
+    """Record renders and uploads instead of running WeasyPrint and MinIO."""
+    calls = {"queued": [], "rendered": [], "uploaded": []}
+    monkeypatch.setattr(document_tasks.render_document_pdf, "delay", calls["queued"].append)
+
+    def render(html):
+        calls["rendered"].append(html)
+        return b"%PDF-1.7"
+
+    def upload(pdf, object_name):
+        calls["uploaded"].append(object_name)
+        return f"http://minio/{object_name}"
+
+    monkeypatch.setattr(document_tasks, "_render_pdf", render)
+    monkeypatch.setattr(document_tasks, "_upload_pdf", upload)
+    monkeypatch.setattr(document_tasks, "_pdf_url", lambda object_name: f"http://minio/{object_name}")
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_generated_document_pdf_rendered_once_per_html(client, sync_session, pdf_backend, seed_transaction):
+    url = f"/api/transactions/{seed_transaction.id}/documents/generate"
+    first = (await client.post(url, json={"document_type": "cover_letter"})).json()
+    assert first["pdf_status"] == "pending"
+    assert first["file_url"] is None
+    assert pdf_backend["queued"] == [first["id"]]
+
+    assert document_tasks.render_document_pdf(first["id"]) == {"status": "ready", "rendered": True}
+    polled = (await client.get(f"/api/documents/{first['id']}")).json()
+    assert polled["pdf_status"] == "ready"
+    assert polled["file_url"] == f"http://minio/{pdf_backend['uploaded'][0]}"
+
+    # Same HTML again: the earlier PDF is linked without rendering
+    second = (await client.post(url, json={"document_type": "cover_letter"})).json()
+    assert document_tasks.render_document_pdf(second["id"]) == {"status": "ready", "rendered": False}
+    assert len(pdf_backend["rendered"]) == 1
+    assert (await client.get(f"/api/documents/{second['id']}")).json()["file_url"] == polled["file_url"]
+
+
+@pytest.mark.asyncio
+async def test_failed_pdf_render_can_be_requested_again(client, sync_session, pdf_backend, monkeypatch, seed_transaction):
+    doc = (await client.post(
+        f"/api/transactions/{seed_transaction.id}/documents/generate", json={"document_type": "net_sheet"},
+    )).json()
+
+    def fail(html):
+        raise RuntimeError("renderer crashed")
+
+    monkeypatch.setattr(document_tasks, "_render_pdf", fail)
+    with pytest.raises(RuntimeError):
+        document_tasks.render_document_pdf(doc["id"])
+    failed = (await client.get(f"/api/documents/{doc['id']}")).json()
+    assert failed["pdf_status"] == "failed"
+    assert failed["pdf_error"] == "renderer crashed"
+
+    requeued = (await client.post(f"/api/documents/{doc['id']}/pdf")).json()
+    assert requeued["pdf_status"] == "pending"
+    assert pdf_backend["queued"] == [doc["id"], doc["id"]]
+
+
+@pytest.mark.asyncio
+async def test_stalled_pdf_render_is_requeued(client, sync_session, pdf_backend, seed_transaction):
+    from datetime import datetime, timezone
+    from uuid import UUID
+    from app.models import GeneratedDocument
+
+    doc = (await client.post(
+        f"/api/transactions/{seed_transaction.id}/documents/generate", json={"document_type": "net_sheet"},
+    )).json()
+
+    def mark_rendering(started_at):
+        with sync_session() as session:
+            row = session.get(GeneratedDocument, UUID(doc["id"]))
+            row.pdf_status = "rendering"
+            row.pdf_started_at = started_at
+            session.commit()
+
+    # A render still within its time limits is left alone
+    mark_rendering(datetime.now(timezone.utc))
+    assert (await client.post(f"/api/documents/{doc['id']}/pdf")).json()["pdf_status"] == "rendering"
+    assert pdf_backend["queued"] == [doc["id"]]
+
+    # One whose worker died is queued again
+    mark_rendering(datetime.now(timezone.utc) - document_tasks.PDF_RENDER_TIMEOUT * 2)
+    assert (await client.post(f"/api/documents/{doc['id']}/pdf")).json()["pdf_status"] == "pending"
+    assert pdf_backend["queued"] == [doc["id"], doc["id"]]
@@ -0,0 +1,47 @@
+"""Test notification email rendering and the compiled-template cache."""
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services import email_render_service
+
+
+def _template(updated_at, body):
+    return SimpleNamespace(
+        id=uuid.UUID("00000000-0000-0000-0000-0000000000aa"),
+        updated_at=updated_at,
+        subject_template="{{ milestone.title }}",
+        body_template=body,
+    )
+
+
+def test_template_compiled_once_per_version():
+    v1 = _template(datetime(2026, 1, 1), "<p>v1 {{ recipient_name }}</p>")
+    first = email_render_service.compiled_template(v1)
+    assert email_render_service.compiled_template(v1)[1] is first[1]
+
+    v2 = _template(datetime(2026, 1, 2), "<p>v2 {{ recipient_name }}</p>")
+    subject, html = email_render_service.render(
+        {"recipient_name": "Pat", "milestone": {"title": "Appraisal"}}, v2,
+    )
+    assert subject == "Appraisal"
+    assert html == "<p>v2 Pat</p>"
+
+
+def test_default_bodies_escape_context():
+    results = email_render_service.render_many([
+        (
+            {
+                "subject": "Reminder: Survey",
+                "recipient_name": "<script>x</script>",
+                "milestone": {"title": "Survey", "due_date": "Mar 14, 2026"},
+                "transaction": {"property_address": "1 Main St"},
+            },
+            None,
+            "overdue_l2",
+        ),
+    ])
+    subject, html = results[0]
+    assert subject == "Reminder: Survey"
+    assert "&lt;script&gt;" in html
+    assert "now overdue" in html
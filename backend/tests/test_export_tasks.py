@@ -0,0 +1,118 @@
+"""Test incremental partitioned Parquet exports."""
+import shutil
+from datetime import timedelta, timezone
+
+import pyarrow.parquet as pq
+import pytest
+import pytest_asyncio
+
+from app.tasks import export_tasks
+
+
+@pytest.fixture
+def sync_session(sync_session_factory, monkeypatch):
+    monkeypatch.setattr(export_tasks, "_get_sync_session", sync_session_factory)
+    monkeypatch.setattr(export_tasks, "EXPORT_LAG", timedelta(0))
+    return sync_session_factory
+
+
+@pytest.fixture
+def bucket(tmp_path, monkeypatch):
+    """Collect uploads in a local directory instead of MinIO."""
+    def upload(path, object_name):
+        target = tmp_path / object_name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(path, target)
+    monkeypatch.setattr(export_tasks, "_upload_to_minio", upload)
+    return tmp_path
+
+
+@pytest_asyncio.fixture
+async def brokerage(db_session, seed_user, seed_transaction):
+    from app.models import Brokerage, CommissionSplit, Milestone, TransactionCommission
+    brokerage = Brokerage(name="Peach Realty")
+    db_session.add(brokerage)
+    await db_session.flush()
+    seed_user.brokerage_id = brokerage.id
+    db_session.add(Milestone(
+        transaction_id=seed_transaction.id, type="inspection", title="Inspection",
+        status="pending", responsible_party_role="inspector", sort_order=1,
+    ))
+    commission = TransactionCommission(
+        transaction_id=seed_transaction.id, agent_id=seed_user.id, rate=0.03, gross_commission=15000,
+    )
+    db_session.add(commission)
+    await db_session.flush()
+    db_session.add(CommissionSplit(
+        transaction_commission_id=commission.id, split_type="broker",
+        recipient_name="Broker", percentage=0.2, calculated_amount=3000,
+    ))
+    await db_session.commit()
+    return brokerage
+
+
+def test_export_writes_typed_partitions_incrementally(sync_session, bucket, brokerage, seed_transaction):
+    from decimal import Decimal
+    from app.models import Transaction
+
+    stats = export_tasks.export_parquet_datasets()
+    assert {name: s["rows"] for name, s in stats.items()} == {
+        "transactions": 1, "milestones": 1, "transaction_commissions": 1, "commission_splits": 1,
+    }
+
+    month = seed_transaction.created_at.astimezone(timezone.utc).strftime("%Y-%m")
+    [path] = (bucket / "exports/parquet/transactions" / f"brokerage_id={brokerage.id}" / f"month={month}").iterdir()
+    table = pq.read_table(path)
+    assert str(table.schema.field("purchase_price").type) == "decimal128(14, 2)"
+    assert str(table.schema.field("closing_date").type) == "timestamp[us, tz=UTC]"
+    assert table.column("purchase_price").to_pylist() == [Decimal("500000.00")]
+
+    # Nothing changed: nothing written
+    stats = export_tasks.export_parquet_datasets()
+    assert all(s["rows"] == 0 and s["files"] == 0 for s in stats.values())
+
+    with sync_session() as session:
+        session.get(Transaction, seed_transaction.id).status = "closed"
+        session.commit()
+    stats = export_tasks.export_parquet_datasets()
+    assert stats["transactions"] == {"rows": 1, "files": 1}
+    assert stats["milestones"]["rows"] == 0
+
+
+def test_concurrent_run_skips_locked_datasets(sync_session, bucket, brokerage):
+    from sqlalchemy import select
+    from app.models import ExportWatermark
+
+    export_tasks.export_parquet_datasets(["transactions"])
+    with sync_session() as other_run:
+        other_run.execute(
+            select(ExportWatermark).where(ExportWatermark.dataset == "transactions").with_for_update()
+        )
+        stats = export_tasks.export_parquet_datasets(["transactions", "milestones"], full=True)
+    assert set(stats) == {"milestones"}
+
+
+@pytest.mark.asyncio
+async def test_export_endpoint_queues_task(client, db_session, seed_user, monkeypatch):
+    from types import SimpleNamespace
+
+    queued = []
+    monkeypatch.setattr(
+        export_tasks.export_parquet_datasets, "delay",
+        lambda *args: queued.append(args) or SimpleNamespace(id="task-1"),
+    )
+    # Agents can neither start nor inspect exports
+    assert (await client.post("/api/exports/parquet", json={})).status_code == 403
+    assert (await client.get("/api/exports/parquet")).status_code == 403
+    assert queued == []
+
+    seed_user.role = "broker"
+    await db_session.commit()
+    assert (await client.get("/api/exports/parquet")).status_code == 200
+    response = await client.post("/api/exports/parquet", json={"datasets": ["transactions"]})
+    assert response.status_code == 202
+    assert response.json()["task_id"] == "task-1"
+    assert queued == [(["transactions"], False)]
+
+    response = await client.post("/api/exports/parquet", json={"datasets": ["parties"]})
+    assert response.status_code == 400
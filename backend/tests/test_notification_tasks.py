@@ -0,0 +1,294 @@
+"""Test the nudge engine Celery tasks against the test database."""
+import uuid
+from datetime import datetime, timezone, timedelta
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+
+from app.tasks import notification_tasks
+
+
+@pytest.fixture
+def sync_session(sync_session_factory, monkeypatch):
+    """Point the Celery tasks' sync session at the test database."""
+    monkeypatch.setattr(notification_tasks, "_sync_session_factory", sync_session_factory)
+    monkeypatch.setenv("RESEND_API_KEY", "re_test")
+    return sync_session_factory
+
+
+def _open_send_window_now(agent):
+    """Configure the agent so the current UTC hour is inside their send window."""
+    hour = datetime.now(timezone.utc).hour
+    agent.notification_preferences = {
+        "timezone": "UTC",
+        "business_hours_start": f"{hour:02d}:00",
+        "business_hours_end": f"{hour + 1:02d}:00",
+        "send_on_weekends": True,
+    }
+
+
+@pytest_asyncio.fixture
+async def seed_reminder(db_session, seed_transaction, seed_user):
+    """A lender milestone due tomorrow with a catch-all notification rule."""
+    from app.models import Milestone, Party, NotificationRule
+    _open_send_window_now(seed_user)
+    milestone = Milestone(
+        id=uuid.uuid4(),
+        transaction_id=seed_transaction.id,
+        type="financing",
+        title="Loan Commitment",
+        due_date=datetime.now(timezone.utc) + timedelta(days=1),
+        status="pending",
+        responsible_party_role="lender",
+        sort_order=1,
+    )
+    party = Party(
+        transaction_id=seed_transaction.id,
+        role="lender",
+        name="Lena Lender",
+        email="lender@test.com",
+    )
+    rule = NotificationRule(
+        agent_id=seed_transaction.agent_id,
+        milestone_type="*",
+        days_before=2,
+        recipient_roles=[],
+        escalation_days=[1, 3, 7],
+    )
+    db_session.add_all([milestone, party, rule])
+    await db_session.commit()
+    return milestone
+
+
+def test_reminders_enqueue_delivery_per_notification(sync_session, seed_reminder):
+    with patch.object(notification_tasks, "_enqueue_delivery") as enqueue:
+        notification_tasks.check_milestone_reminders()
+
+    assert enqueue.call_count == 1
+    notification_id = enqueue.call_args.args[0]
+
+    with patch("resend.Emails.send", return_value={"id": "msg_1"}):
+        notification_tasks.deliver_notification(str(notification_id))
+
+    from app.models import NotificationLog
+    with sync_session() as session:
+        notif = session.get(NotificationLog, notification_id)
+        assert notif.status == "sent"
+        assert notif.resend_message_id == "msg_1"
+        assert notif.communication_id is not None
+
+
+def test_failed_delivery_schedules_exact_retry(sync_session, seed_reminder):
+    with patch.object(notification_tasks, "_enqueue_delivery") as enqueue:
+        notification_tasks.check_milestone_reminders()
+    notification_id = enqueue.call_args.args[0]
+
+    with patch.object(notification_tasks, "_enqueue_delivery") as enqueue, \
+            patch("resend.Emails.send", side_effect=RuntimeError("provider down")):
+        notification_tasks.deliver_notification(str(notification_id))
+
+    enqueue.assert_called_once_with(str(notification_id), countdown=30)
+
+    from app.models import NotificationLog
+    with sync_session() as session:
+        notif = session.get(NotificationLog, notification_id)
+        assert notif.status == "queued"
+        assert notif.retry_count == 1
+
+
+def test_sweep_cancels_stale_notifications_in_bulk(sync_session, seed_reminder):
+    from app.models import NotificationLog, Milestone, Party
+
+    with patch.object(notification_tasks, "_enqueue_delivery") as enqueue:
+        notification_tasks.check_milestone_reminders()
+    notification_id = enqueue.call_args.args[0]
+
+    with sync_session() as session:
+        # A second, unrelated recipient who has since bounced
+        session.add(NotificationLog(
+            transaction_id=seed_reminder.transaction_id,
+            type="reminder",
+            recipient_email="bounced@test.com",
+            status="queued",
+            scheduled_for=datetime.utcnow() - timedelta(hours=1),
+        ))
+        session.add(Party(
+            transaction_id=seed_reminder.transaction_id,
+            role="buyer",
+            name="Bo Bounced",
+            email="bounced@test.com",
+            email_bounced=True,
+        ))
+        session.get(Milestone, seed_reminder.id).status = "completed"
+        session.get(NotificationLog, notification_id).scheduled_for = datetime.utcnow() - timedelta(hours=1)
+        session.commit()
+
+    with patch("resend.Emails.send") as send:
+        notification_tasks.send_queued_emails()
+    send.assert_not_called()
+
+    with sync_session() as session:
+        logs = session.query(NotificationLog).all()
+        assert {log.status for log in logs} == {"cancelled"}
+        assert {log.error_message for log in logs} == {
+            "Milestone completed before send",
+            "Recipient bounced or unsubscribed",
+        }
+
+
+def test_agents_outside_send_window_are_skipped(sync_session, seed_reminder):
+    from app.models import User
+    with sync_session() as session:
+        agent = session.query(User).one()
+        prefs = dict(agent.notification_preferences)
+        # Quiet hours covering the whole business-hours window
+        prefs["quiet_hours"] = {"start": prefs["business_hours_start"], "end": prefs["business_hours_end"]}
+        agent.notification_preferences = prefs
+        session.commit()
+
+    with patch.object(notification_tasks, "_enqueue_delivery") as enqueue:
+        notification_tasks.check_milestone_reminders()
+    enqueue.assert_not_called()
+
+
+def test_agents_are_caught_up_later_in_their_send_window(sync_session, seed_reminder):
+    from app.models import User
+    hour = datetime.now(timezone.utc).hour
+    with sync_session() as session:
+        agent = session.query(User).one()
+        # Window opened three hours ago, so the opening tick was missed
+        agent.notification_preferences = {
+            **agent.notification_preferences,
+            "business_hours_start": f"{(hour - 3) % 24:02d}:00",
+        }
+        session.commit()
+
+    with patch.object(notification_tasks, "_enqueue_delivery") as enqueue:
+        notification_tasks.check_milestone_reminders()
+        notification_tasks.check_milestone_reminders()
+    assert enqueue.call_count == 1
+
+
+def test_digest_recipient_gets_one_combined_email(sync_session, seed_reminder):
+    from app.models import Milestone, Party, NotificationLog
+
+    with sync_session() as session:
+        session.query(Party).update({"notification_preference": "daily_digest"})
+        session.add(Milestone(
+            transaction_id=seed_reminder.transaction_id,
+            type="appraisal",
+            title="Appraisal Completed",
+            due_date=datetime.now(timezone.utc) + timedelta(days=1),
+            status="pending",
+            responsible_party_role="lender",
+            sort_order=2,
+        ))
+        session.commit()
+
+    with patch.object(notification_tasks, "_enqueue_delivery") as enqueue:
+        notification_tasks.check_milestone_reminders()
+    enqueue.assert_not_called()
+
+    with sync_session() as session:
+        logs = session.query(NotificationLog).all()
+        assert [log.status for log in logs] == ["digest_pending", "digest_pending"]
+        for log in logs:
+            log.scheduled_for = datetime.utcnow() - timedelta(hours=2)
+        session.commit()
+
+    with patch("resend.Emails.send", return_value={"id": "digest_1"}) as send:
+        notification_tasks.send_notification_digests()
+
+    send.assert_called_once()
+    assert "Appraisal Completed" in send.call_args.args[0]["html"]
+    with sync_session() as session:
+        logs = session.query(NotificationLog).all()
+        assert {log.status for log in logs} == {"sent"}
+        assert {log.resend_message_id for log in logs} == {"digest_1"}
+
+
+def test_failed_digest_backs_off_before_retrying(sync_session, seed_reminder):
+    from app.models import Milestone, Party, NotificationLog
+
+    with sync_session() as session:
+        session.query(Party).update({"notification_preference": "daily_digest"})
+        session.commit()
+    with patch.object(notification_tasks, "_enqueue_delivery"):
+        notification_tasks.check_milestone_reminders()
+    with sync_session() as session:
+        session.query(NotificationLog).update({"scheduled_for": datetime.utcnow() - timedelta(hours=2)})
+        session.commit()
+
+    with patch("resend.Emails.send", side_effect=RuntimeError("provider down")):
+        notification_tasks.send_notification_digests()
+    with sync_session() as session:
+        [log] = session.query(NotificationLog).all()
+        assert (log.status, log.retry_count) == ("digest_pending", 1)
+        assert log.scheduled_for > datetime.now(timezone.utc) + timedelta(seconds=notification_tasks.RETRY_BACKOFF_SECONDS[0] - 10)
+
+    # Not due yet; once the backoff has passed the digest goes out without waiting another window
+    with patch("resend.Emails.send", return_value={"id": "digest_2"}) as send:
+        notification_tasks.send_notification_digests()
+        send.assert_not_called()
+        with sync_session() as session:
+            session.query(NotificationLog).update({"scheduled_for": datetime.utcnow() - timedelta(seconds=1)})
+            # A new item for the same recipient, still inside its digest window, waits for the next digest
+            session.add(Milestone(
+                transaction_id=seed_reminder.transaction_id, type="appraisal", title="Appraisal Completed",
+                due_date=datetime.now(timezone.utc) + timedelta(days=1), status="pending",
+                responsible_party_role="lender", sort_order=2,
+            ))
+            session.commit()
+        with patch.object(notification_tasks, "_enqueue_delivery"):
+            notification_tasks.check_milestone_reminders()
+        notification_tasks.send_notification_digests()
+        send.assert_called_once()
+    assert "Appraisal Completed" not in send.call_args.args[0]["html"]
+    with sync_session() as session:
+        statuses = {log.retry_count: log.status for log in session.query(NotificationLog).all()}
+        assert statuses == {1: "sent", 0: "digest_pending"}
+
+
+async def test_webhooks_are_staged_then_applied_in_batches(client, sync_session, seed_reminder):
+    from app.models import NotificationLog, Party, WebhookEvent
+
+    with sync_session() as session:
+        session.add(NotificationLog(
+            transaction_id=seed_reminder.transaction_id,
+            type="reminder",
+            recipient_email="lender@test.com",
+            status="sent",
+            resend_message_id="msg_9",
+        ))
+        session.commit()
+
+    bounced = {
+        "type": "email.bounced",
+        "created_at": "2026-03-01T10:05:00Z",
+        "data": {"email_id": "msg_9", "bounce": {"message": "Mailbox full"}},
+    }
+    delivered = {
+        "type": "email.delivered",
+        "created_at": "2026-03-01T10:00:00Z",
+        "data": {"email_id": "msg_9"},
+    }
+    # The bounce arrives first and is redelivered; the earlier delivery arrives last
+    for body, svix_id in ((bounced, "evt_2"), (bounced, "evt_2"), (delivered, "evt_1")):
+        response = await client.post("/api/webhooks/resend", json=body, headers={"svix-id": svix_id})
+        assert response.status_code == 200
+
+    with sync_session() as session:
+        assert session.query(WebhookEvent).count() == 2
+        assert session.query(NotificationLog).one().status == "sent"
+
+    notification_tasks.process_webhook_events()
+
+    with sync_session() as session:
+        log = session.query(NotificationLog).one()
+        assert log.status == "bounced"
+        assert log.bounce_reason == "Mailbox full"
+        assert log.delivered_at == datetime(2026, 3, 1, 10, 0, tzinfo=timezone.utc)
+        party = session.query(Party).one()
+        assert party.email_bounced is True
+        assert session.query(WebhookEvent).filter(WebhookEvent.processed_at.is_(None)).count() == 0
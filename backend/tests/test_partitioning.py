@@ -0,0 +1,58 @@
+"""Test monthly partitioning of the log tables and partition-based retention."""
+import uuid
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import partitioning
+from app.tasks import portal_tasks
+
+
+@pytest.fixture
+def sync_session(sync_session_factory, monkeypatch):
+    monkeypatch.setattr(portal_tasks, "_get_sync_session", sync_session_factory)
+    return sync_session_factory
+
+
+def test_log_tables_are_partitioned_by_month(sync_session):
+    with sync_session() as session:
+        conn = session.connection()
+        for table in partitioning.PARTITIONED_TABLES:
+            assert partitioning.is_partitioned(conn, table)
+            months = [month for _, month in partitioning.list_month_partitions(conn, table)]
+            assert partitioning.month_start(datetime.now(timezone.utc)) in months
+            assert len(months) == partitioning.MONTHS_AHEAD + 1
+
+
+async def test_access_log_retention_drops_whole_partitions(db_session, seed_transaction, sync_session):
+    from app.models import Party, PortalAccess, PortalAccessLog
+
+    party = Party(transaction_id=seed_transaction.id, role="buyer", name="Bea Buyer", email="bea@test.com")
+    db_session.add(party)
+    await db_session.flush()
+    access = PortalAccess(
+        transaction_id=seed_transaction.id,
+        party_id=party.id,
+        token=uuid.uuid4().hex,
+        role="buyer",
+        expires_at=datetime.now(timezone.utc) + timedelta(days=30),
+    )
+    db_session.add(access)
+    await db_session.commit()
+
+    now = datetime.now(timezone.utc)
+    expired_month = partitioning.month_start(now - timedelta(days=240))
+    with sync_session() as session:
+        partitioning.ensure_partitions(session.connection(), "portal_access_logs", start=expired_month)
+        for age in (240, 181, 10):
+            session.add(PortalAccessLog(portal_access_id=access.id, action="view", created_at=now - timedelta(days=age)))
+        session.commit()
+
+    portal_tasks.cleanup_access_logs()
+
+    with sync_session() as session:
+        months = [month for _, month in partitioning.list_month_partitions(session.connection(), "portal_access_logs")]
+        assert expired_month not in months
+        remaining = session.execute(text("SELECT created_at FROM portal_access_logs")).scalars().all()
+        assert remaining == [now - timedelta(days=10)]
@@ -54,3 +54,21 @@ async def test_list_transactions_with_data(client, seed_transaction):
     data = response.json()
     assert len(data["items"]) >= 1
     assert any(t["property_address"] == "123 Test St" for t in data["items"])
+
+
+@pytest.mark.asyncio
+async def test_list_transactions_price_range(client, db_session, seed_transaction):
+    assert seed_transaction.purchase_price_value == 500000
+
+    response = await client.get("/api/transactions", params={"min_price": 400000, "max_price": 500000})
+    assert [t["id"] for t in response.json()["items"]] == [str(seed_transaction.id)]
+    response = await client.get("/api/transactions", params={"min_price": 500000.01})
+    assert response.json()["items"] == []
+
+    # The typed column follows the JSON on update
+    seed_transaction.purchase_price = {"value": "650000.50"}
+    await db_session.commit()
+    await db_session.refresh(seed_transaction, ["purchase_price_value"])
+    assert str(seed_transaction.purchase_price_value) == "650000.50"
+    response = await client.get("/api/transactions", params={"min_price": 600000})
+    assert len(response.json()["items"]) == 1